@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, BlogPost, BlogAuthor, Comment, Tag
+from .models import (User, BlogPost, BlogAuthor, CategoryStats, Comment, ContributorStats, PostStat, SiteStats, Tag,
+                     TagJob, TopPost, TrendingPost, Vote)
 
 # Register your models here.
 class CustomUserAdmin(UserAdmin):
@@ -28,10 +29,9 @@ class BlogPostAdmin(admin.ModelAdmin):
                     'category',
                     'views',
                     'display_viewed_users',
-                    'anonymous_users',
+                    'count_anonymous_visitors',
                     'likes',
-                    'dislikes',
-                    'liked_disliked_users')
+                    'dislikes')
     fields = ['title', 'image', 'author', 'description', 'category']
     list_filter = ('author',)
     exclude = ('slug',)
@@ -60,3 +60,39 @@ class CommentAdmin(admin.ModelAdmin):
 class TagAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'word', 'quantity', 'display_blogposts')
     list_filter = ('quantity',)
+
+@admin.register(TagJob)
+class TagJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'blogpost', 'status', 'attempts', 'created', 'run_after')
+    list_filter = ('status',)
+
+@admin.register(PostStat)
+class PostStatAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'blogpost', 'period', 'start', 'views', 'likes', 'dislikes', 'comments')
+    list_filter = ('period',)
+
+@admin.register(TopPost)
+class TopPostAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'days', 'metric', 'rank', 'blogpost', 'total')
+    list_filter = ('days', 'metric')
+
+@admin.register(TrendingPost)
+class TrendingPostAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'blogpost', 'score', 'updated')
+
+@admin.register(SiteStats)
+class SiteStatsAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'blog_posts', 'bloggers', 'comments')
+
+@admin.register(CategoryStats)
+class CategoryStatsAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'blog_posts')
+
+@admin.register(ContributorStats)
+class ContributorStatsAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'blog_posts')
+
+@admin.register(Vote)
+class VoteAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'blogpost', 'user', 'value', 'created')
+    list_filter = ('value',)
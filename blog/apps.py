@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class BlogConfig(AppConfig):
@@ -7,3 +8,7 @@ class BlogConfig(AppConfig):
 
     def ready(self):
         from . import signals
+
+        if getattr(settings, 'NLTK_WARMUP', False):
+            from .nlp import warmup
+            warmup()
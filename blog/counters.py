@@ -0,0 +1,100 @@
+from collections import Counter
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import BlogPost
+from .stats import record_post_stats
+
+
+logger = logging.getLogger(__name__)
+
+VIEW_COUNT_FLUSH_INTERVAL = getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 30) # seconds, None flushes explicitly
+
+
+def get_views_delta(counts):
+    """
+    Get an expression of the number of views of each blog post pk in counts
+    """
+    return Case(*[When(pk=pk, then=Value(count)) for pk, count in counts.items()], output_field=IntegerField())
+
+
+class ViewCounter:
+    """
+    Blog post views buffered in the memory of the current process and added to blog posts in batches.
+    A view touches no database row, the first view once the interval has passed flushes the buffer,
+    so a process writes views at most once per interval, see flush_on_exit for what is left
+    """
+
+    def __init__(self, interval=VIEW_COUNT_FLUSH_INTERVAL):
+        self.interval = interval
+        self.counts = Counter()
+        self.flushed = time.monotonic()
+        self._lock = threading.Lock()
+
+    def increment(self, pk):
+        """
+        Count a view of a blog post
+        """
+        with self._lock:
+            self.counts[pk] += 1
+            due = self.interval is not None and time.monotonic() - self.flushed >= self.interval
+            if due:
+                # the other threads go on counting
+                self.flushed = time.monotonic()
+
+        if due:
+            try:
+                self.flush()
+            except Exception:
+                # the views are kept for the next flush
+                logger.exception('Flushing view counts failed')
+
+    def get_pending(self, pk):
+        """
+        Get the number of views of a blog post counted by this process which aren't in the database yet
+        """
+        return self.counts.get(pk, 0)
+
+    def flush(self):
+        """
+        Add buffered views to the blog posts with a single update and to their hourly stats,
+        return the number of flushed views
+        """
+        with self._lock:
+            counts, self.counts = self.counts, Counter()
+            self.flushed = time.monotonic()
+        if not counts:
+            return 0
+
+        try:
+            with transaction.atomic():
+                BlogPost.objects.filter(pk__in=counts).update(views=F('views') + get_views_delta(counts))
+                # views are counted in the hour they are flushed
+                record_post_stats(counts, 'views')
+        except Exception:
+            with self._lock:
+                self.counts.update(counts)
+            raise
+
+        return sum(counts.values())
+
+
+view_counter = ViewCounter()
+
+
+def flush_on_exit():
+    """
+    Write views left in the buffer when the current process exits, called by web processes
+    """
+    def flush():
+        try:
+            view_counter.flush()
+        except Exception:
+            logger.exception('Flushing view counts failed')
+    atexit.register(flush)
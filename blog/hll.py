@@ -0,0 +1,84 @@
+import hashlib
+import math
+
+
+class HyperLogLog:
+    """
+    A HyperLogLog sketch estimating the number of distinct values added to it.
+    2 ** precision one-byte registers give a standard error of about 1.04 / sqrt(2 ** precision)
+    """
+
+    def __init__(self, precision=10, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError(f'Precision has to be between 4 and 16, not {precision}')
+
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+
+        if len(self.registers) != self.size:
+            raise ValueError(f'Expected {self.size} registers, got {len(self.registers)}')
+
+    @classmethod
+    def from_bytes(cls, data, precision=10):
+        """
+        Load a sketch stored with to_bytes, an empty value gives an empty sketch
+        """
+        if not data:
+            return cls(precision)
+        return cls(int(math.log2(len(data))), bytes(data))
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    def add(self, value):
+        """
+        Add a string to the sketch, return True if the sketch has changed
+        """
+        hashed = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        # the position of the leftmost 1 bit of the rest of the hash
+        rank = 64 - self.precision - rest.bit_length() + 1
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other):
+        """
+        Add all values of another sketch of the same precision to this one
+        """
+        if other.precision != self.precision:
+            raise ValueError('Only sketches of the same precision can be merged')
+
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """
+        Estimate the number of distinct values added to the sketch
+        """
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size ** 2 / sum(2.0 ** -register for register in self.registers)
+
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            # linear counting is more accurate for small cardinalities
+            estimate = self.size * math.log(self.size / zeros)
+
+        return round(estimate)
+
+    def __eq__(self, other):
+        return isinstance(other, HyperLogLog) and self.registers == other.registers
+
+
+def merge_sketches(sketches, precision=10):
+    """
+    Merge stored sketches, e.g. of several blog posts, into one
+    """
+    merged = HyperLogLog(precision)
+    for data in sketches:
+        merged.merge(HyperLogLog.from_bytes(data, precision))
+    return merged
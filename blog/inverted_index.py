@@ -0,0 +1,234 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+import math
+import mmap
+import os
+import struct
+import tempfile
+
+
+MAGIC = b'BLIX'
+VERSION = 1
+# magic, version, number of documents, terms and postings, size of the terms blob, average length, build time
+HEADER = struct.Struct('<4sIIIIIdd')
+UINT32 = 'I' if array('I').itemsize == 4 else 'L'
+
+
+class IndexSegment:
+    """
+    An immutable inverted index of documents stored in a buffer, usually a memory-mapped file.
+    Documents are sorted by id, terms are sorted by their utf-8 bytes, postings of a term are
+    sorted by document and every table is an array of uint32, so nothing is parsed on load
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        if len(buffer) < HEADER.size:
+            raise ValueError('Not a search index')
+
+        magic, version, self.num_docs, self.num_terms, num_postings, terms_size, self.avg_length, self.built_at = \
+            HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a search index or an index of another version')
+
+        view = memoryview(buffer)
+        offset = HEADER.size
+
+        def table(length):
+            nonlocal offset
+            start, offset = offset, offset + length * 4
+            return view[start:offset].cast(UINT32)
+
+        self.doc_ids = table(self.num_docs)
+        self.doc_lengths = table(self.num_docs)
+        self.term_offsets = table(self.num_terms + 1)
+        self.postings_offsets = table(self.num_terms + 1)
+        self.postings_docs = table(num_postings)
+        self.postings_freqs = table(num_postings)
+        self.terms = view[offset:offset + terms_size]
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map an index file written by write
+        """
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                raise ValueError('Empty search index file')
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer)
+
+    @staticmethod
+    def serialize(documents, built_at=0.0):
+        """
+        Get the bytes of an index of (doc id, terms) pairs
+        """
+        documents = sorted((doc_id, Counter(terms)) for doc_id, terms in documents)
+
+        postings = {}
+        doc_ids, doc_lengths = array(UINT32), array(UINT32)
+        for doc_index, (doc_id, terms) in enumerate(documents):
+            doc_ids.append(doc_id)
+            doc_lengths.append(sum(terms.values()))
+            for term, freq in terms.items():
+                postings.setdefault(term.encode(), []).append((doc_index, freq))
+
+        terms = sorted(postings)
+        term_offsets, postings_offsets = array(UINT32, [0]), array(UINT32, [0])
+        postings_docs, postings_freqs = array(UINT32), array(UINT32)
+        for term in terms:
+            term_offsets.append(term_offsets[-1] + len(term))
+            for doc_index, freq in postings[term]:
+                postings_docs.append(doc_index)
+                postings_freqs.append(freq)
+            postings_offsets.append(len(postings_docs))
+
+        blob = b''.join(terms)
+        avg_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+        header = HEADER.pack(MAGIC, VERSION, len(doc_ids), len(terms), len(postings_docs), len(blob),
+                             avg_length, built_at)
+        tables = (doc_ids, doc_lengths, term_offsets, postings_offsets, postings_docs, postings_freqs)
+
+        return header + b''.join(table.tobytes() for table in tables) + blob
+
+    @classmethod
+    def write(cls, path, documents, built_at=0.0):
+        """
+        Write an index of (doc id, terms) pairs to a file, replacing it atomically
+        """
+        data = cls.serialize(documents, built_at)
+        directory = os.path.dirname(os.path.abspath(path))
+
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+            file.write(data)
+        # processes which have mapped the old file keep reading it until they reload
+        os.replace(file.name, path)
+
+    def get_term(self, index):
+        return self.terms[self.term_offsets[index]:self.term_offsets[index + 1]].tobytes()
+
+    def get_postings(self, term):
+        """
+        Get (doc indexes, frequencies) of a term, empty if it isn't indexed
+        """
+        term = term.encode()
+        low, high = 0, self.num_terms
+        while low < high:
+            middle = (low + high) // 2
+            if self.get_term(middle) < term:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self.num_terms and self.get_term(low) == term:
+            start, end = self.postings_offsets[low], self.postings_offsets[low + 1]
+            return self.postings_docs[start:end], self.postings_freqs[start:end]
+        return (), ()
+
+    def find_doc(self, doc_id):
+        """
+        Get the index of a document, None if it isn't indexed
+        """
+        index = bisect_left(self.doc_ids, doc_id)
+        if index < self.num_docs and self.doc_ids[index] == doc_id:
+            return index
+        return None
+
+
+class InvertedIndex:
+    """
+    A segment plus documents added or removed since it was written, searched with BM25.
+    A document matches if it contains every term of a query
+    """
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, segment=None):
+        self.segment = segment or IndexSegment(IndexSegment.serialize([]))
+        self.added = {}
+        self.removed = set() # indexes of segment documents replaced or removed since
+        self.version = 0
+
+    def add(self, doc_id, terms):
+        self.remove(doc_id)
+        self.added[doc_id] = Counter(terms)
+
+    def remove(self, doc_id):
+        self.added.pop(doc_id, None)
+        doc_index = self.segment.find_doc(doc_id)
+        if doc_index is not None:
+            self.removed.add(doc_index)
+        self.version += 1
+
+    def __len__(self):
+        return self.segment.num_docs - len(self.removed) + len(self.added)
+
+    def get_frequencies(self, postings, doc_indexes):
+        """
+        Get a dict of frequencies of a term in segment documents by their index
+        """
+        docs, freqs = postings
+        if len(doc_indexes) * 16 >= len(docs):
+            return dict(zip(docs, freqs))
+
+        # a few documents are looked up by bisection instead of reading every posting
+        frequencies = {}
+        for doc_index in doc_indexes:
+            position = bisect_left(docs, doc_index)
+            if position < len(docs) and docs[position] == doc_index:
+                frequencies[doc_index] = freqs[position]
+        return frequencies
+
+    def search(self, terms):
+        """
+        Get a list of (doc id, score) of documents containing all terms, best matches first
+        """
+        terms = set(terms)
+        num_docs = len(self)
+        if not terms or not num_docs:
+            return []
+
+        segment = self.segment
+        postings = {term: segment.get_postings(term) for term in terms}
+        added = {term: {doc_id: doc[term] for doc_id, doc in self.added.items() if term in doc} for term in terms}
+        # replaced and removed documents aren't counted, so that idf stays positive
+        frequencies = {term: len(postings[term][0]) - len(self.removed.intersection(postings[term][0]))
+                       + len(added[term]) for term in terms}
+
+        total_length = (segment.avg_length * segment.num_docs
+                        - sum(segment.doc_lengths[doc_index] for doc_index in self.removed)
+                        + sum(sum(doc.values()) for doc in self.added.values()))
+        avg_length = total_length / num_docs or 1
+        k1, b = self.k1, self.b
+
+        # segment documents are matched by their index, starting from the rarest term,
+        # so the others are only looked up for its documents
+        rarest, *others = sorted(terms, key=frequencies.get)
+        candidates = set(postings[rarest][0]) - self.removed
+        for term in others:
+            if not candidates:
+                break
+            candidates &= self.get_frequencies(postings[term], candidates).keys()
+
+        lengths = segment.doc_lengths
+        norms = {doc_index: k1 * (1 - b + b * lengths[doc_index] / avg_length) for doc_index in candidates}
+        segment_scores = dict.fromkeys(candidates, 0.0)
+        added_ids = set.intersection(*(set(added[term]) for term in terms))
+        added_scores = dict.fromkeys(added_ids, 0.0)
+
+        for term in terms:
+            idf = math.log(1 + (num_docs - frequencies[term] + 0.5) / (frequencies[term] + 0.5))
+            term_frequencies = self.get_frequencies(postings[term], candidates)
+            for doc_index, norm in norms.items():
+                freq = term_frequencies[doc_index]
+                segment_scores[doc_index] += idf * freq * (k1 + 1) / (freq + norm)
+            for doc_id in added_ids:
+                freq = added[term][doc_id]
+                norm = k1 * (1 - b + b * sum(self.added[doc_id].values()) / avg_length)
+                added_scores[doc_id] += idf * freq * (k1 + 1) / (freq + norm)
+
+        doc_ids = segment.doc_ids
+        scores = [(doc_ids[doc_index], score) for doc_index, score in segment_scores.items()]
+        scores.extend(added_scores.items())
+        return sorted(scores, key=lambda item: (-item[1], item[0]))
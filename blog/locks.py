@@ -0,0 +1,100 @@
+from datetime import timedelta
+from uuid import uuid4
+import logging
+import time
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Lock
+
+
+logger = logging.getLogger(__name__)
+
+
+class LockTimeout(Exception):
+    pass
+
+
+class DatabaseLock:
+    """
+    A lock shared through a row of the Lock table by every process using it, e.g. gunicorn workers.
+    The row expires after timeout seconds in case the owner dies without releasing it.
+    It has to be acquired outside of a transaction, other processes wouldn't see the row otherwise
+    """
+
+    def __init__(self, name, timeout=60, wait=30):
+        self.name = name
+        self.timeout = timeout
+        self.wait = wait
+        self.token = None
+
+    def try_acquire(self, token):
+        now = timezone.now()
+        Lock.objects.filter(name=self.name, expires__lte=now).delete()
+        try:
+            with transaction.atomic():
+                Lock.objects.create(name=self.name, token=token, expires=now + timedelta(seconds=self.timeout))
+        except IntegrityError:
+            return False
+        return True
+
+    def acquire(self, blocking=True, wait=None, poll_interval=0.05):
+        """
+        Acquire the lock, return False if it isn't available within wait seconds
+        """
+        token = uuid4().hex
+        deadline = time.monotonic() + (self.wait if wait is None else wait)
+
+        while not self.try_acquire(token):
+            if not blocking or time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+
+        self.token = token
+        return True
+
+    def release(self):
+        """
+        Release the lock unless it has expired and been taken by someone else meanwhile
+        """
+        if self.token:
+            Lock.objects.filter(name=self.name, token=self.token).delete()
+        self.token = None
+
+    def __enter__(self):
+        if not self.acquire():
+            raise LockTimeout(f'Lock {self.name} is held for more than {self.wait}s')
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def run_coalesced(name, func, *args, timeout=60, **kwargs):
+    """
+    Run func holding the named lock. If another process is running it, ask that process
+    to run func once more after it's done and return False instead of waiting,
+    so any number of requests made during a run result in a single follow-up run
+    """
+    lock = DatabaseLock(name, timeout=timeout)
+
+    while not lock.acquire(blocking=False):
+        # the owner only releases the lock if nobody has asked for a follow-up run
+        if Lock.objects.filter(name=name).update(rerun=True):
+            return False
+
+    try:
+        while True:
+            func(*args, **kwargs)
+
+            deleted, _ = Lock.objects.filter(name=name, token=lock.token, rerun=False).delete()
+            if deleted:
+                lock.token = None
+                return True
+            if not Lock.objects.filter(name=name, token=lock.token).update(rerun=False):
+                # expired and taken by someone else, who runs func
+                return True
+            logger.info('Running %s again for requests made meanwhile', name)
+    finally:
+        lock.release()
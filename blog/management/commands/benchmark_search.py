@@ -0,0 +1,105 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.inverted_index import IndexSegment, InvertedIndex
+from blog.search import get_terms
+from blog.utils import strip_html
+from .benchmark_tag_extractors import make_description
+
+
+# rare words are added to a few posts, so selective queries can be measured as well
+RARE_WORDS = ['violin', 'harbour', 'lantern', 'glacier', 'compass', 'orchard', 'saddle', 'tapestry']
+QUERIES = ['guitar', 'old castle', 'violin', 'lantern glacier', 'painted beautiful river']
+
+
+class Command(BaseCommand):
+    help = 'Compare substring matching of search documents with the inverted index on a synthetic corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, action='append',
+                            help='Number of synthetic blog posts, may be repeated. Defaults to 1000, 10000 and 100000')
+        parser.add_argument('--sentences', type=int, default=10, help='Number of sentences per blog post')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of runs of every query')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def make_corpus(self, rng, num_of_posts, num_of_sentences):
+        corpus = []
+        for pk in range(1, num_of_posts + 1):
+            body = strip_html(make_description(rng, num_of_sentences), ' ')
+            if rng.random() < 0.01:
+                body += ' ' + ' '.join(rng.sample(RARE_WORDS, 2))
+            corpus.append((pk, f'Blog post {pk}', body))
+        return corpus
+
+    def time_queries(self, search, repeat):
+        """
+        Get a list of (mean time in milliseconds, number of matches) of every query
+        """
+        results = []
+        for query in QUERIES:
+            matches = len(search(query))
+            started = time.perf_counter()
+            for i in range(repeat):
+                search(query)
+            results.append(((time.perf_counter() - started) * 1000 / repeat, matches))
+        return results
+
+    def benchmark_icontains(self, corpus, repeat):
+        # the same conditions DatabaseSearchBackend has the ORM build
+        database = sqlite3.connect(':memory:')
+        database.execute('CREATE TABLE document (blogpost_id integer PRIMARY KEY, title text, body text)')
+        database.executemany('INSERT INTO document VALUES (?, ?, ?)', corpus)
+
+        def search(query):
+            terms = get_terms(query)
+            where = ' AND '.join(["(title LIKE ? OR body LIKE ?)"] * len(terms))
+            parameters = [f'%{term}%' for term in terms for i in range(2)]
+            return database.execute(f'SELECT blogpost_id FROM document WHERE {where}', parameters).fetchall()
+
+        try:
+            return self.time_queries(search, repeat)
+        finally:
+            database.close()
+
+    def benchmark_inverted_index(self, corpus, repeat):
+        title_boost = 3
+        documents = ((pk, get_terms(title) * title_boost + get_terms(body)) for pk, title, body in corpus)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'search.index')
+
+            started = time.perf_counter()
+            IndexSegment.write(path, documents)
+            build_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            index = InvertedIndex(IndexSegment.load(path))
+            load_time = (time.perf_counter() - started) * 1000
+
+            queries = self.time_queries(lambda query: index.search(get_terms(query)), repeat)
+            size = os.path.getsize(path)
+        return build_time, load_time, size, queries
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        for num_of_posts in options['posts'] or [1000, 10000, 100000]:
+            corpus = self.make_corpus(rng, num_of_posts, options['sentences'])
+
+            scanned = self.benchmark_icontains(corpus, options['repeat'])
+            build_time, load_time, size, indexed = self.benchmark_inverted_index(corpus, options['repeat'])
+
+            self.stdout.write(f'{num_of_posts} posts, index built in {build_time:.2f}s, '
+                              f'{size / 2 ** 20:.2f} MB, mapped in {load_time:.2f} ms')
+            self.stdout.write(f'{"query":<25} {"matches":>8} {"icontains ms":>13} {"index ms":>9} {"speedup":>8}')
+            for query, (scan_time, scan_matches), (query_time, matches) in zip(QUERIES, scanned, indexed):
+                # substrings match inside longer words, e.g. "war" in "award", so only the index may find fewer
+                if matches > scan_matches:
+                    self.stderr.write(f'The index found more posts than substring matching for {query!r}')
+                self.stdout.write(f'{query:<25} {matches:>8} {scan_time:>13.2f} {query_time:>9.2f} '
+                                  f'{scan_time / query_time if query_time else 0:>7.1f}x')
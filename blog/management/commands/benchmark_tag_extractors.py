@@ -0,0 +1,91 @@
+from collections import Counter
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.nlp import get_noun_extractor
+from blog.utils import strip_html
+
+
+EXTRACTORS = [
+    'blog.nlp.NLTKNounExtractor',
+    'blog.nlp.CachedLexiconNounExtractor',
+    'blog.nlp.StopWordExtractor',
+]
+
+NOUNS = ['guitar', 'album', 'concert', 'engine', 'road', 'city', 'museum', 'castle', 'phone', 'camera',
+         'movie', 'actor', 'dress', 'jacket', 'river', 'mountain', 'war', 'king', 'coffee', 'garden']
+ADJECTIVES = ['old', 'new', 'beautiful', 'loud', 'fast', 'quiet', 'famous', 'cheap', 'modern', 'huge']
+VERBS = ['visited', 'bought', 'loved', 'built', 'watched', 'sold', 'painted', 'found', 'repaired', 'praised']
+ADVERBS = ['quickly', 'finally', 'really', 'slowly', 'happily']
+
+SENTENCES = [
+    'The {adj} {noun} {verb} the {noun}.',
+    'We {adv} {verb} a {adj} {noun} near the {noun}.',
+    'My {noun} and her {noun} {verb} the {adj} {noun} in the {noun}.',
+    'Have you ever {verb} a {noun} with a {adj} {noun}?',
+]
+
+
+class RandomWords(dict):
+    """
+    Random words for sentence templates
+    """
+    def __init__(self, rng):
+        super().__init__()
+        self.rng = rng
+
+    def __missing__(self, key):
+        words = {'noun': NOUNS, 'adj': ADJECTIVES, 'verb': VERBS, 'adv': ADVERBS}[key]
+        return self.rng.choice(words)
+
+
+def make_description(rng, num_of_sentences):
+    """
+    Get a synthetic html description
+    """
+    sentences = [rng.choice(SENTENCES).format_map(RandomWords(rng)) for i in range(num_of_sentences)]
+    return '<p>' + ' '.join(sentences) + '</p>'
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a | b else 1
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput and tag quality of noun extractors on a synthetic corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=500, help='Number of synthetic blog posts')
+        parser.add_argument('--sentences', type=int, default=20, help='Number of sentences per blog post')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--extractor', action='append', dest='extractors',
+                            help='Dotted path of an extractor, may be repeated. Defaults to all bundled ones')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        corpus = [strip_html(make_description(rng, options['sentences'])) for i in range(options['posts'])]
+        num_of_words = sum(len(text.split()) for text in corpus)
+
+        results = {}
+        for path in options['extractors'] or EXTRACTORS:
+            extractor = get_noun_extractor(path)
+            extractor.extract(corpus[0]) # load models outside of the measurement
+
+            started = time.perf_counter()
+            nouns = [Counter(extractor.extract(text)) for text in corpus]
+            results[path] = (time.perf_counter() - started, nouns)
+
+        reference_path = (options['extractors'] or EXTRACTORS)[0]
+        reference_nouns = results[reference_path][1]
+        reference_tags = set(word for word, quantity in sum(reference_nouns, Counter()).most_common(30))
+
+        self.stdout.write(f'{len(corpus)} posts, {num_of_words} words, quality is compared to {reference_path}')
+        self.stdout.write(f'{"extractor":<40} {"posts/s":>10} {"words/s":>12} {"top-30 overlap":>15} {"post overlap":>13}')
+        for path, (elapsed, nouns) in results.items():
+            tags = set(word for word, quantity in sum(nouns, Counter()).most_common(30))
+            tag_overlap = len(tags & reference_tags) / len(tags | reference_tags) if tags | reference_tags else 1
+            post_overlap = sum(jaccard(set(a), set(b)) for a, b in zip(nouns, reference_nouns)) / len(corpus)
+            self.stdout.write(f'{path:<40} {len(corpus) / elapsed:>10.0f} {num_of_words / elapsed:>12.0f} '
+                              f'{tag_overlap:>15.2f} {post_overlap:>13.2f}')
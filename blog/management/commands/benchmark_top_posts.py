@@ -0,0 +1,97 @@
+from datetime import timedelta
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from blog.models import BlogPost, PostStat
+from blog.stats import (POST_STAT_HOURLY_RETENTION, TOP_POST_WINDOWS, get_day_start, get_hour_start, get_ranked_posts,
+                        get_top_posts, get_window_totals, rank_top_posts)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time live and ranked top posts over windows of synthetic post stats, nothing is kept in the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000, help='Number of synthetic blog posts')
+        parser.add_argument('--days', type=int, default=90, help='Number of days with a daily row per blog post')
+        parser.add_argument('--activity', type=float, default=0.5,
+                            help='Share of blog posts with an hourly row in every hour of the hourly retention')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of runs of every window')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--explain', action='store_true', help='Show the plan of the widest window')
+
+    def make_stats(self, rng, options):
+        """
+        Create synthetic blog posts with daily rows of compacted days and hourly rows of recent ones,
+        return the number of rows
+        """
+        blogposts = BlogPost.objects.bulk_create([
+            BlogPost(title=f'Benchmark {i}', description='<p>A benchmark.</p>', slug=f'benchmark-top-posts-{i}')
+            for i in range(options['posts'])
+        ], batch_size=1000)
+        # bulk_create only sets primary keys on some databases
+        blogpost_ids = list(BlogPost.objects.filter(slug__startswith='benchmark-top-posts-').values_list('pk', flat=True))
+
+        today = get_day_start()
+        hourly_since = today - timedelta(days=POST_STAT_HOURLY_RETENTION)
+        rows = 0
+
+        def make_stat(pk, period, start):
+            return PostStat(blogpost_id=pk, period=period, start=start, views=rng.randrange(100),
+                            likes=rng.randrange(5), dislikes=rng.randrange(2), comments=rng.randrange(3))
+
+        for day in range(1, options['days'] + 1):
+            start = today - timedelta(days=day)
+            if start < hourly_since:
+                rows += len(PostStat.objects.bulk_create([make_stat(pk, PostStat.DAY, start) for pk in blogpost_ids],
+                                                         batch_size=1000))
+
+        hour = get_hour_start(hourly_since)
+        while hour <= timezone.now():
+            active = [pk for pk in blogpost_ids if rng.random() < options['activity']]
+            rows += len(PostStat.objects.bulk_create([make_stat(pk, PostStat.HOUR, hour) for pk in active],
+                                                     batch_size=1000))
+            hour += timedelta(hours=1)
+
+        return len(blogposts), rows
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                num_of_blogposts, rows = self.make_stats(rng, options)
+                self.stdout.write(f'{num_of_blogposts} posts, {rows} stat rows created in '
+                                  f'{time.perf_counter() - started:.2f}s')
+
+                started = time.perf_counter()
+                rank_top_posts()
+                self.stdout.write(f'Windows ranked in {time.perf_counter() - started:.2f}s')
+
+                self.stdout.write(f'{"window":<10} {"live ms":>9} {"ranked ms":>9}')
+                for days in TOP_POST_WINDOWS:
+                    start = timezone.now() - timedelta(days=days)
+                    timings = []
+                    for top_posts in (lambda: get_top_posts(start), lambda: get_ranked_posts(days)):
+                        top_posts()
+                        started = time.perf_counter()
+                        for i in range(options['repeat']):
+                            top_posts()
+                        timings.append((time.perf_counter() - started) * 1000 / options['repeat'])
+                    self.stdout.write(f'{days:>4} days {timings[0]:>9.2f} {timings[1]:>9.2f}')
+
+                if options['explain']:
+                    start = timezone.now() - timedelta(days=TOP_POST_WINDOWS[-1])
+                    self.stdout.write(get_window_totals(start)[:10].explain())
+
+                raise Rollback
+        except Rollback:
+            pass
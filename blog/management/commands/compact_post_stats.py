@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.stats import POST_STAT_HOURLY_RETENTION, compact_post_stats
+
+
+class Command(BaseCommand):
+    help = 'Merge hourly blog post stats older than a number of days into daily rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=POST_STAT_HOURLY_RETENTION,
+                            help='Number of recent days to keep hourly rows of')
+
+    def handle(self, *args, **options):
+        deleted, created = compact_post_stats(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(f'Compacted {deleted} hourly row(s) into {created} daily row(s)')
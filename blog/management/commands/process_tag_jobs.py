@@ -0,0 +1,65 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blog.nlp import warmup
+from blog.search import refresh_search_index
+from blog.stats import compact_post_stats, refresh_trending_posts
+from blog.tasks import delete_orphaned_terms, process_tag_jobs, requeue_stale_tag_jobs
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('Run queued tag recomputation jobs, rewrite a stale search index, refresh trending posts, '
+            'compact stats and subtract terms of deleted blog posts periodically')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--sleep', type=float, default=2, help='Seconds to wait between queue polls')
+        parser.add_argument('--stats-interval', type=float, default=300,
+                            help='Seconds between trending posts refreshes, stats compactions and '
+                                 'checks for terms of deleted blog posts')
+        parser.add_argument('--search-interval', type=float, default=30,
+                            help='Seconds between checks of the search index')
+
+    def run_step(self, step):
+        """
+        Run a step of the loop, an error is logged and the step runs again next time
+        """
+        try:
+            return step()
+        except Exception:
+            logger.exception('%s failed', step.__name__)
+            # a broken connection is replaced on the next query
+            close_old_connections()
+            return None
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Tag extractor loaded in {warmup():.2f}s')
+        stats_refreshed = search_checked = None
+
+        while True:
+            self.run_step(requeue_stale_tag_jobs)
+            processed = self.run_step(process_tag_jobs)
+            if processed:
+                self.stdout.write(f'Processed {processed} tag job(s)')
+
+            if search_checked is None or time.monotonic() - search_checked >= options['search_interval']:
+                if self.run_step(refresh_search_index):
+                    self.stdout.write('Search index rewritten')
+                search_checked = time.monotonic()
+
+            if stats_refreshed is None or time.monotonic() - stats_refreshed >= options['stats_interval']:
+                # terms left by deletions whose tags couldn't be updated on commit, an anti-join of all terms
+                self.run_step(delete_orphaned_terms)
+                self.run_step(compact_post_stats)
+                self.run_step(refresh_trending_posts)
+                stats_refreshed = time.monotonic()
+
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
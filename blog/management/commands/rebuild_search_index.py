@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from blog.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild search documents of all blog posts'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Indexed {rebuild_search_index()} blog post(s)')
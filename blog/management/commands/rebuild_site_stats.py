@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from blog.stats import get_site_stats, rebuild_site_stats
+from blog.utils import invalidate_index_cache
+
+
+class Command(BaseCommand):
+    help = 'Recount site, category and contributor stats, e.g. after loading fixtures'
+
+    def handle(self, *args, **options):
+        rebuild_site_stats()
+        invalidate_index_cache('total_num', 'top_contributors', 'most_pop_cats')
+        stats = get_site_stats()
+        self.stdout.write(f'Counted {stats.blog_posts} blog post(s), {stats.bloggers} blogger(s) '
+                          f'and {stats.comments} comment(s)')
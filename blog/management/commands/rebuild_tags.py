@@ -0,0 +1,27 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.locks import run_coalesced
+from blog.utils import rebuild_tags, TAG_REBUILD_TIMEOUT
+
+
+class Command(BaseCommand):
+    help = 'Re-index nouns of all blog posts and rebuild tags from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Number of worker processes, defaults to the number of cores')
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help='Number of blog posts sent to a worker at once')
+
+    def handle(self, *args, **options):
+        def rebuild():
+            started = time.perf_counter()
+            num_of_blog_posts = rebuild_tags(workers=options['workers'], chunk_size=options['chunk_size'])
+            self.stdout.write(f'Indexed {num_of_blog_posts} blog post(s) in {time.perf_counter() - started:.1f}s')
+
+        # rebuilds requested while one is running are merged into a single follow-up rebuild
+        if not run_coalesced('rebuild-tags', rebuild, timeout=TAG_REBUILD_TIMEOUT):
+            self.stdout.write('A rebuild is running already, it will run once more when done')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from blog.stats import refresh_trending_posts
+
+
+class Command(BaseCommand):
+    help = 'Re-score trending blog posts with activity since the last refresh'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Re-score all blog posts with recent activity')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Re-scored {refresh_trending_posts(full=options["full"])} blog post(s)')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from blog.search_cache import search_cache
+
+
+class Command(BaseCommand):
+    help = 'Show the hit ratio of the search result cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Start counting hits and misses again')
+
+    def handle(self, *args, **options):
+        stats = search_cache.get_stats()
+        self.stdout.write(f'{stats["hits"]} hit(s), {stats["misses"]} miss(es), hit ratio {stats["ratio"]:.1%}')
+
+        if options['reset']:
+            search_cache.reset_stats()
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.9 on 2026-10-18 12:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0033_postterm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('blogpost', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='blog.blogpost')),
+            ],
+            options={
+                'ordering': ['run_after'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tagjob',
+            index=models.Index(fields=['status', 'run_after'], name='blog_tagjob_status_9468df_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tagjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('blogpost',), name='unique_pending_tagjob'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.9 on 2026-10-18 12:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0034_tagjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NounCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(help_text='SHA-256 of the analyzed description', max_length=64, unique=True)),
+                ('nouns', models.JSONField(default=dict)),
+                ('last_used', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
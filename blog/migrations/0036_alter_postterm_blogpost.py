@@ -0,0 +1,19 @@
+# Generated by Django 3.2.9 on 2026-10-18 12:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0035_nouncache'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postterm',
+            name='blogpost',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='blog.blogpost'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.9 on 2026-10-18 13:00
+
+import blog.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0036_alter_postterm_blogpost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='anonymous_visitors',
+            field=models.BinaryField(default=blog.models.get_empty_sketch, max_length=1024),
+        ),
+    ]
@@ -0,0 +1,45 @@
+import hashlib
+
+from django.db import migrations
+
+
+# a copy of the blog.hll.HyperLogLog sketch as of this migration, 2 ** 10 one-byte registers
+PRECISION = 10
+
+def sketch_session_ids(session_ids):
+    registers = bytearray(1 << PRECISION)
+    for session_id in session_ids:
+        hashed = int.from_bytes(hashlib.blake2b(session_id.encode(), digest_size=8).digest(), 'big')
+        index = hashed >> (64 - PRECISION)
+        rest = hashed & ((1 << (64 - PRECISION)) - 1)
+        registers[index] = max(registers[index], 64 - PRECISION - rest.bit_length() + 1)
+    return bytes(registers)
+
+def convert_anonymous_users(apps, schema_editor):
+    BlogPost = apps.get_model('blog', 'BlogPost')
+
+    blogposts = []
+    for blogpost in BlogPost.objects.only('anonymous_users').iterator(chunk_size=500):
+        blogpost.anonymous_visitors = sketch_session_ids(blogpost.anonymous_users)
+        blogposts.append(blogpost)
+        # every chunk is written before the next one is read, the session lists are long
+        if len(blogposts) == 500:
+            BlogPost.objects.bulk_update(blogposts, ['anonymous_visitors'])
+            blogposts = []
+
+    BlogPost.objects.bulk_update(blogposts, ['anonymous_visitors'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0037_blogpost_anonymous_visitors'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_anonymous_users, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='blogpost',
+            name='anonymous_users',
+        ),
+    ]
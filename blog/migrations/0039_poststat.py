@@ -0,0 +1,39 @@
+# Generated by Django 3.2.9 on 2026-10-18 13:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0038_convert_anonymous_users'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], default='hour', max_length=4)),
+                ('start', models.DateTimeField(help_text='Start of the hour or the day the counts belong to')),
+                ('views', models.IntegerField(default=0)),
+                ('likes', models.IntegerField(default=0)),
+                ('dislikes', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('blogpost', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='blog.blogpost')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='poststat',
+            index=models.Index(fields=['start', 'blogpost'], name='blog_postst_start_53c805_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poststat',
+            index=models.Index(fields=['blogpost', 'start'], name='blog_postst_blogpos_c62c45_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poststat',
+            index=models.Index(fields=['period', 'start'], name='blog_postst_period_37b9b2_idx'),
+        ),
+    ]
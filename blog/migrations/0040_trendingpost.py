@@ -0,0 +1,26 @@
+# Generated by Django 3.2.9 on 2026-10-18 13:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0039_poststat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('blogpost', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='blog.blogpost')),
+                ('score', models.FloatField(db_index=True, help_text='Log of the time-decayed activity, comparable between posts')),
+                ('updated', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-score'],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+
+def convert_liked_disliked_users(apps, schema_editor):
+    BlogPost = apps.get_model('blog', 'BlogPost')
+    User = apps.get_model('blog', 'User')
+    Vote = apps.get_model('blog', 'Vote')
+
+    user_ids = set(User.objects.values_list('pk', flat=True))
+    blogposts = []
+    for blogpost in BlogPost.objects.only('liked_disliked_users').iterator():
+        users = blogpost.liked_disliked_users or {}
+        # a user could end up in both lists, the like wins like it did on the detail page
+        votes = {int(user_id): -1 for user_id in users.get('disliked_users', []) if user_id.isdigit()}
+        votes.update({int(user_id): 1 for user_id in users.get('liked_users', []) if user_id.isdigit()})
+        votes = {user_id: value for user_id, value in votes.items() if user_id in user_ids}
+
+        Vote.objects.bulk_create([Vote(blogpost_id=blogpost.pk, user_id=user_id, value=value)
+                                  for user_id, value in votes.items()])
+        blogpost.likes = sum(value == 1 for value in votes.values())
+        blogpost.dislikes = sum(value == -1 for value in votes.values())
+        blogposts.append(blogpost)
+
+    BlogPost.objects.bulk_update(blogposts, ['likes', 'dislikes'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0041_vote'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='blogpost',
+            name='dislikes',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='blogpost',
+            name='likes',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(convert_liked_disliked_users, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.9 on 2026-10-18 13:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0043_remove_blogpost_liked_disliked_users'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('blogpost', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='blog.blogpost')),
+                ('title', models.CharField(max_length=100)),
+                ('body', models.TextField(help_text='Blog post description without html')),
+            ],
+        ),
+    ]
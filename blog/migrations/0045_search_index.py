@@ -0,0 +1,85 @@
+import html
+import re
+
+from django.db import migrations
+
+
+POSTGRES_INDEX = [
+    """ALTER TABLE blog_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+           setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+           setweight(to_tsvector('english', coalesce(body, '')), 'B')) STORED""",
+    "CREATE INDEX blog_searchdocument_vector_idx ON blog_searchdocument USING gin (search_vector)",
+]
+
+SQLITE_INDEX = [
+    """CREATE VIRTUAL TABLE blog_searchdocument_fts USING fts5(
+           title, body, content='blog_searchdocument', content_rowid='blogpost_id', tokenize='porter unicode61')""",
+    """CREATE TRIGGER blog_searchdocument_fts_insert AFTER INSERT ON blog_searchdocument BEGIN
+           INSERT INTO blog_searchdocument_fts(rowid, title, body) VALUES (new.blogpost_id, new.title, new.body);
+       END""",
+    """CREATE TRIGGER blog_searchdocument_fts_delete AFTER DELETE ON blog_searchdocument BEGIN
+           INSERT INTO blog_searchdocument_fts(blog_searchdocument_fts, rowid, title, body)
+           VALUES ('delete', old.blogpost_id, old.title, old.body);
+       END""",
+    """CREATE TRIGGER blog_searchdocument_fts_update AFTER UPDATE ON blog_searchdocument BEGIN
+           INSERT INTO blog_searchdocument_fts(blog_searchdocument_fts, rowid, title, body)
+           VALUES ('delete', old.blogpost_id, old.title, old.body);
+           INSERT INTO blog_searchdocument_fts(rowid, title, body) VALUES (new.blogpost_id, new.title, new.body);
+       END""",
+]
+
+
+def strip_html(text):
+    # a copy of blog.utils.strip_html as of this migration
+    text = re.sub(r'<[^<]+?>', ' ', text, flags=re.MULTILINE)
+    return re.sub(r"(&\S+;)", lambda match: html.unescape(match.group(0)), text)
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite' and not has_fts5(connection):
+        # blog.search falls back to the inverted index backend
+        return
+
+    statements = {'postgresql': POSTGRES_INDEX, 'sqlite': SQLITE_INDEX}.get(connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE blog_searchdocument DROP COLUMN search_vector')
+    elif vendor == 'sqlite' and has_fts5(schema_editor.connection):
+        for trigger in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER blog_searchdocument_fts_{trigger}')
+        schema_editor.execute('DROP TABLE blog_searchdocument_fts')
+
+def index_blogposts(apps, schema_editor):
+    BlogPost = apps.get_model('blog', 'BlogPost')
+    SearchDocument = apps.get_model('blog', 'SearchDocument')
+
+    documents = []
+    for pk, title, description in BlogPost.objects.values_list('pk', 'title', 'description').iterator(chunk_size=500):
+        documents.append(SearchDocument(blogpost_id=pk, title=title, body=strip_html(description)))
+        # every chunk is written before the next one is read, descriptions are long
+        if len(documents) == 500:
+            SearchDocument.objects.bulk_create(documents)
+            documents = []
+
+    SearchDocument.objects.bulk_create(documents)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0044_searchdocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(index_blogposts, migrations.RunPython.noop),
+    ]
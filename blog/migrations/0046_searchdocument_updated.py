@@ -0,0 +1,51 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+SQLITE_TRIGGERS = [
+    """CREATE TRIGGER blog_searchdocument_fts_insert AFTER INSERT ON blog_searchdocument BEGIN
+           INSERT INTO blog_searchdocument_fts(rowid, title, body) VALUES (new.blogpost_id, new.title, new.body);
+       END""",
+    """CREATE TRIGGER blog_searchdocument_fts_delete AFTER DELETE ON blog_searchdocument BEGIN
+           INSERT INTO blog_searchdocument_fts(blog_searchdocument_fts, rowid, title, body)
+           VALUES ('delete', old.blogpost_id, old.title, old.body);
+       END""",
+    """CREATE TRIGGER blog_searchdocument_fts_update AFTER UPDATE OF title, body ON blog_searchdocument BEGIN
+           INSERT INTO blog_searchdocument_fts(blog_searchdocument_fts, rowid, title, body)
+           VALUES ('delete', old.blogpost_id, old.title, old.body);
+           INSERT INTO blog_searchdocument_fts(rowid, title, body) VALUES (new.blogpost_id, new.title, new.body);
+       END""",
+]
+
+
+def recreate_fts_triggers(apps, schema_editor):
+    # SQLite rebuilds the table to change its columns, which drops its triggers
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'blog_searchdocument_fts'")
+        if not cursor.fetchone():
+            return
+
+    for trigger in ('insert', 'delete', 'update'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS blog_searchdocument_fts_{trigger}')
+    for statement in SQLITE_TRIGGERS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0045_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, recreate_fts_triggers),
+        migrations.AddField(
+            model_name='searchdocument',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(recreate_fts_triggers, migrations.RunPython.noop),
+    ]
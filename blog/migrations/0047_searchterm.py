@@ -0,0 +1,32 @@
+# Generated by Django 3.2.9 on 2026-10-18 13:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0046_searchdocument_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('word', models.CharField(max_length=30, primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TermTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='blog.searchterm')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='termtrigram',
+            constraint=models.UniqueConstraint(fields=('trigram', 'term'), name='unique_term_trigram'),
+        ),
+    ]
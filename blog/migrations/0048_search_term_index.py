@@ -0,0 +1,49 @@
+import re
+
+from django.db import migrations
+
+
+# copies of blog.trigrams helpers as of this migration
+def get_trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def is_search_term(word):
+    return 3 <= len(word) <= 30 and not word.isdigit()
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute('CREATE INDEX blog_searchterm_word_trgm_idx ON blog_searchterm USING gin (word gin_trgm_ops)')
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX blog_searchterm_word_trgm_idx')
+
+def add_search_terms(apps, schema_editor):
+    SearchDocument = apps.get_model('blog', 'SearchDocument')
+    SearchTerm = apps.get_model('blog', 'SearchTerm')
+    Tag = apps.get_model('blog', 'Tag')
+    TermTrigram = apps.get_model('blog', 'TermTrigram')
+
+    words = {word.lower() for word in Tag.objects.values_list('word', flat=True)}
+    for title in SearchDocument.objects.values_list('title', flat=True).iterator():
+        words.update(re.findall(r'\w+', title.lower()))
+    words = [word for word in words if is_search_term(word)]
+
+    SearchTerm.objects.bulk_create([SearchTerm(word=word) for word in words], batch_size=1000)
+    if schema_editor.connection.vendor != 'postgresql':
+        TermTrigram.objects.bulk_create([TermTrigram(term_id=word, trigram=trigram)
+                                         for word in words for trigram in get_trigrams(word)], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0047_searchterm'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(add_search_terms, migrations.RunPython.noop),
+    ]
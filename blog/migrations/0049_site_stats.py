@@ -0,0 +1,46 @@
+# Generated by Django 3.2.9 on 2026-10-18 13:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0048_search_term_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('category', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('blog_posts', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'category stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='ContributorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='blog.blogauthor')),
+                ('blog_posts', models.IntegerField(db_index=True, default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'contributor stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='SiteStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blog_posts', models.IntegerField(default=0)),
+                ('bloggers', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'site stats',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def fill_site_stats(apps, schema_editor):
+    BlogAuthor = apps.get_model('blog', 'BlogAuthor')
+    BlogPost = apps.get_model('blog', 'BlogPost')
+    CategoryStats = apps.get_model('blog', 'CategoryStats')
+    Comment = apps.get_model('blog', 'Comment')
+    ContributorStats = apps.get_model('blog', 'ContributorStats')
+    SiteStats = apps.get_model('blog', 'SiteStats')
+
+    SiteStats.objects.create(pk=1, blog_posts=BlogPost.objects.count(), bloggers=BlogAuthor.objects.count(),
+                             comments=Comment.objects.count())
+    CategoryStats.objects.bulk_create([
+        CategoryStats(category=row['category'], blog_posts=row['blog_posts'])
+        for row in BlogPost.objects.order_by().values('category').annotate(blog_posts=Count('pk'))
+    ])
+    ContributorStats.objects.bulk_create([
+        ContributorStats(author_id=pk, blog_posts=blog_posts)
+        for pk, blog_posts in BlogAuthor.objects.annotate(blog_posts=Count('blogpost')).values_list('pk', 'blog_posts')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0049_site_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_site_stats, migrations.RunPython.noop),
+    ]
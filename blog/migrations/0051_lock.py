@@ -0,0 +1,22 @@
+# Generated by Django 3.2.9 on 2026-10-18 13:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0050_fill_site_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lock',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=32)),
+                ('expires', models.DateTimeField()),
+                ('rerun', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
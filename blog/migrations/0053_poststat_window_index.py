@@ -0,0 +1,21 @@
+# Generated by Django 3.2.9 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0052_pendingview'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='poststat',
+            name='blog_postst_period_37b9b2_idx',
+        ),
+        migrations.AddIndex(
+            model_name='poststat',
+            index=models.Index(fields=['period', 'start', 'blogpost', 'views', 'likes', 'dislikes', 'comments'], name='blog_postst_period_2a8793_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+# copies of blog.trigrams helpers as of this migration
+def get_trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def lowercase_search_terms(apps, schema_editor):
+    # tag words were added with their case, queries never matched them
+    SearchTerm = apps.get_model('blog', 'SearchTerm')
+    TermTrigram = apps.get_model('blog', 'TermTrigram')
+
+    words = [word for word in SearchTerm.objects.values_list('word', flat=True).iterator() if word != word.lower()]
+    if not words:
+        return
+
+    lowercased = {word.lower() for word in words}
+    SearchTerm.objects.filter(word__in=words).delete()
+    SearchTerm.objects.bulk_create([SearchTerm(word=word) for word in lowercased], ignore_conflicts=True,
+                                   batch_size=1000)
+    if schema_editor.connection.vendor != 'postgresql':
+        TermTrigram.objects.bulk_create([TermTrigram(term_id=word, trigram=trigram)
+                                         for word in lowercased for trigram in get_trigrams(word)],
+                                        ignore_conflicts=True, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0054_tag_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_search_terms, migrations.RunPython.noop),
+    ]
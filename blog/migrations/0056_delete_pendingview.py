@@ -0,0 +1,25 @@
+from django.db import migrations
+from django.db.models import F
+
+
+def add_pending_views(apps, schema_editor):
+    # views are buffered in the memory of every process now, the table is emptied into the blog posts
+    BlogPost = apps.get_model('blog', 'BlogPost')
+    PendingView = apps.get_model('blog', 'PendingView')
+
+    for pk, views in PendingView.objects.filter(views__gt=0).values_list('blogpost_id', 'views').iterator():
+        BlogPost.objects.filter(pk=pk).update(views=F('views') + views)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0055_lowercase_search_terms'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_pending_views, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='PendingView',
+        ),
+    ]
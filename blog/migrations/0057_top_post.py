@@ -0,0 +1,32 @@
+# Generated by Django 3.2.9 on 2026-10-18 14:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0056_delete_pendingview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('days', models.PositiveSmallIntegerField(help_text='Length of the window ending at the time of ranking')),
+                ('metric', models.CharField(max_length=10)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('total', models.IntegerField()),
+                ('blogpost', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='blog.blogpost')),
+            ],
+            options={
+                'ordering': ['days', 'metric', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='toppost',
+            constraint=models.UniqueConstraint(fields=('days', 'metric', 'rank'), name='unique_top_post_rank'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.contrib.auth.models import AbstractUser
 from django.db.models.fields import SlugField
 from django.db.models.fields.related import OneToOneField
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.text import slugify
 from django.contrib.sessions.models import Session
 
@@ -11,6 +12,8 @@ from imagekit.models import ImageSpecField
 from imagekit.processors import ResizeToFill, Thumbnail, ResizeToFit
 from tinymce.models import HTMLField
 
+from .hll import HyperLogLog
+
 
 # Create your models here.
 
@@ -19,6 +22,9 @@ class User(AbstractUser):
     is_blogger = models.BooleanField(default=False)
 
 
+def get_empty_sketch():
+    return HyperLogLog().to_bytes()
+
 class BlogPost(models.Model):
     """A class defining a blog model"""
 
@@ -28,12 +34,13 @@ class BlogPost(models.Model):
     author = models.ForeignKey('BlogAuthor', on_delete=models.SET_NULL, null=True)
     description = HTMLField(help_text='Type in blog post content')
     slug = SlugField(max_length=100, null=False, unique=True)
-    likes = models.CharField(max_length=10, default='0')
-    dislikes = models.CharField(max_length=10, default='0')
-    liked_disliked_users = models.JSONField(null=False, default=dict)
+    # counts of Vote rows, kept in step with them by toggle_vote
+    likes = models.IntegerField(default=0)
+    dislikes = models.IntegerField(default=0)
     viewed_users = models.ManyToManyField(User, blank=True)
     views = models.IntegerField(default=0)
-    anonymous_users = models.JSONField(null=False, default=list)
+    # a HyperLogLog sketch of anonymous visitors' session keys
+    anonymous_visitors = models.BinaryField(max_length=1024, default=get_empty_sketch)
     image = models.ImageField(upload_to='blog/images', default='blog/images/blog-default-image.jpg', null=True)
     image_thumbnail = ImageSpecField(source='image',
                                     processors=[ResizeToFit(500, 300)],
@@ -77,6 +84,10 @@ class BlogPost(models.Model):
         return ', '.join(user.username for user in self.viewed_users.all())
     display_viewed_users.short_description = 'Viewed users'
 
+    def count_anonymous_visitors(self):
+        return HyperLogLog.from_bytes(self.anonymous_visitors).count()
+    count_anonymous_visitors.short_description = 'Anonymous visitors'
+
     def get_absolute_url(self):
         """Returns the url to access a particular instance of Blog post."""
         return reverse('blog:blog-detail', kwargs={'slug': self.slug})
@@ -138,6 +149,7 @@ class Tag(models.Model):
     word = models.CharField(max_length=20, unique=True, default=get_default_uuid)
     blogposts = models.ManyToManyField(BlogPost, blank=True)
     quantity = models.IntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
 
     def display_blogposts(self):
         return ', '.join(str(blogpost) for blogpost in self.blogposts.all())
@@ -146,3 +158,286 @@ class Tag(models.Model):
     def __str__(self):
         """String for representing the Tag object (in Admin site etc.)."""
         return str(self.word)
+
+
+class PostTerm(models.Model):
+    """A class defining a per-post noun frequency model"""
+
+    # Fields
+    # terms outlive a deleted blog post until its tags are updated on commit, see blog.signals
+    blogpost = models.ForeignKey(BlogPost, on_delete=models.DO_NOTHING, db_constraint=False)
+    word = models.CharField(max_length=20)
+    quantity = models.IntegerField(default=0)
+
+    # Metadata
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['blogpost', 'word'], name='unique_blogpost_word'),
+        ]
+
+    def __str__(self):
+        """String for representing the PostTerm object (in Admin site etc.)."""
+        return f'{self.word} ({self.quantity})'
+
+
+class TagJob(models.Model):
+    """A class defining a queued tag recomputation job"""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+
+    JOB_STATUSES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    )
+
+    # Fields
+    blogpost = models.ForeignKey(BlogPost, on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=JOB_STATUSES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    # Metadata
+    class Meta:
+        ordering = ['run_after']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+        constraints = [
+            # at most one pending job per blog post, later saves are merged into it
+            models.UniqueConstraint(fields=['blogpost'], condition=models.Q(status='pending'),
+                                    name='unique_pending_tagjob'),
+        ]
+
+    def __str__(self):
+        """String for representing the TagJob object (in Admin site etc.)."""
+        return f'{self.blogpost_id} ({self.status})'
+
+
+class NounCache(models.Model):
+    """A class defining a cached noun analysis of a blog post description"""
+
+    # Fields
+    digest = models.CharField(max_length=64, unique=True, help_text='SHA-256 of the analyzed description')
+    nouns = models.JSONField(null=False, default=dict)
+    last_used = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        """String for representing the NounCache object (in Admin site etc.)."""
+        return self.digest
+
+
+class PostStat(models.Model):
+    """A class defining engagement counts of a blog post over an hour or a day"""
+
+    HOUR = 'hour'
+    DAY = 'day'
+
+    PERIODS = (
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    )
+
+    # Fields
+    blogpost = models.ForeignKey(BlogPost, on_delete=models.CASCADE)
+    period = models.CharField(max_length=4, choices=PERIODS, default=HOUR)
+    start = models.DateTimeField(help_text='Start of the hour or the day the counts belong to')
+    views = models.IntegerField(default=0)
+    likes = models.IntegerField(default=0)
+    dislikes = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+
+    # Metadata
+    class Meta:
+        # rows are only appended, several rows of the same post and period are summed
+        indexes = [
+            # top posts over a window
+            models.Index(fields=['start', 'blogpost']),
+            # history of a post
+            models.Index(fields=['blogpost', 'start']),
+            # top posts over a window and compaction of hourly rows, covering so the table isn't read
+            models.Index(fields=['period', 'start', 'blogpost', 'views', 'likes', 'dislikes', 'comments']),
+        ]
+
+    def __str__(self):
+        """String for representing the PostStat object (in Admin site etc.)."""
+        return f'{self.blogpost_id} ({self.period} of {self.start})'
+
+
+class TopPost(models.Model):
+    """A class defining a precomputed rank of a blog post over a window of recent days, see blog.stats"""
+
+    # Fields
+    days = models.PositiveSmallIntegerField(help_text='Length of the window ending at the time of ranking')
+    metric = models.CharField(max_length=10)
+    rank = models.PositiveSmallIntegerField()
+    blogpost = models.ForeignKey(BlogPost, on_delete=models.CASCADE)
+    total = models.IntegerField()
+
+    # Metadata
+    class Meta:
+        ordering = ['days', 'metric', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['days', 'metric', 'rank'], name='unique_top_post_rank'),
+        ]
+
+    def __str__(self):
+        """String for representing the TopPost object (in Admin site etc.)."""
+        return f'{self.blogpost_id} (#{self.rank} by {self.metric} over {self.days} days)'
+
+
+class TrendingPost(models.Model):
+    """A class defining a precomputed trending score of a blog post"""
+
+    # Fields
+    blogpost = models.OneToOneField(BlogPost, on_delete=models.CASCADE, primary_key=True)
+    score = models.FloatField(db_index=True, help_text='Log of the time-decayed activity, comparable between posts')
+    updated = models.DateTimeField(default=timezone.now, db_index=True)
+
+    # Metadata
+    class Meta:
+        ordering = ['-score']
+
+    def __str__(self):
+        """String for representing the TrendingPost object (in Admin site etc.)."""
+        return f'{self.blogpost_id} ({self.score:.2f})'
+
+
+class Lock(models.Model):
+    """A class defining a lock shared by every process, see blog.locks"""
+
+    # Fields
+    name = models.CharField(max_length=100, primary_key=True)
+    token = models.CharField(max_length=32)
+    expires = models.DateTimeField()
+    rerun = models.BooleanField(default=False)
+
+    def __str__(self):
+        """String for representing the Lock object (in Admin site etc.)."""
+        return self.name
+
+
+class SiteStats(models.Model):
+    """A class defining site totals shown on the index page, a single row kept current by blog.signals"""
+
+    # Fields
+    blog_posts = models.IntegerField(default=0)
+    bloggers = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'site stats'
+
+    def __str__(self):
+        """String for representing the SiteStats object (in Admin site etc.)."""
+        return f'{self.blog_posts} blog posts, {self.bloggers} bloggers, {self.comments} comments'
+
+
+class CategoryStats(models.Model):
+    """A class defining the number of blog posts of a category, kept current by blog.signals"""
+
+    # Fields
+    category = models.CharField(max_length=20, primary_key=True)
+    blog_posts = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'category stats'
+
+    def __str__(self):
+        """String for representing the CategoryStats object (in Admin site etc.)."""
+        return f'{self.category} ({self.blog_posts})'
+
+
+class ContributorStats(models.Model):
+    """A class defining the number of blog posts of a blogger, kept current by blog.signals"""
+
+    # Fields
+    author = models.OneToOneField(BlogAuthor, on_delete=models.CASCADE, primary_key=True)
+    blog_posts = models.IntegerField(default=0, db_index=True)
+
+    class Meta:
+        verbose_name_plural = 'contributor stats'
+
+    def __str__(self):
+        """String for representing the ContributorStats object (in Admin site etc.)."""
+        return f'{self.author_id} ({self.blog_posts})'
+
+
+class Vote(models.Model):
+    """A class defining a like or a dislike of a blog post by a user"""
+
+    LIKE = 1
+    DISLIKE = -1
+
+    VALUES = (
+        (LIKE, 'Like'),
+        (DISLIKE, 'Dislike'),
+    )
+
+    # Fields
+    blogpost = models.ForeignKey(BlogPost, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    value = models.SmallIntegerField(choices=VALUES)
+    created = models.DateTimeField(auto_now_add=True)
+
+    # Metadata
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['blogpost', 'user'], name='unique_vote'),
+        ]
+
+    def __str__(self):
+        """String for representing the Vote object (in Admin site etc.)."""
+        return f'{self.user_id} {self.get_value_display().lower()}s {self.blogpost_id}'
+
+
+class SearchDocument(models.Model):
+    """A class defining the searchable plain text of a blog post"""
+
+    # Fields
+    blogpost = models.OneToOneField(BlogPost, on_delete=models.CASCADE, primary_key=True)
+    title = models.CharField(max_length=100)
+    body = models.TextField(help_text='Blog post description without html')
+    updated = models.DateTimeField(auto_now=True, db_index=True)
+
+    # the full-text index itself is database specific, it is created by
+    # the 0045_search_index migration and queried by blog.search backends
+
+    def __str__(self):
+        """String for representing the SearchDocument object (in Admin site etc.)."""
+        return self.title
+
+
+class SearchTerm(models.Model):
+    """A class defining a word of blog post titles or tags, misspelled search words are matched against them"""
+
+    # Fields
+    word = models.CharField(max_length=30, primary_key=True)
+
+    # on PostgreSQL words are matched by a pg_trgm index created by
+    # the 0048_search_term_index migration, elsewhere by their trigrams
+
+    def __str__(self):
+        """String for representing the SearchTerm object (in Admin site etc.)."""
+        return self.word
+
+
+class TermTrigram(models.Model):
+    """A class defining a trigram of a search term, padded like pg_trgm pads them"""
+
+    # Fields
+    trigram = models.CharField(max_length=3)
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['trigram', 'term'], name='unique_term_trigram'),
+        ]
+
+    def __str__(self):
+        """String for representing the TermTrigram object (in Admin site etc.)."""
+        return f'{self.trigram!r} of {self.term_id}'
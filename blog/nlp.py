@@ -0,0 +1,205 @@
+from functools import lru_cache
+import logging
+import re
+import threading
+import time
+
+import django
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+class NLTKModels:
+    """
+    A holder of NLTK tokenizer and tagger models loaded once per process
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sent_tokenizer = None
+        self._word_tokenizer = None
+        self._tagger = None
+        self.load_time = None
+        self.calls = 0
+        self.call_time = 0.0
+
+    @property
+    def loaded(self):
+        return self._tagger is not None
+
+    def load(self):
+        """
+        Load the punkt tokenizer and the averaged perceptron tagger unless they are loaded
+        """
+        if self.loaded:
+            return
+
+        with self._lock:
+            if self.loaded:
+                return
+
+            started = time.perf_counter()
+            # nltk itself is slow to import, so it isn't imported before it's needed
+            import nltk
+            from nltk.tag.perceptron import PerceptronTagger
+            from nltk.tokenize.destructive import NLTKWordTokenizer
+
+            nltk_data = str(getattr(settings, 'NLTK_DATA', ''))
+            if nltk_data and nltk_data not in nltk.data.path:
+                nltk.data.path.append(nltk_data)
+
+            self._sent_tokenizer = nltk.data.load('tokenizers/punkt/english.pickle')
+            self._word_tokenizer = NLTKWordTokenizer()
+            self._tagger = PerceptronTagger()
+            self.load_time = time.perf_counter() - started
+
+        logger.info('NLTK models loaded in %.3fs', self.load_time)
+
+    def tokenize(self, text):
+        """
+        Split a text into sentences of tokens like nltk.word_tokenize
+        """
+        self.load()
+        return [self._word_tokenizer.tokenize(sentence) for sentence in self._sent_tokenizer.tokenize(text)]
+
+    def tag(self, tokens):
+        """
+        Tag tokens with parts of speech like nltk.pos_tag
+        """
+        self.load()
+        return self._tagger.tag(tokens)
+
+    def pos_tag(self, text):
+        """
+        Tokenize a text and tag its tokens with parts of speech
+        """
+        self.load()
+
+        started = time.perf_counter()
+        tagged = self.tag([token for sentence in self.tokenize(text) for token in sentence])
+
+        with self._lock:
+            self.calls += 1
+            self.call_time += time.perf_counter() - started
+
+        return tagged
+
+    def stats(self):
+        """
+        Get load time and per-call latency, in seconds
+        """
+        return {
+            'load_time': self.load_time,
+            'calls': self.calls,
+            'mean_call_time': self.call_time / self.calls if self.calls else None,
+        }
+
+
+nltk_models = NLTKModels()
+
+
+class NounExtractor:
+    """
+    A base class of noun extractors used for tags
+    """
+
+    def extract(self, text):
+        """
+        Get a list of nouns used in a plain text, in order of appearance
+        """
+        raise NotImplementedError
+
+    def warmup(self):
+        """
+        Load whatever the extractor needs ahead of the first text
+        """
+
+
+class NLTKNounExtractor(NounExtractor):
+    """
+    Nouns tagged by the NLTK averaged perceptron tagger, the slowest and most accurate extractor
+    """
+
+    def extract(self, text):
+        return [word for word, tg in nltk_models.pos_tag(text) if tg.startswith('N')]
+
+    def warmup(self):
+        nltk_models.load()
+
+
+class StopWordExtractor(NounExtractor):
+    """
+    Keywords rather than nouns: words which aren't stop words or adverbs, no tagging is done at all.
+    The fastest extractor, verbs and adjectives become tags too
+    """
+    word_regex = re.compile(r"[^\W\d_][\w'-]*[^\W_]")
+    adverb_regex = re.compile(r'\w{3,}ly$')
+
+    def __init__(self):
+        from stop_words import get_stop_words
+
+        self.stop_words = frozenset(get_stop_words('en'))
+
+    def extract(self, text):
+        return [word for word in self.word_regex.findall(text)
+                if word.lower() not in self.stop_words and not self.adverb_regex.match(word)]
+
+
+class CachedLexiconNounExtractor(NounExtractor):
+    """
+    Nouns looked up in a per-process lexicon of tags the NLTK tagger has given to words,
+    only sentences with unknown words are tagged
+    """
+    max_words = 100000
+
+    def __init__(self):
+        self.lexicon = {}
+        self._lock = threading.Lock()
+
+    def extract(self, text):
+        nouns = []
+
+        for tokens in nltk_models.tokenize(text):
+            if any(token not in self.lexicon for token in tokens):
+                tagged = nltk_models.tag(tokens)
+                with self._lock:
+                    if len(self.lexicon) < self.max_words:
+                        for word, tg in tagged:
+                            self.lexicon.setdefault(word, tg)
+                tags = dict(tagged)
+            else:
+                tags = self.lexicon
+            nouns += [token for token in tokens if tags[token].startswith('N')]
+
+        return nouns
+
+    def warmup(self):
+        nltk_models.load()
+
+
+@lru_cache(maxsize=None)
+def get_noun_extractor(path=None):
+    """
+    Get an instance of the noun extractor set by the TAG_EXTRACTOR setting
+    """
+    return import_string(path or getattr(settings, 'TAG_EXTRACTOR', 'blog.nlp.NLTKNounExtractor'))()
+
+
+def warmup(path=None):
+    """
+    Load the noun extractor set by the TAG_EXTRACTOR setting ahead of the first analyzed blog post,
+    return the number of seconds it took
+    """
+    started = time.perf_counter()
+    get_noun_extractor(path).warmup()
+    return time.perf_counter() - started
+
+def init_worker():
+    """
+    Set up Django and the noun extractor in a spawned pool worker process
+    """
+    django.setup()
+    warmup()
@@ -0,0 +1,435 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+import os
+import re
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .inverted_index import IndexSegment, InvertedIndex
+from .locks import DatabaseLock
+from .models import BlogPost, SearchDocument, SearchTerm, Tag
+from .trigrams import add_search_terms, get_similar_term, is_search_term
+from .utils import iter_chunks, strip_html
+
+
+SEARCH_BACKEND = getattr(settings, 'SEARCH_BACKEND', None) # picked by the database vendor if not set
+SEARCH_INDEX_PATH = getattr(settings, 'SEARCH_INDEX_PATH', os.path.join(settings.BASE_DIR, 'search.index'))
+SEARCH_INDEX_MAX_CHANGES = getattr(settings, 'SEARCH_INDEX_MAX_CHANGES', 1000) # changed documents before a rewrite
+SEARCH_FALLBACK_THRESHOLD = getattr(settings, 'SEARCH_FALLBACK_THRESHOLD', 3) # fewer results are retried with corrected words
+SNIPPET_LENGTH = getattr(settings, 'SNIPPET_LENGTH', 200) # characters of a search result excerpt
+
+
+def get_terms(query):
+    """
+    Split a search query into lowercase words
+    """
+    return re.findall(r'\w+', query.lower())
+
+def get_snippet(text, terms, length=SNIPPET_LENGTH):
+    """
+    Get an escaped excerpt of text around the first word starting with one of the terms,
+    words starting with any of them are wrapped in <mark>
+    """
+    text = ' '.join(text.split())
+    pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, terms)) + r')\w*', re.IGNORECASE) if terms else None
+    match = pattern.search(text) if pattern else None
+
+    # the first match is shown after a bit of its context, excerpts start and end with whole words
+    start = 0
+    if match and match.start() > length // 4:
+        start = text.rfind(' ', 0, match.start() - length // 4) + 1
+    end = start + length
+    if end < len(text):
+        end = max(text.rfind(' ', start, end), match.end() if match else start + 1)
+    excerpt = text[start:end]
+
+    parts, position = [], 0
+    for word in pattern.finditer(excerpt) if pattern else ():
+        parts += [escape(excerpt[position:word.start()]), '<mark>', escape(word.group()), '</mark>']
+        position = word.end()
+    parts.append(escape(excerpt[position:]))
+
+    return ('… ' if start else '') + ''.join(parts) + (' …' if end < len(text) else '')
+
+
+class SearchBackend:
+    """
+    A base class of full-text search backends over search documents
+    """
+
+    def count(self, query):
+        """
+        Get the number of blog posts matching a query
+        """
+        raise NotImplementedError
+
+    def search(self, query, offset=0, limit=None):
+        """
+        Get a list of ids of blog posts matching a query, best matches first
+        """
+        raise NotImplementedError
+
+    def delete(self, blogpost_ids):
+        """
+        Forget deleted blog posts, for backends which don't index search documents in the database
+        """
+
+    def refresh(self):
+        """
+        Bring the index up to date with search documents if it's stale, called periodically by the worker
+        """
+        return False
+
+    def rebuild(self):
+        """
+        Rebuild the index from search documents, for backends which don't index them in the database
+        """
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    ts_rank over a generated tsvector column with a GIN index, title words weigh more
+    """
+    match = "search_vector @@ websearch_to_tsquery('english', %s)"
+
+    def count(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM blog_searchdocument WHERE {self.match}', [query])
+            return cursor.fetchone()[0]
+
+    def search(self, query, offset=0, limit=None):
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT blogpost_id FROM blog_searchdocument WHERE {self.match}
+                ORDER BY ts_rank(search_vector, websearch_to_tsquery('english', %s)) DESC, blogpost_id
+                LIMIT %s OFFSET %s""", [query, query, limit, offset])
+            return [pk for pk, in cursor.fetchall()]
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    BM25 over an FTS5 table kept in step with search documents by triggers, title words weigh more
+    """
+    title_weight = 10.0
+
+    def get_match(self, query):
+        # quoted terms are matched as words, whatever FTS5 syntax a user types
+        return ' '.join(f'"{term}"' for term in get_terms(query))
+
+    def count(self, query):
+        match = self.get_match(query)
+        if not match:
+            return 0
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM blog_searchdocument_fts WHERE blog_searchdocument_fts MATCH %s', [match])
+            return cursor.fetchone()[0]
+
+    def search(self, query, offset=0, limit=None):
+        match = self.get_match(query)
+        if not match:
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT rowid FROM blog_searchdocument_fts WHERE blog_searchdocument_fts MATCH %s
+                ORDER BY bm25(blog_searchdocument_fts, %s, 1.0), rowid
+                LIMIT %s OFFSET %s""", [match, self.title_weight, -1 if limit is None else limit, offset])
+            return [pk for pk, in cursor.fetchall()]
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """
+    Plain substring matching of every word for databases without a full-text index, newest first
+    """
+
+    def get_queryset(self, query):
+        terms = get_terms(query)
+        if not terms:
+            return SearchDocument.objects.none()
+
+        documents = SearchDocument.objects.all()
+        for term in terms:
+            documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        return documents
+
+    def count(self, query):
+        return self.get_queryset(query).count()
+
+    def search(self, query, offset=0, limit=None):
+        documents = self.get_queryset(query).order_by('-blogpost__post_date', '-blogpost_id')
+        end = None if limit is None else offset + limit
+        return list(documents.values_list('blogpost_id', flat=True)[offset:end])
+
+
+class InvertedIndexSearchBackend(SearchBackend):
+    """
+    BM25 over a pure-Python inverted index memory-mapped from a file, for SQLite without FTS5.
+    Documents saved since the file was written are read from the database before every search,
+    the worker rewrites the file once there are too many of them
+    """
+    title_boost = 3
+    # documents committed a little out of order are still picked up
+    sync_margin = timedelta(minutes=1)
+
+    def __init__(self, path=None):
+        self.path = path or SEARCH_INDEX_PATH
+        self.index = None
+        self.mtime = None
+        self.synced = None
+        self.seen = {}
+        self.results = (None, [])
+        self.fallback = DatabaseSearchBackend()
+        self._lock = threading.RLock()
+
+    def get_document_terms(self, title, body):
+        return get_terms(title) * self.title_boost + get_terms(body)
+
+    def load(self):
+        """
+        Map the index file unless it's mapped already, return False if it hasn't been written yet
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+        if mtime != self.mtime:
+            segment = IndexSegment.load(self.path)
+            self.index = InvertedIndex(segment)
+            self.synced = datetime.fromtimestamp(segment.built_at, dt_timezone.utc)
+            self.seen = {}
+            self.mtime = mtime
+        return True
+
+    def sync(self):
+        """
+        Add documents saved since the last sync to the index, return False if there is no index file
+        """
+        with self._lock:
+            if not self.load():
+                return False
+            synced = self.synced
+
+        # searches of other threads go on with the index while the changes are read
+        documents = list(SearchDocument.objects.filter(updated__gte=synced - self.sync_margin)
+                         .values_list('blogpost_id', 'title', 'body', 'updated'))
+        with self._lock:
+            for pk, title, body, updated in documents:
+                if self.seen.get(pk) != updated:
+                    self.index.add(pk, self.get_document_terms(title, body))
+                    self.seen[pk] = updated
+                self.synced = max(self.synced, updated)
+        return True
+
+    def rank(self, query):
+        """
+        Get ids of all blog posts matching a query, the last query is kept for the following page
+        """
+        if not self.sync():
+            # until the worker writes the file
+            return self.fallback.search(query)
+
+        with self._lock:
+            key = (query, self.index, self.index.version)
+            if self.results[0] != key:
+                self.results = (key, [pk for pk, score in self.index.search(get_terms(query))])
+            return self.results[1]
+
+    def count(self, query):
+        return len(self.rank(query))
+
+    def search(self, query, offset=0, limit=None):
+        end = None if limit is None else offset + limit
+        return self.rank(query)[offset:end]
+
+    def delete(self, blogpost_ids):
+        # other processes keep deleted blog posts until the worker rewrites the file, SearchResults skips them
+        transaction.on_commit(lambda: self.remove(blogpost_ids))
+
+    def remove(self, blogpost_ids):
+        with self._lock:
+            if self.index is not None:
+                for pk in blogpost_ids:
+                    self.index.remove(pk)
+
+    def refresh(self):
+        """
+        Rewrite the index file if there is none or too many documents changed since it was written,
+        return whether it has been rewritten
+        """
+        if os.path.exists(self.path):
+            segment = IndexSegment.load(self.path)
+            built_at = datetime.fromtimestamp(segment.built_at, dt_timezone.utc)
+            changed = SearchDocument.objects.filter(updated__gte=built_at).count()
+            # deleted documents are only told by the total, this is the least number of them
+            deleted = max(segment.num_docs + changed - SearchDocument.objects.count(), 0)
+            if changed + deleted <= SEARCH_INDEX_MAX_CHANGES:
+                return False
+
+        lock = DatabaseLock('search-index', timeout=600)
+        # searching processes map the file once it's replaced
+        if not lock.acquire(blocking=False):
+            return False
+        try:
+            self.rebuild()
+        finally:
+            lock.release()
+        return True
+
+    def rebuild(self):
+        built_at = timezone.now()
+        documents = SearchDocument.objects.values_list('blogpost_id', 'title', 'body').iterator(chunk_size=2000)
+        IndexSegment.write(self.path, ((pk, self.get_document_terms(title, body)) for pk, title, body in documents),
+                           built_at.timestamp())
+
+
+def has_fts5():
+    """
+    Check if SQLite is compiled with FTS5
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+@lru_cache(maxsize=None)
+def get_search_backend(path=None):
+    """
+    Get an instance of the search backend set by the SEARCH_BACKEND setting or matching the database
+    """
+    if connection.vendor == 'sqlite':
+        default = 'blog.search.SQLiteSearchBackend' if has_fts5() else 'blog.search.InvertedIndexSearchBackend'
+    elif connection.vendor == 'postgresql':
+        default = 'blog.search.PostgresSearchBackend'
+    else:
+        default = 'blog.search.DatabaseSearchBackend'
+
+    return import_string(path or SEARCH_BACKEND or default)()
+
+
+class SearchResults:
+    """
+    Blog posts matching a query, only the sliced page is searched for and loaded,
+    so it can be passed to a Paginator
+    """
+
+    def __init__(self, query, backend=None):
+        self.query = query
+        self.backend = backend or get_search_backend()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+
+        start = index.start or 0
+        limit = None if index.stop is None else max(index.stop - start, 0)
+        blogpost_ids = self.get_ids(start, limit)
+        blogposts = (BlogPost.objects.select_related('author__username')
+                     .annotate(num_of_comments=Count('comment')).in_bulk(blogpost_ids))
+        snippets = self.get_snippets(blogpost_ids)
+
+        for blogpost in blogposts.values():
+            blogpost.snippet = mark_safe(snippets.get(blogpost.pk, ''))
+        return [blogposts[pk] for pk in blogpost_ids if pk in blogposts]
+
+    def get_ids(self, offset, limit):
+        return self.backend.search(self.query, offset, limit)
+
+    def get_snippets(self, blogpost_ids):
+        """
+        Get highlighted excerpts of blog posts by their id
+        """
+        terms = get_terms(self.query)
+        documents = SearchDocument.objects.filter(pk__in=blogpost_ids).values_list('blogpost_id', 'body')
+        return {pk: get_snippet(body, terms) for pk, body in documents}
+
+
+def search_blogposts(query):
+    """
+    Get ranked blog posts matching a query
+    """
+    return SearchResults(query)
+
+def correct_query(query):
+    """
+    Replace words of a query which aren't in any title or tag with the most similar ones,
+    None if there is nothing to replace
+    """
+    terms = get_terms(query)
+    known = set(SearchTerm.objects.filter(word__in=terms).values_list('word', flat=True))
+
+    corrected = [term if term in known or not is_search_term(term) else get_similar_term(term) or term
+                 for term in terms]
+    return ' '.join(corrected) if corrected != terms else None
+
+def search_blogposts_with_fallback(query):
+    """
+    Get ranked blog posts matching a query and the corrected query if it has been misspelled,
+    i.e. a query with few results has more once its words are corrected
+    """
+    results = search_blogposts(query)
+    if results.count() >= SEARCH_FALLBACK_THRESHOLD:
+        return results, None
+
+    corrected = correct_query(query)
+    if corrected is not None:
+        corrected_results = search_blogposts(corrected)
+        if corrected_results.count() > results.count():
+            return corrected_results, corrected
+    return results, None
+
+def store_search_document(blogpost):
+    """
+    Store the searchable text of a blog post, replacing the previous one
+    """
+    SearchDocument.objects.update_or_create(
+        blogpost_id=blogpost.pk, defaults={'title': blogpost.title, 'body': strip_html(blogpost.description, ' ')})
+    add_search_terms(get_terms(blogpost.title))
+
+def rebuild_search_index(chunk_size=500):
+    """
+    Replace search documents of all blog posts and search terms, return the number of indexed blog posts
+    """
+    blogposts = BlogPost.objects.values_list('pk', 'title', 'description')
+    num_of_blog_posts = 0
+
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        # bulk_create would turn a generator into a list of every document
+        for chunk in iter_chunks(blogposts.iterator(chunk_size=chunk_size), chunk_size):
+            SearchDocument.objects.bulk_create([
+                SearchDocument(blogpost_id=pk, title=title, body=strip_html(description, ' '))
+                for pk, title, description in chunk
+            ])
+            num_of_blog_posts += len(chunk)
+
+        SearchTerm.objects.all().delete()
+        words = set(Tag.objects.values_list('word', flat=True))
+        for title in SearchDocument.objects.values_list('title', flat=True).iterator(chunk_size=chunk_size):
+            words.update(get_terms(title))
+        add_search_terms(words)
+
+    get_search_backend().rebuild()
+    return num_of_blog_posts
+
+def refresh_search_index():
+    """
+    Rewrite a stale index of the search backend, return whether it has been rewritten
+    """
+    return get_search_backend().refresh()
@@ -0,0 +1,128 @@
+import hashlib
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .search import SearchResults, search_blogposts_with_fallback
+
+
+SEARCH_CACHE = getattr(settings, 'SEARCH_CACHE', 'default') # has to be shared by all processes to be invalidated
+SEARCH_CACHE_TIMEOUT = getattr(settings, 'SEARCH_CACHE_TIMEOUT', 600) # seconds
+SEARCH_CACHE_MAX_RESULTS = getattr(settings, 'SEARCH_CACHE_MAX_RESULTS', 50) # ranked ids cached per query
+SEARCH_CACHE_STATS_RATE = getattr(settings, 'SEARCH_CACHE_STATS_RATE', 0.01) # share of searches counted in the stats
+
+
+def normalize_query(query):
+    return ' '.join(query.lower().split())
+
+
+class CachedSearchResults(SearchResults):
+    """
+    Search results whose first ranked ids, count and snippets come from a cache entry,
+    later pages are searched for as usual
+    """
+
+    def __init__(self, query, entry):
+        super().__init__(query)
+        self.entry = entry
+        self._count = entry['count']
+
+    def get_ids(self, offset, limit):
+        ids = self.entry['ids']
+        end = self._count if limit is None else min(offset + limit, self._count)
+        if end <= len(ids):
+            return ids[offset:end]
+        return super().get_ids(offset, limit)
+
+    def get_snippets(self, blogpost_ids):
+        snippets = self.entry['snippets']
+        if all(pk in snippets for pk in blogpost_ids):
+            return snippets
+        return super().get_snippets(blogpost_ids)
+
+
+class SearchCache:
+    """
+    Ranked blog post ids, counts and snippets of normalized queries. Keys contain a version
+    which every change of a blog post bumps, so stale entries stop being read and expire
+    """
+    key_prefix = 'blog:search'
+
+    def __init__(self, cache_alias=SEARCH_CACHE):
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get_version(self):
+        # an evicted version starts again from the clock, so entries of the old one aren't read again
+        return self.cache.get_or_set(f'{self.key_prefix}:version', time.time_ns, None)
+
+    def bump_version(self):
+        """
+        Stop serving every cached search
+        """
+        try:
+            self.cache.incr(f'{self.key_prefix}:version')
+        except ValueError:
+            # evicted, the next search starts a new version
+            pass
+
+    def get_key(self, query, version):
+        digest = hashlib.sha1(query.encode()).hexdigest()
+        return f'{self.key_prefix}:{version}:{digest}'
+
+    def record(self, name):
+        # an increment of a database cache is a write, only a sample of searches is counted
+        if random.random() >= SEARCH_CACHE_STATS_RATE:
+            return
+        key = f'{self.key_prefix}:{name}'
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, None):
+                self.cache.incr(key)
+
+    def get_stats(self):
+        """
+        Get numbers of cache hits and misses since the last reset, estimated from the sample, and the hit ratio
+        """
+        counts = self.cache.get_many([f'{self.key_prefix}:hits', f'{self.key_prefix}:misses'])
+        hits, misses = (round(counts.get(f'{self.key_prefix}:{name}', 0) / SEARCH_CACHE_STATS_RATE)
+                        for name in ('hits', 'misses'))
+        return {'hits': hits, 'misses': misses, 'ratio': hits / (hits + misses) if hits + misses else 0.0}
+
+    def reset_stats(self):
+        self.cache.delete_many([f'{self.key_prefix}:hits', f'{self.key_prefix}:misses'])
+
+    def search(self, query):
+        """
+        Get ranked blog posts matching a query and the corrected query, see search_blogposts_with_fallback
+        """
+        query = normalize_query(query)
+        key = self.get_key(query, self.get_version())
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.record('hits')
+            return CachedSearchResults(entry['query'], entry), entry['corrected']
+
+        self.record('misses')
+        results, corrected = search_blogposts_with_fallback(query)
+        ids = results.get_ids(0, SEARCH_CACHE_MAX_RESULTS)
+        entry = {
+            'query': results.query,
+            'corrected': corrected,
+            'ids': ids,
+            'count': results.count(),
+            'snippets': results.get_snippets(ids),
+        }
+        self.cache.set(key, entry, SEARCH_CACHE_TIMEOUT)
+
+        return CachedSearchResults(entry['query'], entry), corrected
+
+
+search_cache = SearchCache()
@@ -1,8 +1,19 @@
-from django.db.models.signals import post_delete, post_save
+from contextlib import contextmanager
+import threading
+
+from django.db.models import DEFERRED
+from django.db.models.signals import post_delete, post_init, post_save
+from django.db import transaction
 from django.dispatch import receiver
 
-from blog.models import BlogAuthor, BlogPost
-from .utils import update_tags, delete_tags
+from blog.models import BlogAuthor, BlogPost, Comment
+from .locks import LockTimeout
+from .search import get_search_backend, store_search_document
+from .search_cache import search_cache
+from .stats import record_post_stat, update_category_stats, update_contributor_stats, update_site_stats
+from .suggest import suggestion_index
+from .utils import delete_tags, invalidate_index_cache
+from .tasks import enqueue_tag_jobs
 
 
 import logging
@@ -10,17 +21,166 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+class TagBatch(threading.local):
+    """
+    Blog posts saved or deleted in the current transaction, their tags are updated once on commit
+    """
+
+    def __init__(self):
+        self.saved = set()
+        self.deleted = set()
+        self.suppressed = 0
+
+    def add(self, saved=(), deleted=()):
+        self.saved.update(saved)
+        self.deleted.update(deleted)
+        # every change registers a callback and the first one to run flushes the whole batch,
+        # so changes left over from a rolled back transaction are flushed by the next commit
+        transaction.on_commit(self.flush)
+
+    def flush(self):
+        # both steps check which blog posts exist, so stale changes are harmless
+        saved, deleted = self.saved, self.deleted
+        self.saved, self.deleted = set(), set()
+
+        if deleted:
+            try:
+                # requests don't wait for a rebuild holding the lock
+                delete_tags(deleted, blocking=False)
+            except LockTimeout:
+                # the blog posts are deleted already, the process_tag_jobs worker picks their terms up
+                logger.warning('Tags of deleted blog posts %s are left to the worker', deleted)
+        if saved:
+            # nouns are counted by the process_tag_jobs worker, off the request path
+            enqueue_tag_jobs(saved)
+
+
+tag_batch = TagBatch()
+
+
+@contextmanager
+def suppress_tag_updates():
+    """
+    Skip tag maintenance during bulk operations, run rebuild_tags afterwards
+    """
+    tag_batch.suppressed += 1
+    try:
+        yield
+    finally:
+        tag_batch.suppressed -= 1
+
+
 @receiver(post_delete, sender=BlogAuthor)
 def delete_blogger_status(sender, instance, **kwargs):
     instance.username.is_blogger = False
     instance.username.save()
 
 @receiver(post_save, sender=BlogPost)
-def manage_tags_post_save(sender, instance, **kwargs):
+def manage_tags_post_save(sender, instance, raw=False, **kwargs):
+    # fixtures are loaded raw, without going through BlogPost.save()
+    if raw or tag_batch.suppressed:
+        return
     if instance._update_tags:
-        update_tags()
+        tag_batch.add(saved=[instance.pk])
+
+@receiver(post_save, sender=BlogPost)
+def index_search_document(sender, instance, raw=False, **kwargs):
+    # search documents of deleted blog posts are deleted by cascade
+    if not raw:
+        store_search_document(instance)
+
+@receiver(post_delete, sender=BlogPost)
+def delete_search_document(sender, instance, **kwargs):
+    get_search_backend().delete([instance.pk])
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def invalidate_search_cache(sender, raw=False, **kwargs):
+    # bumped before the commit, a concurrent search could cache the old results under the new version
+    if not raw:
+        transaction.on_commit(search_cache.bump_version)
+
+@receiver(post_save, sender=BlogPost)
+def add_suggestion(sender, instance, raw=False, **kwargs):
+    # changes rolled back afterwards are suggested until the index is reloaded
+    if not raw:
+        suggestion_index.add_blogpost(instance)
+
+@receiver(post_delete, sender=BlogPost)
+def remove_suggestion(sender, instance, **kwargs):
+    suggestion_index.remove_blogpost(instance.pk)
 
 @receiver(post_delete, sender=BlogPost)
 def manage_tags_post_delete(sender, instance, **kwargs):
-    delete_tags(instance)
-    update_tags()
+    if tag_batch.suppressed:
+        return
+    tag_batch.add(deleted=[instance.pk])
+
+@receiver(post_save, sender=Comment)
+def record_comment_stat(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.blog_id:
+        record_post_stat(instance.blog_id, comments=1)
+
+@receiver(post_init, sender=BlogPost)
+def remember_counted_fields(sender, instance, **kwargs):
+    # deferred fields aren't loaded just for this
+    instance._stats_category = instance.__dict__.get('category', DEFERRED)
+    instance._stats_author_id = instance.__dict__.get('author_id', DEFERRED)
+
+def invalidate_index_on_commit(*names):
+    # invalidated before the commit, a concurrent request could cache the old values again
+    transaction.on_commit(lambda: invalidate_index_cache(*names))
+
+@receiver(post_save, sender=BlogPost)
+def count_saved_blogpost(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        update_site_stats(blog_posts=1)
+        update_category_stats(instance.category, 1)
+        update_contributor_stats(instance.author_id, 1)
+        invalidate_index_on_commit('total_num', 'top_contributors', 'most_pop_cats')
+    else:
+        if instance._stats_category is not DEFERRED and instance._stats_category != instance.category:
+            update_category_stats(instance._stats_category, -1)
+            update_category_stats(instance.category, 1)
+            invalidate_index_on_commit('most_pop_cats')
+        # e.g. reassigned in the admin
+        if instance._stats_author_id is not DEFERRED and instance._stats_author_id != instance.author_id:
+            update_contributor_stats(instance._stats_author_id, -1)
+            update_contributor_stats(instance.author_id, 1)
+            invalidate_index_on_commit('top_contributors')
+    remember_counted_fields(sender, instance)
+
+@receiver(post_delete, sender=BlogPost)
+def count_deleted_blogpost(sender, instance, **kwargs):
+    update_site_stats(blog_posts=-1)
+    update_category_stats(instance.category, -1)
+    update_contributor_stats(instance.author_id, -1)
+    invalidate_index_on_commit('total_num', 'top_contributors', 'most_pop_cats')
+
+@receiver(post_save, sender=BlogAuthor)
+def count_saved_blogger(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_site_stats(bloggers=1)
+        update_contributor_stats(instance.pk, 0)
+        invalidate_index_on_commit('total_num', 'top_contributors')
+    elif not raw:
+        # a new profile image shows among top contributors
+        invalidate_index_on_commit('top_contributors')
+
+@receiver(post_delete, sender=BlogAuthor)
+def count_deleted_blogger(sender, instance, **kwargs):
+    update_site_stats(bloggers=-1)
+    invalidate_index_on_commit('total_num', 'top_contributors')
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_site_stats(comments=1)
+        invalidate_index_on_commit('total_num')
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    update_site_stats(comments=-1)
+    invalidate_index_on_commit('total_num')
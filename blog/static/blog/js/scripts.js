@@ -51,3 +51,43 @@ function resizeTags() {
         }
     });
 }
+
+// Search suggestions
+const searchInput = document.querySelector(".search-form__text-input");
+const searchSuggestions = document.querySelector("#search-suggestions");
+let suggestTimeout = null;
+
+if (searchInput && searchSuggestions) {
+    searchInput.addEventListener('input', () => {
+        clearTimeout(suggestTimeout);
+        suggestTimeout = setTimeout(loadSuggestions, 150);
+    });
+    searchInput.addEventListener('change', openSuggestion);
+}
+
+function loadSuggestions() {
+    const query = searchInput.value.trim();
+    if (query.length < 2) {
+        searchSuggestions.replaceChildren();
+        return;
+    }
+
+    fetch(`${searchInput.dataset.suggestUrl}?q=${encodeURIComponent(query)}`)
+        .then((response) => response.json())
+        .then((data) => {
+            searchSuggestions.replaceChildren(...data.suggestions.map((suggestion) => {
+                const option = document.createElement("option");
+                option.value = suggestion.text;
+                option.label = suggestion.kind === "tag" ? `#${suggestion.text}` : suggestion.text;
+                option.dataset.url = suggestion.url;
+                return option;
+            }));
+        });
+}
+
+function openSuggestion() {
+    const option = [...searchSuggestions.options].find((option) => option.value === searchInput.value);
+    if (option) {
+        window.location.href = option.dataset.url;
+    }
+}
@@ -0,0 +1,307 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+import heapq
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+
+from .models import (BlogAuthor, BlogPost, CategoryStats, Comment, ContributorStats, PostStat, SiteStats,
+                     TopPost, TrendingPost)
+
+
+POST_STAT_HOURLY_RETENTION = getattr(settings, 'POST_STAT_HOURLY_RETENTION', 2) # days before hourly rows are compacted
+STAT_FIELDS = ('views', 'likes', 'dislikes', 'comments')
+TOP_POST_WINDOWS = getattr(settings, 'TOP_POST_WINDOWS', (1, 7, 30, 90)) # days of windows ranked in advance
+TOP_POST_RANKING_SIZE = getattr(settings, 'TOP_POST_RANKING_SIZE', 100) # posts ranked per window and metric
+
+TRENDING_HALF_LIFE = getattr(settings, 'TRENDING_HALF_LIFE', 24) # hours for activity to lose half its weight
+TRENDING_HORIZON = getattr(settings, 'TRENDING_HORIZON', 7) # days of stats a score is computed from
+TRENDING_WEIGHTS = getattr(settings, 'TRENDING_WEIGHTS', {'views': 1, 'likes': 5, 'comments': 10})
+# scores are stored relative to a fixed moment, so they never have to be decayed in place
+TRENDING_EPOCH = datetime(2021, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def get_hour_start(moment=None):
+    """
+    Get the start of the hour a moment belongs to, now by default
+    """
+    return (moment or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+def get_day_start(moment=None):
+    """
+    Get the start of the local day a moment belongs to, now by default
+    """
+    return timezone.localtime(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+
+def record_post_stats(counts, field='views', moment=None):
+    """
+    Append hourly rows of a count per blog post id, e.g. flushed views
+    """
+    counts = {pk: count for pk, count in counts.items() if count}
+    blogpost_ids = BlogPost.objects.filter(pk__in=counts).values_list('pk', flat=True)
+    start = get_hour_start(moment)
+
+    PostStat.objects.bulk_create([PostStat(blogpost_id=pk, start=start, **{field: counts[pk]})
+                                  for pk in blogpost_ids])
+
+def record_post_stat(blogpost_id, moment=None, **counts):
+    """
+    Append an hourly row of counts of a blog post, e.g. likes=1, dislikes=-1
+    """
+    if any(counts.values()):
+        PostStat.objects.create(blogpost_id=blogpost_id, start=get_hour_start(moment), **counts)
+
+def compact_post_stats(before=None):
+    """
+    Replace hourly rows of days before the day of `before` with a daily row per blog post and re-rank
+    the top posts of the precomputed windows, return the numbers of deleted hourly and created daily rows
+    """
+    if before is None:
+        before = timezone.now() - timedelta(days=POST_STAT_HOURLY_RETENTION)
+    before = get_day_start(before)
+
+    with transaction.atomic():
+        hourly = PostStat.objects.filter(period=PostStat.HOUR, start__lt=before)
+        days = (hourly.annotate(day=TruncDay('start')).order_by().values('blogpost', 'day')
+                .annotate(**{field: Sum(field) for field in STAT_FIELDS}))
+
+        created = PostStat.objects.bulk_create([
+            PostStat(blogpost_id=row['blogpost'], period=PostStat.DAY, start=row['day'],
+                     **{field: row[field] for field in STAT_FIELDS})
+            for row in days.iterator()
+        ], batch_size=1000)
+        deleted, _ = hourly.delete()
+
+    rank_top_posts()
+    return deleted, len(created)
+
+def check_metric(metric):
+    """
+    Raise ValueError if metric isn't a field of PostStat
+    """
+    if metric not in STAT_FIELDS:
+        raise ValueError(f'Unknown metric {metric!r}, expected one of {STAT_FIELDS}')
+
+def get_window_filter(start, end=None):
+    """
+    Get a filter of PostStat rows since start and before end, compacted days are counted whole
+    """
+    window = Q(period=PostStat.HOUR, start__gte=start) | Q(period=PostStat.DAY, start__gte=get_day_start(start))
+    if end is not None:
+        window &= Q(start__lt=end)
+    return window
+
+def get_window_totals(start, end=None, metric='views'):
+    """
+    Get a queryset of blog post ids and their totals of a metric since start and before end,
+    the highest first. Compacted days are counted whole. Only the covering index of PostStat is read
+    """
+    check_metric(metric)
+
+    return (PostStat.objects.filter(get_window_filter(start, end)).values('blogpost')
+            .annotate(total=Sum(metric)).order_by('-total', 'blogpost_id'))
+
+def rank_top_posts(now=None):
+    """
+    Replace the rankings of the blog posts with the highest totals of every metric over every window
+    of TOP_POST_WINDOWS ending now, return the number of ranked posts
+    """
+    now = now or timezone.now()
+    ranks = []
+
+    for days in TOP_POST_WINDOWS:
+        # a single pass over the window sums every metric
+        rows = list(PostStat.objects.filter(get_window_filter(now - timedelta(days=days))).values('blogpost')
+                    .annotate(**{field: Sum(field) for field in STAT_FIELDS}).order_by().iterator())
+        for metric in STAT_FIELDS:
+            # the order of get_window_totals
+            top = heapq.nsmallest(TOP_POST_RANKING_SIZE, rows, key=lambda row: (-row[metric], row['blogpost']))
+            ranks += [TopPost(days=days, metric=metric, rank=rank, blogpost_id=row['blogpost'], total=row[metric])
+                      for rank, row in enumerate(top, 1)]
+
+    with transaction.atomic():
+        TopPost.objects.all().delete()
+        TopPost.objects.bulk_create(ranks, batch_size=1000)
+
+    return len(ranks)
+
+def get_top_posts(start, end=None, metric='views', limit=10):
+    """
+    Get a list of (blog post, total) of the blog posts with the highest total of a metric
+    since start and before end. Compacted days are counted whole
+    """
+    rows = list(get_window_totals(start, end, metric)[:limit])
+    blogposts = BlogPost.objects.in_bulk([row['blogpost'] for row in rows])
+
+    return [(blogposts[row['blogpost']], row['total']) for row in rows if row['blogpost'] in blogposts]
+
+def get_ranked_posts(days, metric='views', limit=10):
+    """
+    Get a list of (blog post, total) of the blog posts with the highest total of a metric over the last days
+    as of the last ranking. Windows which aren't ranked in advance are counted by get_top_posts
+    """
+    check_metric(metric)
+
+    if days in TOP_POST_WINDOWS and limit <= TOP_POST_RANKING_SIZE:
+        ranks = TopPost.objects.filter(days=days, metric=metric).select_related('blogpost').order_by('rank')[:limit]
+        ranked = [(rank.blogpost, rank.total) for rank in ranks]
+        # nothing is ranked before the first compaction
+        if ranked:
+            return ranked
+
+    return get_top_posts(timezone.now() - timedelta(days=days), metric=metric, limit=limit)
+
+def get_decay_exponent(moment):
+    """
+    Get the log of the weight of activity at a moment relative to activity at the trending epoch
+    """
+    return (moment - TRENDING_EPOCH).total_seconds() / 3600 * math.log(2) / TRENDING_HALF_LIFE
+
+def score_activity(buckets):
+    """
+    Get the log of the sum of time-decayed weights of (start, weight) buckets,
+    None if there is no positive weight
+    """
+    exponents = [math.log(weight) + get_decay_exponent(start) for start, weight in buckets if weight > 0]
+    if not exponents:
+        return None
+
+    # the weights themselves would overflow a float, so they are summed in log space
+    top = max(exponents)
+    return top + math.log(sum(math.exp(exponent - top) for exponent in exponents))
+
+def refresh_trending_posts(full=False):
+    """
+    Re-score blog posts with stats recorded since the last refresh, or all of them,
+    return the number of re-scored blog posts
+    """
+    now = timezone.now()
+    stats = PostStat.objects.filter(start__gte=now - timedelta(days=TRENDING_HORIZON))
+
+    since = None if full else TrendingPost.objects.aggregate(Max('updated'))['updated__max']
+    if since is not None:
+        # rows are stamped with the hour they were recorded in, a few minutes cover
+        # transactions still open at the last refresh
+        active = PostStat.objects.filter(start__gte=get_hour_start(since - timedelta(minutes=5))).values('blogpost')
+        stats = stats.filter(blogpost__in=active)
+
+    buckets = defaultdict(list)
+    rows = (stats.order_by().values('blogpost', 'start')
+            .annotate(**{field: Sum(field) for field in TRENDING_WEIGHTS}))
+    for row in rows.iterator():
+        weight = sum(row[field] * field_weight for field, field_weight in TRENDING_WEIGHTS.items())
+        buckets[row['blogpost']].append((row['start'], weight))
+
+    scores = {pk: score_activity(post_buckets) for pk, post_buckets in buckets.items()}
+
+    with transaction.atomic():
+        scored = BlogPost.objects.filter(pk__in=[pk for pk, score in scores.items() if score is not None])
+        trending = [TrendingPost(blogpost_id=pk, score=scores[pk], updated=now)
+                    for pk in scored.values_list('pk', flat=True)]
+        existing = set(TrendingPost.objects.filter(pk__in=scores).values_list('pk', flat=True))
+
+        TrendingPost.objects.bulk_update([post for post in trending if post.pk in existing],
+                                         ['score', 'updated'], batch_size=500)
+        TrendingPost.objects.bulk_create([post for post in trending if post.pk not in existing], batch_size=500)
+        # posts without positive activity and posts whose activity has decayed
+        # below a single view at the horizon drop out
+        TrendingPost.objects.filter(pk__in=[pk for pk, score in scores.items() if score is None]).delete()
+        TrendingPost.objects.filter(score__lt=get_decay_exponent(now - timedelta(days=TRENDING_HORIZON))).delete()
+
+    return len(scores)
+
+def get_trending_posts(limit=10):
+    """
+    Get a list of the top trending blog posts
+    """
+    # only what trending.html and index.html show, not descriptions
+    trending = (TrendingPost.objects.select_related('blogpost__author__username')
+                .only('blogpost__title', 'blogpost__slug', 'blogpost__post_date', 'blogpost__category',
+                      'blogpost__likes', 'blogpost__author__username__username')
+                .order_by('-score')[:limit])
+    return [post.blogpost for post in trending]
+
+def count_site_stats():
+    """
+    Count the site totals, as fields of the site stats row
+    """
+    return {'blog_posts': BlogPost.objects.count(), 'bloggers': BlogAuthor.objects.count(),
+            'comments': Comment.objects.count()}
+
+def rebuild_site_stats():
+    """
+    Recount site, category and contributor stats from scratch, e.g. after bulk changes
+    which don't send signals
+    """
+    with transaction.atomic():
+        SiteStats.objects.all().delete()
+        CategoryStats.objects.all().delete()
+        ContributorStats.objects.all().delete()
+
+        SiteStats.objects.create(pk=1, **count_site_stats())
+        categories = BlogPost.objects.order_by().values('category').annotate(blog_posts=Count('pk'))
+        CategoryStats.objects.bulk_create([CategoryStats(category=row['category'], blog_posts=row['blog_posts'])
+                                           for row in categories])
+        contributors = BlogAuthor.objects.annotate(blog_posts=Count('blogpost')).values_list('pk', 'blog_posts')
+        ContributorStats.objects.bulk_create([ContributorStats(author_id=pk, blog_posts=blog_posts)
+                                              for pk, blog_posts in contributors.iterator()], batch_size=500)
+
+def update_site_stats(**deltas):
+    """
+    Add deltas to site totals, e.g. comments=-1. The totals are counted if their row is missing
+    """
+    stats = SiteStats.objects.filter(pk=1)
+    values = {field: F(field) + delta for field, delta in deltas.items()}
+    if not stats.update(**values):
+        # the change being counted has already been saved, so the count includes it
+        created = SiteStats.objects.get_or_create(pk=1, defaults=count_site_stats())[1]
+        if not created:
+            # counted by a concurrent request, which can't see this uncommitted change
+            stats.update(**values)
+
+def update_category_stats(category, delta):
+    """
+    Add a delta to the number of blog posts of a category
+    """
+    stats = CategoryStats.objects.filter(pk=category)
+    if not stats.update(blog_posts=F('blog_posts') + delta):
+        CategoryStats.objects.bulk_create([CategoryStats(category=category)], ignore_conflicts=True)
+        stats.update(blog_posts=F('blog_posts') + delta)
+
+def update_contributor_stats(author_id, delta):
+    """
+    Add a delta to the number of blog posts of a blogger, a zero delta adds a row for a new blogger
+    """
+    if author_id is None:
+        return
+    stats = ContributorStats.objects.filter(pk=author_id)
+    if not stats.update(blog_posts=F('blog_posts') + delta) and delta >= 0:
+        ContributorStats.objects.bulk_create([ContributorStats(author_id=author_id)], ignore_conflicts=True)
+        stats.update(blog_posts=F('blog_posts') + delta)
+
+def get_site_stats():
+    """
+    Get the site totals row
+    """
+    stats = SiteStats.objects.filter(pk=1).first()
+    if stats is None:
+        stats, created = SiteStats.objects.get_or_create(pk=1, defaults=count_site_stats())
+    return stats
+
+def get_category_stats():
+    """
+    Get a list of (category, number of blog posts) of categories with blog posts, the most popular first
+    """
+    stats = CategoryStats.objects.filter(blog_posts__gt=0).order_by('-blog_posts', 'category')
+    return list(stats.values_list('category', 'blog_posts'))
+
+def get_contributor_stats(limit=5):
+    """
+    Get a list of (blogger, number of blog posts) of the bloggers with the most blog posts
+    """
+    stats = ContributorStats.objects.select_related('author__username').order_by('-blog_posts', 'author')[:limit]
+    return [(contributor.author, contributor.blog_posts) for contributor in stats]
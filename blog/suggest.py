@@ -0,0 +1,248 @@
+from bisect import bisect_left, insort
+from datetime import timedelta
+import atexit
+import heapq
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BlogPost, PostStat, Tag
+
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_LIMIT = getattr(settings, 'SUGGEST_LIMIT', 8)
+SUGGEST_REFRESH_INTERVAL = getattr(settings, 'SUGGEST_REFRESH_INTERVAL', None) # seconds, web processes only
+# keys scanned for a prefix at most, so one or two letters don't walk the whole index
+SUGGEST_SCAN_LIMIT = getattr(settings, 'SUGGEST_SCAN_LIMIT', 2000)
+KEY_LENGTH = 40
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+class PrefixIndex:
+    """
+    Completions of blog post titles and tags in a sorted list of keys searched by bisection.
+    Titles are completed from the start of any of their words, matches are ordered by weight,
+    i.e. views of a blog post or quantity of a tag
+    """
+    POST = 'post'
+    TAG = 'tag'
+
+    def __init__(self):
+        self.keys = [] # sorted (key, kind, id)
+        self.entries = {} # (kind, id) -> (text, weight, slug, keys)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_keys(self, kind, text):
+        words = normalize(text).split()
+        if kind == self.TAG:
+            return {' '.join(words)[:KEY_LENGTH]}
+        return {' '.join(words[start:])[:KEY_LENGTH] for start in range(len(words))}
+
+    def add(self, kind, id, text, weight=0, slug=None):
+        """
+        Add or replace a completion
+        """
+        with self._lock:
+            self._remove(kind, id)
+            keys = self.get_keys(kind, text)
+            self.entries[(kind, id)] = (text, weight, slug, keys)
+            for key in keys:
+                insort(self.keys, (key, kind, id))
+
+    def remove(self, kind, id):
+        with self._lock:
+            self._remove(kind, id)
+
+    def _remove(self, kind, id):
+        entry = self.entries.pop((kind, id), None)
+        if entry is not None:
+            for key in entry[3]:
+                position = bisect_left(self.keys, (key, kind, id))
+                del self.keys[position]
+
+    def add_blogpost(self, blogpost):
+        self.add(self.POST, blogpost.pk, blogpost.title, blogpost.views, blogpost.slug)
+
+    def complete(self, prefix, limit=SUGGEST_LIMIT):
+        """
+        Get a list of (kind, text, slug) completions of a prefix, up to limit of each kind, heaviest first
+        """
+        prefix = normalize(prefix)[:KEY_LENGTH]
+        if not prefix:
+            return []
+
+        # a concurrent update may shift keys, at worst a completion is missed this time
+        keys, entries = self.keys, self.entries
+        start = bisect_left(keys, (prefix,))
+        end = min(bisect_left(keys, (prefix + '\uffff',), start), start + SUGGEST_SCAN_LIMIT)
+
+        matches = {self.POST: [], self.TAG: []}
+        for kind, id in dict.fromkeys((kind, id) for key, kind, id in keys[start:end]):
+            entry = entries.get((kind, id))
+            if entry is not None:
+                matches[kind].append(entry)
+
+        completions = []
+        for kind in (self.TAG, self.POST):
+            best = heapq.nsmallest(limit, matches[kind], key=lambda entry: (-entry[1], entry[0]))
+            completions += [(kind, text, slug) for text, weight, slug, keys in best]
+        return completions
+
+    @classmethod
+    def load(cls):
+        """
+        Build an index of all blog posts and tags
+        """
+        index = cls()
+        entries = {}
+        for pk, title, views, slug in BlogPost.objects.values_list('pk', 'title', 'views', 'slug').iterator():
+            entries[(cls.POST, pk)] = (title, views, slug, index.get_keys(cls.POST, title))
+        for word, quantity in Tag.objects.values_list('word', 'quantity').iterator():
+            entries[(cls.TAG, word)] = (word, quantity, None, index.get_keys(cls.TAG, word))
+
+        index.entries = entries
+        index.keys = sorted((key, kind, id) for (kind, id), entry in entries.items() for key in entry[3])
+        return index
+
+
+class SuggestionIndex:
+    """
+    The prefix index of the current process. It's loaded on first use, changes made by this process
+    are applied to it right away and changes made by others once it's refreshed in the background
+    """
+    # rows committed a little out of order are still picked up
+    sync_margin = timedelta(minutes=1)
+
+    def __init__(self, interval=SUGGEST_REFRESH_INTERVAL):
+        self.index = None
+        self.synced = None
+        self.interval = interval
+        self.refresher = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.index is None:
+            with self._lock:
+                if self.index is None:
+                    self.reload()
+                    # only processes which complete prefixes load the index and keep it fresh
+                    if self.interval and self.refresher is None:
+                        self.refresher = start_suggestion_index_refresher(self.interval, self)
+        return self.index
+
+    def reload(self):
+        synced = timezone.now()
+        self.index = PrefixIndex.load()
+        self.synced = synced
+
+    def refresh(self):
+        """
+        Apply blog posts and tags changed by any process since the last refresh
+        """
+        index = self.index
+        if index is None:
+            return
+
+        synced = timezone.now()
+        since = self.synced - self.sync_margin
+        # titles are changed with their search documents, views are flushed with their hourly stats
+        viewed = PostStat.objects.filter(start__gte=since - timedelta(hours=1)).values('blogpost')
+        blogposts = (BlogPost.objects.filter(Q(searchdocument__updated__gte=since) | Q(pk__in=viewed))
+                     .values_list('pk', 'title', 'views', 'slug'))
+        for pk, title, views, slug in blogposts:
+            index.add(PrefixIndex.POST, pk, title, views, slug)
+        for word, quantity in Tag.objects.filter(updated__gte=since).values_list('word', 'quantity'):
+            index.add(PrefixIndex.TAG, word, word, quantity)
+
+        self.remove_deleted(index, PrefixIndex.POST, BlogPost.objects.values_list('pk', flat=True))
+        self.remove_deleted(index, PrefixIndex.TAG, Tag.objects.values_list('word', flat=True))
+        self.synced = synced
+
+    def remove_deleted(self, index, kind, ids):
+        """
+        Remove completions of deleted rows, which leave nothing to read but a smaller count
+        """
+        indexed = {id for entry_kind, id in list(index.entries) if entry_kind == kind}
+        if ids.count() != len(indexed):
+            for id in indexed - set(ids):
+                index.remove(kind, id)
+
+    def complete(self, prefix, limit=SUGGEST_LIMIT):
+        return self.get().complete(prefix, limit)
+
+    def add_blogpost(self, blogpost):
+        if self.index is not None:
+            self.index.add_blogpost(blogpost)
+
+    def remove_blogpost(self, pk):
+        if self.index is not None:
+            self.index.remove(PrefixIndex.POST, pk)
+
+    def update_tags(self, words=None):
+        """
+        Re-read quantities of tags, all of them are reloaded without words
+        """
+        if self.index is None:
+            return
+        if words is None:
+            self.reload()
+            return
+
+        quantities = dict(Tag.objects.filter(word__in=list(words)).values_list('word', 'quantity'))
+        for word in words:
+            if word in quantities:
+                self.index.add(PrefixIndex.TAG, word, word, quantities[word])
+            else:
+                self.index.remove(PrefixIndex.TAG, word)
+
+
+suggestion_index = SuggestionIndex()
+
+
+class SuggestionIndexRefresher(threading.Thread):
+    """
+    A background thread refreshing the prefix index every interval seconds
+    """
+
+    def __init__(self, interval, index=suggestion_index):
+        super().__init__(name='suggestion-index-refresher', daemon=True)
+        self.interval = interval
+        self.index = index
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.refresh()
+
+    def refresh(self):
+        try:
+            self.index.refresh()
+        except Exception:
+            logger.exception('Refreshing search suggestions failed')
+        finally:
+            # every thread has its own database connection
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_suggestion_index_refresher(interval=SUGGEST_REFRESH_INTERVAL, index=suggestion_index):
+    """
+    Keep refreshing a loaded prefix index in the background of the current process
+    """
+    refresher = SuggestionIndexRefresher(interval, index)
+    refresher.start()
+    atexit.register(refresher.stop)
+    return refresher
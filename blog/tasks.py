@@ -0,0 +1,111 @@
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BlogPost, PostTerm, TagJob
+from .utils import delete_tags, update_tags
+
+
+logger = logging.getLogger(__name__)
+
+TAG_JOB_MAX_ATTEMPTS = getattr(settings, 'TAG_JOB_MAX_ATTEMPTS', 5)
+TAG_JOB_RETRY_DELAY = getattr(settings, 'TAG_JOB_RETRY_DELAY', 30) # seconds, doubled on every retry
+TAG_JOB_TIMEOUT = getattr(settings, 'TAG_JOB_TIMEOUT', 600) # seconds before a running job is considered lost
+
+
+def enqueue_tag_jobs(blogpost_ids):
+    """
+    Queue tag recomputation for existing blog posts, skipping ones with a pending job
+    """
+    blogpost_ids = BlogPost.objects.filter(pk__in=blogpost_ids).values_list('pk', flat=True)
+    TagJob.objects.bulk_create([TagJob(blogpost_id=pk) for pk in blogpost_ids], ignore_conflicts=True)
+
+def enqueue_tag_job(blogpost_id):
+    """
+    Queue tag recomputation for a blog post unless one is already pending
+    """
+    enqueue_tag_jobs([blogpost_id])
+
+def claim_tag_job():
+    """
+    Mark the next due job as running, return None if there is nothing to do
+    """
+    while True:
+        job = TagJob.objects.filter(status=TagJob.PENDING, run_after__lte=timezone.now()).first()
+        if job is None:
+            return None
+
+        claimed = TagJob.objects.filter(pk=job.pk, status=TagJob.PENDING).update(
+                    status=TagJob.RUNNING, attempts=F('attempts') + 1, run_after=timezone.now())
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+def _requeue(job, error):
+    """
+    Put a failed job back to the queue or give up on it
+    """
+    if job.attempts >= TAG_JOB_MAX_ATTEMPTS:
+        TagJob.objects.filter(pk=job.pk).update(status=TagJob.FAILED, last_error=error)
+        return
+
+    delay = timedelta(seconds=TAG_JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+    try:
+        with transaction.atomic():
+            TagJob.objects.filter(pk=job.pk).update(
+                status=TagJob.PENDING, last_error=error, run_after=timezone.now() + delay)
+    except IntegrityError:
+        # the blog post has been saved again meanwhile, the pending job covers it
+        TagJob.objects.filter(pk=job.pk).delete()
+
+def run_tag_job(job):
+    """
+    Recompute tags for a claimed job, return True on success
+    """
+    try:
+        blogpost = BlogPost.objects.get(pk=job.blogpost_id)
+        update_tags(blogpost)
+    except BlogPost.DoesNotExist:
+        pass
+    except Exception as exc:
+        logger.exception('Tag job %s failed', job.pk)
+        _requeue(job, repr(exc))
+        return False
+
+    TagJob.objects.filter(pk=job.pk).delete()
+    return True
+
+def requeue_stale_tag_jobs():
+    """
+    Return jobs of crashed workers to the queue
+    """
+    deadline = timezone.now() - timedelta(seconds=TAG_JOB_TIMEOUT)
+    for job in TagJob.objects.filter(status=TagJob.RUNNING, run_after__lt=deadline):
+        _requeue(job, 'Timed out')
+
+def delete_orphaned_terms():
+    """
+    Subtract terms of deleted blog posts whose tags couldn't be updated on commit
+    """
+    blogpost_ids = list(PostTerm.objects.exclude(blogpost_id__in=BlogPost.objects.values('pk'))
+                        .values_list('blogpost_id', flat=True).distinct())
+    if blogpost_ids:
+        delete_tags(blogpost_ids)
+
+def process_tag_jobs(limit=None):
+    """
+    Run due tag jobs, return the number of processed ones
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_tag_job()
+        if job is None:
+            break
+        run_tag_job(job)
+        processed += 1
+
+    return processed
@@ -0,0 +1,86 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from blog.models import BlogPost, BlogAuthor, PostTerm, Tag, TagJob, User
+
+
+class RebuildTagsCommandTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        for blog_id in range(5):
+            BlogPost.objects.create(title=f'Blog {blog_id}', description='<p>The guitar and the drum.</p>', author=blogger)
+        BlogPost.objects.create(title='Blog 5', description='<p>A drum.</p>', author=blogger)
+
+    def test_rebuild_in_process_pool(self):
+        out = StringIO()
+        call_command('rebuild_tags', workers=2, chunk_size=2, stdout=out)
+
+        self.assertIn('Indexed 6 blog post(s)', out.getvalue())
+        self.assertEqual(Tag.objects.get(word='guitar').quantity, 5)
+        self.assertEqual(Tag.objects.get(word='drum').quantity, 6)
+        self.assertEqual(Tag.objects.get(word='drum').blogposts.count(), 6)
+        self.assertEqual(PostTerm.objects.filter(word='drum').count(), 6)
+
+    def test_rebuild_replaces_stale_tags(self):
+        Tag.objects.create(word='stale', quantity=100)
+        call_command('rebuild_tags', workers=1, stdout=StringIO())
+        self.assertFalse(Tag.objects.filter(word='stale').exists())
+
+
+class BenchmarkTagExtractorsCommandTest(TestCase):
+
+    def test_benchmark_reports_every_extractor(self):
+        out = StringIO()
+        call_command('benchmark_tag_extractors', posts=5, sentences=3, stdout=out)
+
+        self.assertIn('5 posts', out.getvalue())
+        self.assertIn('blog.nlp.NLTKNounExtractor', out.getvalue())
+        self.assertIn('blog.nlp.StopWordExtractor', out.getvalue())
+
+
+class BenchmarkTopPostsCommandTest(TestCase):
+
+    def test_benchmark_reports_every_window_and_keeps_nothing(self):
+        out = StringIO()
+        call_command('benchmark_top_posts', posts=3, days=5, repeat=1, explain=True, stdout=out)
+
+        self.assertIn('3 posts', out.getvalue())
+        self.assertIn('  90 days', out.getvalue())
+        self.assertFalse(BlogPost.objects.exists())
+
+
+class ProcessTagJobsCommandTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.blogpost = BlogPost.objects.create(title='Guitars', description='<p>The guitar and the drum.</p>')
+
+    def test_failing_step_does_not_stop_the_worker(self):
+        TagJob.objects.create(blogpost=self.blogpost)
+        out = StringIO()
+
+        with mock.patch('blog.management.commands.process_tag_jobs.refresh_trending_posts', side_effect=RuntimeError,
+                        __name__='refresh_trending_posts'), \
+                mock.patch('blog.management.commands.process_tag_jobs.close_old_connections'), \
+                self.assertLogs('blog.management.commands.process_tag_jobs', 'ERROR') as logs:
+            call_command('process_tag_jobs', once=True, stdout=out)
+
+        self.assertIn('Processed 1 tag job(s)', out.getvalue())
+        self.assertIn('refresh_trending_posts failed', logs.output[0])
+        self.assertEqual(Tag.objects.get(word='guitar').quantity, 1)
+
+    def test_orphaned_terms_are_only_looked_for_periodically(self):
+        with mock.patch('blog.management.commands.process_tag_jobs.delete_orphaned_terms') as delete_orphaned_terms, \
+                mock.patch('time.sleep', side_effect=[None, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('process_tag_jobs', stdout=StringIO())
+
+        # three rounds within the stats interval
+        delete_orphaned_terms.assert_called_once()
@@ -0,0 +1,87 @@
+import time
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from blog.counters import ViewCounter, view_counter
+from blog.models import BlogPost, BlogAuthor, User
+
+
+class ViewCounterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.blogpost = BlogPost.objects.create(title='Blog 1', description='This is the blog post #1!', author=blogger)
+        cls.other_blogpost = BlogPost.objects.create(title='Blog 2', description='This is the blog post #2!', author=blogger)
+
+    def setUp(self):
+        self.counter = ViewCounter(interval=None)
+
+    def test_views_are_buffered_until_flush(self):
+        with self.assertNumQueries(0):
+            for i in range(3):
+                self.counter.increment(self.blogpost.pk)
+            self.counter.increment(self.other_blogpost.pk)
+
+        self.assertEqual(BlogPost.objects.get(pk=self.blogpost.pk).views, 0)
+        self.assertEqual(self.counter.get_pending(self.blogpost.pk), 3)
+
+        # the views update, the existing blog posts and the stats insert in a transaction,
+        # regardless of the number of blog posts
+        with self.assertNumQueries(5):
+            self.assertEqual(self.counter.flush(), 4)
+
+        self.assertEqual(BlogPost.objects.get(pk=self.blogpost.pk).views, 3)
+        self.assertEqual(BlogPost.objects.get(pk=self.other_blogpost.pk).views, 1)
+        self.assertEqual(self.counter.get_pending(self.blogpost.pk), 0)
+
+    def test_views_after_flush_are_flushed_next_time(self):
+        self.counter.increment(self.blogpost.pk)
+        self.counter.flush()
+        self.counter.increment(self.blogpost.pk)
+        self.counter.flush()
+        self.assertEqual(self.counter.flush(), 0)
+        self.assertEqual(BlogPost.objects.get(pk=self.blogpost.pk).views, 2)
+
+    def test_first_view_after_the_interval_flushes(self):
+        counter = ViewCounter(interval=30)
+        counter.increment(self.blogpost.pk)
+
+        now = time.monotonic()
+        with mock.patch('time.monotonic', lambda: now + 31):
+            counter.increment(self.blogpost.pk)
+            with self.assertNumQueries(0):
+                counter.increment(self.blogpost.pk)
+        self.assertEqual(BlogPost.objects.get(pk=self.blogpost.pk).views, 2)
+        self.assertEqual(counter.get_pending(self.blogpost.pk), 1)
+
+    def test_failed_flush_keeps_the_views(self):
+        self.counter.increment(self.blogpost.pk)
+        with mock.patch('blog.counters.record_post_stats', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.counter.flush()
+
+        self.assertEqual(BlogPost.objects.get(pk=self.blogpost.pk).views, 0)
+        self.assertEqual(self.counter.flush(), 1)
+        self.assertEqual(BlogPost.objects.get(pk=self.blogpost.pk).views, 1)
+
+    def test_views_of_deleted_blog_posts_are_dropped(self):
+        self.counter.increment(self.other_blogpost.pk)
+        self.other_blogpost.delete()
+        self.assertEqual(self.counter.flush(), 1)
+        self.assertFalse(BlogPost.objects.filter(pk=self.other_blogpost.pk).exists())
+
+    @mock.patch.object(view_counter, 'interval', None)
+    def test_detail_view_shows_pending_views_without_writing_them(self):
+        view_counter.counts.clear()
+        self.client.get(reverse('blog:blog-detail', kwargs={'slug': self.blogpost.slug}))
+        response = self.client.get(reverse('blog:blog-detail', kwargs={'slug': self.blogpost.slug}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['views'], 2)
+        self.assertEqual(BlogPost.objects.get(pk=self.blogpost.pk).views, 0)
+        view_counter.counts.clear()
@@ -0,0 +1,76 @@
+from django.test import TestCase
+from blog.hll import HyperLogLog, merge_sketches
+from blog.models import BlogPost, BlogAuthor, User
+from blog.utils import add_anonymous_visitor, count_anonymous_visitors
+
+
+class HyperLogLogTest(TestCase):
+
+    def test_small_counts_are_exact_enough(self):
+        sketch = HyperLogLog()
+        for i in range(100):
+            sketch.add(f'session{i}')
+            sketch.add(f'session{i}')
+
+        self.assertAlmostEqual(sketch.count(), 100, delta=3)
+
+    def test_large_counts_are_within_error(self):
+        sketch = HyperLogLog()
+        for i in range(50000):
+            sketch.add(f'session{i}')
+
+        self.assertAlmostEqual(sketch.count(), 50000, delta=50000 * 0.1)
+        self.assertEqual(len(sketch.to_bytes()), 1024)
+
+    def test_merge_counts_union(self):
+        first, second = HyperLogLog(), HyperLogLog()
+        for i in range(3000):
+            first.add(f'session{i}')
+        for i in range(2000, 5000):
+            second.add(f'session{i}')
+
+        merged = merge_sketches([first.to_bytes(), second.to_bytes(), b''])
+        self.assertAlmostEqual(merged.count(), 5000, delta=5000 * 0.1)
+
+    def test_round_trip(self):
+        sketch = HyperLogLog()
+        sketch.add('session')
+        self.assertEqual(HyperLogLog.from_bytes(sketch.to_bytes()), sketch)
+        self.assertEqual(HyperLogLog.from_bytes(b'').count(), 0)
+
+    def test_merge_rejects_different_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
+
+
+class AnonymousVisitorsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.blogpost = BlogPost.objects.create(title='Blog 1', description='This is the blog post #1!', author=blogger)
+        cls.other_blogpost = BlogPost.objects.create(title='Blog 2', description='This is the blog post #2!', author=blogger)
+
+    def test_repeated_visit_does_not_write(self):
+        self.assertTrue(add_anonymous_visitor(self.blogpost, 'session1'))
+        with self.assertNumQueries(0):
+            self.assertFalse(add_anonymous_visitor(self.blogpost, 'session1'))
+
+        self.assertEqual(BlogPost.objects.get(pk=self.blogpost.pk).count_anonymous_visitors(), 1)
+
+    def test_visits_of_stale_instance_are_kept(self):
+        stale = BlogPost.objects.get(pk=self.blogpost.pk)
+        add_anonymous_visitor(self.blogpost, 'session1')
+        add_anonymous_visitor(stale, 'session2')
+
+        self.assertEqual(BlogPost.objects.get(pk=self.blogpost.pk).count_anonymous_visitors(), 2)
+
+    def test_visitors_are_merged_over_blog_posts(self):
+        add_anonymous_visitor(self.blogpost, 'session1')
+        add_anonymous_visitor(self.other_blogpost, 'session1')
+        add_anonymous_visitor(self.other_blogpost, 'session2')
+
+        self.assertEqual(count_anonymous_visitors(BlogPost.objects.all()), 2)
@@ -0,0 +1,121 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.test import TestCase
+from django.urls import reverse
+from blog.models import BlogPost, BlogAuthor, Comment, SiteStats, Tag, User
+from blog.utils import (INDEX_CACHE, INDEX_CACHE_TIMEOUT, get_index_values, get_most_pop_cats, get_tags,
+                        get_top_contributors, get_total_num, save_tags)
+
+
+def after_timeout():
+    now = time.time()
+    return mock.patch('time.time', lambda: now + INDEX_CACHE_TIMEOUT + 1)
+
+
+class IndexCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        cls.blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.blogpost = BlogPost.objects.create(title='Guitars', description='<p>A guitar.</p>', author=cls.blogger,
+                                               category='Music')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_index_values(self):
+        return get_total_num(), get_top_contributors(), get_most_pop_cats(), get_tags()
+
+    def test_index_values_are_cached(self):
+        values = self.get_index_values()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_index_values(), values)
+
+    def test_index_values_are_read_and_written_together(self):
+        index_cache = caches[INDEX_CACHE]
+        names = ('total_num', 'top_contributors', 'most_pop_cats')
+
+        with mock.patch.object(index_cache, 'set_many', wraps=index_cache.set_many) as set_many:
+            values = get_index_values(*names)
+        set_many.assert_called_once()
+        self.assertEqual(values['total_num'], (1, 1, 0))
+
+        with mock.patch.object(index_cache, 'get_many', wraps=index_cache.get_many) as get_many, \
+                self.assertNumQueries(0):
+            self.assertEqual(get_index_values(*names), values)
+        get_many.assert_called_once()
+
+    def test_writes_invalidate_on_commit(self):
+        self.get_index_values()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BlogPost.objects.create(title='Movies', description='<p>A movie.</p>', author=self.blogger,
+                                    category='Movies')
+            Comment.objects.create(description='Great!', blog=self.blogpost)
+        self.assertEqual(get_total_num(), (2, 1, 1))
+        self.assertEqual(get_top_contributors(), {self.blogger: 2})
+        self.assertEqual(get_most_pop_cats(), ['Movies', 'Music'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blogpost.category = 'History'
+            self.blogpost.save()
+        self.assertEqual(get_most_pop_cats(), ['History', 'Movies'])
+
+    def test_unrelated_saves_keep_the_cache(self):
+        self.get_index_values()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blogpost.title = 'Electric guitars'
+            self.blogpost.save()
+        with self.assertNumQueries(0):
+            self.get_index_values()
+
+    def test_staleness_is_bounded_without_invalidation(self):
+        self.assertEqual(get_total_num().comments, 0)
+
+        # bulk updates don't send signals
+        SiteStats.objects.update(comments=5)
+        self.assertEqual(get_total_num().comments, 0)
+
+        with after_timeout():
+            self.assertEqual(get_total_num().comments, 5)
+
+
+class TagCloudCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # no bloggers, so the index page doesn't need profile images
+        cls.blogpost = BlogPost.objects.create(title='Guitars', description='<p>A guitar.</p>')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tag_cloud_fragment_is_cached_until_tags_change(self):
+        Tag.objects.create(word='guitar', quantity=1)
+        self.assertContains(self.client.get(reverse('blog:index')), 'guitar')
+
+        Tag.objects.create(word='violin', quantity=1)
+        with mock.patch('blog.views.get_tags') as get_tags:
+            response = self.client.get(reverse('blog:index'))
+        get_tags.assert_not_called()
+        self.assertNotContains(response, 'violin')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            save_tags(self.blogpost, {'drum': 1}, {'drum': 1})
+        response = self.client.get(reverse('blog:index'))
+        self.assertContains(response, 'violin')
+        self.assertContains(response, 'drum')
+
+    def test_tag_cloud_expires_without_invalidation(self):
+        self.client.get(reverse('blog:index'))
+        Tag.objects.create(word='violin', quantity=1)
+
+        with after_timeout():
+            self.assertContains(self.client.get(reverse('blog:index')), 'violin')
@@ -0,0 +1,162 @@
+from io import StringIO
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from blog.inverted_index import IndexSegment, InvertedIndex
+from blog.models import BlogPost, BlogAuthor, User
+from blog.search import InvertedIndexSearchBackend, SearchResults
+
+
+DOCUMENTS = [
+    (3, ['guitar', 'drum', 'drum']),
+    (1, ['guitar', 'strings']),
+    (7, ['piano', 'cello', 'guitar', 'guitar', 'guitar', 'piano']),
+]
+
+
+class InvertedIndexTest(TestCase):
+
+    def test_segment_round_trip(self):
+        segment = IndexSegment(IndexSegment.serialize(DOCUMENTS, 12.5))
+
+        self.assertEqual(list(segment.doc_ids), [1, 3, 7])
+        self.assertEqual(list(segment.doc_lengths), [2, 3, 6])
+        self.assertEqual(segment.built_at, 12.5)
+        self.assertEqual([segment.get_term(index) for index in range(segment.num_terms)],
+                         [b'cello', b'drum', b'guitar', b'piano', b'strings'])
+        self.assertEqual([list(table) for table in segment.get_postings('guitar')], [[0, 1, 2], [1, 1, 3]])
+        self.assertEqual(segment.get_postings('violin'), ((), ()))
+        self.assertEqual(segment.find_doc(7), 2)
+        self.assertIsNone(segment.find_doc(5))
+
+    def test_file_is_memory_mapped(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'search.index')
+
+        IndexSegment.write(path, DOCUMENTS)
+        self.assertEqual(os.listdir(directory), ['search.index'])
+        self.assertEqual(list(IndexSegment.load(path).doc_ids), [1, 3, 7])
+
+        with open(path, 'wb') as file:
+            file.write(b'not an index')
+        with self.assertRaises(ValueError):
+            IndexSegment.load(path)
+
+    def test_bm25_ranking(self):
+        index = InvertedIndex(IndexSegment(IndexSegment.serialize(DOCUMENTS)))
+
+        self.assertEqual([doc_id for doc_id, score in index.search(['guitar'])], [7, 1, 3])
+        self.assertEqual([doc_id for doc_id, score in index.search(['drum', 'guitar'])], [3])
+        self.assertEqual(index.search(['drum', 'violin']), [])
+        self.assertEqual(index.search([]), [])
+
+    def test_added_and_removed_documents(self):
+        index = InvertedIndex(IndexSegment(IndexSegment.serialize(DOCUMENTS)))
+
+        index.add(3, ['violin'])
+        index.add(9, ['guitar', 'violin'])
+        index.remove(1)
+
+        self.assertEqual(len(index), 3)
+        self.assertEqual([doc_id for doc_id, score in index.search(['guitar'])], [7, 9])
+        self.assertEqual([doc_id for doc_id, score in index.search(['violin'])], [3, 9])
+        self.assertEqual(index.search(['drum']), [])
+
+
+class InvertedIndexSearchBackendTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        cls.blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.guitars = BlogPost.objects.create(title='Guitars', author=cls.blogger,
+                                              description='<p>The guitar and the drum.</p>')
+        cls.drums = BlogPost.objects.create(title='Drums', author=cls.blogger,
+                                            description='<p>A drum, a drum and a guitar.</p>')
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'search.index')
+        self.backend = InvertedIndexSearchBackend(self.path)
+
+    def search(self, query):
+        return list(SearchResults(query, self.backend)[:])
+
+    def test_missing_file_falls_back_to_the_database(self):
+        self.assertEqual(self.search('drum'), [self.drums, self.guitars])
+        self.assertEqual(self.search('guitars'), [self.guitars])
+        self.assertFalse(os.path.exists(self.path))
+
+        # the worker writes it
+        self.assertTrue(self.backend.refresh())
+        self.assertEqual(self.search('drum'), [self.drums, self.guitars])
+        self.assertEqual(self.backend.count('guitar'), 2)
+
+    def test_saved_blog_posts_are_searchable_before_a_rebuild(self):
+        self.backend.rebuild()
+
+        self.guitars.description = '<p>A violin.</p>'
+        self.guitars.save()
+        pianos = BlogPost.objects.create(title='Pianos', author=self.blogger, description='<p>A violin.</p>')
+
+        self.assertEqual(self.search('violin'), [self.guitars, pianos])
+        self.assertEqual(self.search('drum'), [self.drums])
+
+    def test_deleted_blog_posts_are_not_found(self):
+        self.backend.rebuild()
+        self.backend.load()
+        other = InvertedIndexSearchBackend(self.path)
+        other.load()
+
+        # the backend of this process forgets it on commit, others when they load the file
+        with self.captureOnCommitCallbacks(execute=True):
+            self.backend.delete([self.drums.pk])
+            self.drums.delete()
+        self.assertEqual(self.backend.count('drum'), 1)
+        self.assertEqual(self.search('drum'), [self.guitars])
+        self.assertEqual(list(SearchResults('drum', other)[:]), [self.guitars])
+
+        other.rebuild()
+        self.assertEqual(other.count('drum'), 1)
+
+    def test_index_file_is_rewritten_by_the_worker_after_many_changes(self):
+        self.backend.rebuild()
+        mtime = os.stat(self.path).st_mtime_ns
+        self.assertFalse(self.backend.refresh())
+
+        self.guitars.title = 'Lutes'
+        self.guitars.save()
+        with mock.patch('blog.search.SEARCH_INDEX_MAX_CHANGES', 0):
+            # searches only read the changes
+            self.assertEqual(self.search('lutes'), [self.guitars])
+            self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+
+            self.assertTrue(self.backend.refresh())
+        self.assertEqual(len(IndexSegment.load(self.path).get_postings('lutes')[0]), 1)
+        self.assertEqual(self.search('lutes'), [self.guitars])
+
+    def test_deleted_documents_make_the_index_stale(self):
+        self.backend.rebuild()
+        self.drums.delete()
+
+        with mock.patch('blog.search.SEARCH_INDEX_MAX_CHANGES', 0):
+            self.assertTrue(self.backend.refresh())
+        self.assertEqual(list(IndexSegment.load(self.path).doc_ids), [self.guitars.pk])
+
+
+class BenchmarkSearchTest(TestCase):
+
+    def test_benchmark_reports_every_size(self):
+        out = StringIO()
+        call_command('benchmark_search', posts=[20, 50], sentences=2, repeat=1, stdout=out)
+        self.assertIn('20 posts', out.getvalue())
+        self.assertIn('50 posts', out.getvalue())
+        self.assertIn('lantern glacier', out.getvalue())
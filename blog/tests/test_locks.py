@@ -0,0 +1,134 @@
+from datetime import timedelta
+import threading
+import time
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from blog.locks import DatabaseLock, LockTimeout, run_coalesced
+from blog.models import Lock
+from blog.signals import tag_batch
+from blog.utils import delete_tags, get_tags_lock
+
+
+def in_thread(func):
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # every thread has its own database connection
+            connection.close()
+    return run
+
+
+class DatabaseLockTest(TransactionTestCase):
+
+    def test_lock_is_exclusive_across_threads(self):
+        running = []
+        overlaps = []
+
+        @in_thread
+        def work():
+            with DatabaseLock('test', wait=5):
+                running.append(1)
+                overlaps.append(len(running))
+                time.sleep(0.01)
+                running.pop()
+
+        threads = [threading.Thread(target=work) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(overlaps), 4)
+        self.assertEqual(max(overlaps), 1)
+
+    def test_lock_times_out(self):
+        lock = DatabaseLock('test')
+        self.assertTrue(lock.acquire())
+        with self.assertRaises(LockTimeout):
+            with DatabaseLock('test', wait=0.1):
+                pass
+        lock.release()
+        self.assertTrue(DatabaseLock('test').acquire(blocking=False))
+
+    def test_expired_lock_is_taken_over(self):
+        lock = DatabaseLock('test')
+        lock.acquire()
+        Lock.objects.update(expires=timezone.now() - timedelta(seconds=1))
+
+        self.assertTrue(DatabaseLock('test').acquire(blocking=False))
+
+    def test_expired_lock_is_not_released_by_previous_owner(self):
+        lock = DatabaseLock('test')
+        lock.acquire()
+        Lock.objects.update(expires=timezone.now() - timedelta(seconds=1))
+        other = DatabaseLock('test')
+        other.acquire()
+        lock.release()
+        self.assertFalse(DatabaseLock('test').acquire(blocking=False))
+
+
+class RunCoalescedTest(TransactionTestCase):
+
+    def test_requests_during_a_run_coalesce_into_one_follow_up_run(self):
+        started = threading.Event()
+        release = threading.Event()
+        runs = []
+
+        def rebuild():
+            runs.append(1)
+            started.set()
+            release.wait(5)
+
+        owner = threading.Thread(target=in_thread(run_coalesced), args=('test', rebuild))
+        owner.start()
+        started.wait(5)
+
+        results = []
+        request = in_thread(lambda: results.append(run_coalesced('test', rebuild)))
+        requests = [threading.Thread(target=request) for i in range(5)]
+        for thread in requests:
+            thread.start()
+        for thread in requests:
+            thread.join()
+        release.set()
+        owner.join()
+
+        self.assertEqual(results, [False] * 5)
+        self.assertEqual(len(runs), 2)
+        self.assertFalse(Lock.objects.exists())
+
+    def test_requests_during_a_run_are_run_once_more_by_the_owner(self):
+        runs = []
+        requests = []
+
+        def rebuild():
+            runs.append(1)
+            if len(runs) == 1:
+                requests.extend(run_coalesced('test', rebuild) for i in range(3))
+
+        self.assertTrue(run_coalesced('test', rebuild))
+        self.assertEqual(requests, [False] * 3)
+        self.assertEqual(len(runs), 2)
+        self.assertFalse(Lock.objects.exists())
+
+    def test_run_without_contention(self):
+        runs = []
+        self.assertTrue(run_coalesced('test', runs.append, 1))
+        self.assertEqual(runs, [1])
+        self.assertFalse(Lock.objects.exists())
+
+
+class DeleteTagsLockTest(TestCase):
+
+    def test_deletion_on_commit_does_not_wait_for_the_lock(self):
+        with get_tags_lock():
+            with self.assertRaises(LockTimeout):
+                delete_tags([1], blocking=False)
+            # left to the worker
+            tag_batch.deleted.add(1)
+            started = time.monotonic()
+            tag_batch.flush()
+            self.assertLess(time.monotonic() - started, 1)
@@ -0,0 +1,59 @@
+from unittest import mock
+
+import nltk
+from django.test import SimpleTestCase
+from blog.nlp import (NLTKModels, NLTKNounExtractor, StopWordExtractor,
+                      CachedLexiconNounExtractor, get_noun_extractor, warmup)
+
+
+class NLTKModelsTest(SimpleTestCase):
+
+    def test_pos_tag_matches_nltk(self):
+        text = "The guitar isn't loud. John's drum is."
+        self.assertEqual(NLTKModels().pos_tag(text), nltk.pos_tag(nltk.word_tokenize(text)))
+
+    def test_models_are_loaded_once(self):
+        models = NLTKModels()
+        with mock.patch('nltk.tag.perceptron.PerceptronTagger', wraps=nltk.tag.perceptron.PerceptronTagger) as tagger:
+            models.pos_tag('The guitar.')
+            models.pos_tag('The drum.')
+        tagger.assert_called_once()
+
+    def test_stats(self):
+        models = NLTKModels()
+        self.assertIsNone(models.stats()['load_time'])
+
+        models.pos_tag('The guitar.')
+        stats = models.stats()
+        self.assertIsNotNone(stats['load_time'])
+        self.assertEqual(stats['calls'], 1)
+        self.assertGreater(stats['mean_call_time'], 0)
+
+
+class NounExtractorTest(SimpleTestCase):
+
+    def test_get_noun_extractor_by_path(self):
+        extractor = get_noun_extractor('blog.nlp.StopWordExtractor')
+        self.assertIsInstance(extractor, StopWordExtractor)
+        self.assertIs(get_noun_extractor('blog.nlp.StopWordExtractor'), extractor)
+
+    def test_warmup_loads_nltk_only_for_extractors_using_it(self):
+        with mock.patch('blog.nlp.nltk_models.load') as load:
+            warmup('blog.nlp.StopWordExtractor')
+            load.assert_not_called()
+
+            warmup('blog.nlp.CachedLexiconNounExtractor')
+            load.assert_called_once()
+
+    def test_stop_word_extractor_skips_stop_words_and_adverbs(self):
+        nouns = StopWordExtractor().extract('The guitar sounds really loud, and the drum too.')
+        self.assertEqual(nouns, ['guitar', 'sounds', 'loud', 'drum'])
+
+    def test_cached_lexicon_extractor_matches_nltk_and_skips_known_sentences(self):
+        text = 'The guitar and the drum. The drum and the guitar.'
+        extractor = CachedLexiconNounExtractor()
+        self.assertEqual(extractor.extract(text), NLTKNounExtractor().extract(text))
+
+        with mock.patch('blog.nlp.nltk_models.tag') as tag:
+            extractor.extract('The drum and the guitar.')
+        tag.assert_not_called()
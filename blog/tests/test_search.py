@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.test import TestCase
+from django.urls import reverse
+from blog.models import BlogPost, BlogAuthor, SearchDocument, User
+from blog.search import DatabaseSearchBackend, SearchResults, search_blogposts
+
+
+class SearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        cls.blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.guitars = BlogPost.objects.create(title='Guitars', author=cls.blogger,
+                                              description='<p>The guitar and the drum.</p><p>Strings</p>')
+        cls.drums = BlogPost.objects.create(title='Drums', author=cls.blogger,
+                                            description='<p class="guitar">A drum, a drum and a drum.</p>')
+        cls.pianos = BlogPost.objects.create(title='Pianos', author=cls.blogger,
+                                             description='<p>The piano &amp; the <a href="/guitar">cello</a>.</p>')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_document_is_stored_without_html(self):
+        self.assertEqual(SearchDocument.objects.get(pk=self.guitars.pk).body, ' The guitar and the drum.  Strings ')
+        self.assertEqual(SearchDocument.objects.get(pk=self.pianos.pk).body, ' The piano & the  cello . ')
+
+    def test_markup_is_not_matched(self):
+        self.assertEqual(list(search_blogposts('guitar')[:]), [self.guitars])
+        self.assertEqual(list(search_blogposts('class')[:]), [])
+
+    def test_results_are_ranked(self):
+        self.assertEqual(list(search_blogposts('drum')[:]), [self.drums, self.guitars])
+        self.assertEqual(list(search_blogposts('drums')[:]), [self.drums, self.guitars])
+
+    def test_all_words_have_to_match(self):
+        self.assertEqual(list(search_blogposts('guitar drum')[:]), [self.guitars])
+        self.assertEqual(list(search_blogposts('"drum" OR piano*')[:]), [])
+        self.assertEqual(search_blogposts('!!!').count(), 0)
+
+    def test_saved_and_deleted_blog_posts_are_reindexed(self):
+        self.pianos.description = '<p>A drum.</p>'
+        self.pianos.save()
+        self.assertEqual(search_blogposts('drum').count(), 3)
+        self.assertEqual(search_blogposts('cello').count(), 0)
+
+        self.drums.delete()
+        self.assertEqual(search_blogposts('drum').count(), 2)
+
+    def test_only_the_shown_page_is_loaded(self):
+        for blog_id in range(12):
+            BlogPost.objects.create(title=f'Blog {blog_id}', description='<p>A violin.</p>', author=self.blogger)
+
+        # the count, the ranked ids of the page, the blog posts of the page and their snippets
+        with self.assertNumQueries(4):
+            page = Paginator(search_blogposts('violin'), 5).get_page(3)
+            self.assertEqual(len(page), 2)
+            self.assertEqual(page.paginator.num_pages, 3)
+
+    def test_database_backend(self):
+        results = SearchResults('drum', backend=DatabaseSearchBackend())
+        self.assertEqual(results.count(), 2)
+        self.assertEqual(set(results[:]), {self.guitars, self.drums})
+
+    def test_search_view_without_results(self):
+        response = self.client.get(reverse('blog:search'), {'search': 'trumpet'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+        self.assertContains(response, "Related blogposts haven't been found")
+
+    def test_rebuild_search_index_command(self):
+        SearchDocument.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+
+        self.assertIn('Indexed 3 blog post(s)', out.getvalue())
+        self.assertEqual(list(search_blogposts('cello')[:]), [self.pianos])
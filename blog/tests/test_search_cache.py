@@ -0,0 +1,121 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.test import TestCase
+from django.urls import reverse
+from blog.models import BlogPost, BlogAuthor, User
+from blog.search import get_snippet
+from blog.search_cache import search_cache
+
+
+class SnippetTest(TestCase):
+
+    def test_matching_words_are_highlighted_and_escaped(self):
+        self.assertEqual(get_snippet('The <b>Drums</b> & a  drum.', ['drum']),
+                         'The &lt;b&gt;<mark>Drums</mark>&lt;/b&gt; &amp; a <mark>drum</mark>.')
+        self.assertEqual(get_snippet('A piano.', ['drum']), 'A piano.')
+
+    def test_long_text_is_cut_around_the_first_match(self):
+        text = ' '.join(f'word{i}' for i in range(100)) + ' drum ' + ' '.join(f'word{i}' for i in range(100))
+        snippet = get_snippet(text, ['drum'], length=60)
+
+        self.assertTrue(snippet.startswith('… word'))
+        self.assertTrue(snippet.endswith(' …'))
+        self.assertIn('<mark>drum</mark>', snippet)
+        self.assertLess(len(snippet), 80)
+
+
+class SearchCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        cls.blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.guitars = BlogPost.objects.create(title='Guitars', author=cls.blogger,
+                                              description='<p>The guitar and the drum.</p>')
+        cls.drums = BlogPost.objects.create(title='Drums', author=cls.blogger,
+                                            description='<p>A drum, a drum and a drum.</p>')
+
+    def setUp(self):
+        cache.clear()
+        # every search is counted
+        patcher = mock.patch('blog.search_cache.SEARCH_CACHE_STATS_RATE', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def search(self, query):
+        blogposts, corrected = search_cache.search(query)
+        return list(blogposts[:])
+
+    def test_normalized_queries_are_served_from_the_cache(self):
+        self.assertEqual(self.search('drum'), [self.drums, self.guitars])
+
+        # the blog posts of the page and nothing else
+        with self.assertNumQueries(1):
+            blogposts = self.search('  DRUM ')
+        self.assertEqual(blogposts, [self.drums, self.guitars])
+        self.assertEqual(blogposts[1].snippet, 'The guitar and the <mark>drum</mark>.')
+        self.assertEqual(search_cache.get_stats(), {'hits': 1, 'misses': 1, 'ratio': 0.5})
+
+    def test_saved_and_deleted_blog_posts_invalidate_the_cache(self):
+        self.search('drum')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.guitars.description = '<p>A piano.</p>'
+            self.guitars.save()
+            # the version is bumped once the change is visible to other searches
+            self.assertEqual(self.search('drum'), [self.drums, self.guitars])
+        self.assertEqual(self.search('drum'), [self.drums])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.drums.delete()
+        self.assertEqual(self.search('drum'), [])
+        self.assertEqual(search_cache.get_stats()['hits'], 1)
+
+    def test_stats_are_sampled(self):
+        self.search('drum')
+
+        with mock.patch('blog.search_cache.SEARCH_CACHE_STATS_RATE', 0.5), \
+                mock.patch('random.random', side_effect=[0.7, 0.2]), \
+                mock.patch.object(cache, 'incr', wraps=cache.incr) as incr:
+            self.search('drum')
+            self.search('drum')
+            self.assertEqual(incr.call_count, 1)
+            self.assertEqual(search_cache.get_stats(), {'hits': 2, 'misses': 2, 'ratio': 0.5})
+
+    def test_pages_after_the_cached_ids_are_searched(self):
+        for blog_id in range(12):
+            BlogPost.objects.create(title=f'Blog {blog_id}', description='<p>A violin.</p>', author=self.blogger)
+
+        with mock.patch('blog.search_cache.SEARCH_CACHE_MAX_RESULTS', 5):
+            search_cache.search('violin')
+            blogposts, corrected = search_cache.search('violin')
+
+        self.assertEqual(blogposts.count(), 12)
+        page = Paginator(blogposts, 5).get_page(3)
+        self.assertEqual(len(page), 2)
+        self.assertEqual(page[0].snippet, 'A <mark>violin</mark>.')
+
+    def test_evicted_version_does_not_revive_old_entries(self):
+        self.search('drum')
+        cache.delete('blog:search:version')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.guitars.save()
+
+        self.search('drum')
+        self.assertEqual(search_cache.get_stats()['hits'], 0)
+
+    def test_search_view_and_stats_command(self):
+        self.client.get(reverse('blog:search'), {'search': 'drum'})
+        response = self.client.get(reverse('blog:search'), {'search': 'drum'})
+        self.assertContains(response, 'A <mark>drum</mark>, a <mark>drum</mark> and a <mark>drum</mark>.')
+
+        out = StringIO()
+        call_command('search_cache_stats', reset=True, stdout=out)
+        self.assertEqual(out.getvalue(), '1 hit(s), 1 miss(es), hit ratio 50.0%\n')
+        self.assertEqual(search_cache.get_stats()['hits'], 0)
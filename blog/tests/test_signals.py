@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.core import serializers
+from django.test import TestCase
+from blog.models import BlogPost, BlogAuthor, PostTerm, Tag, TagJob, User
+from blog.signals import suppress_tag_updates, tag_batch
+from blog import utils
+from blog.utils import update_tags
+
+
+class TagBatchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        for blog_id in range(3):
+            blogpost = BlogPost.objects.create(title=f'Blog {blog_id}', description='<p>The guitar.</p>', author=blogger)
+            update_tags(blogpost)
+
+    def test_bulk_delete_updates_tags_once(self):
+        with mock.patch('blog.signals.delete_tags', wraps=utils.delete_tags) as delete_tags:
+            with self.captureOnCommitCallbacks(execute=True):
+                BlogPost.objects.all().delete()
+
+        delete_tags.assert_called_once()
+        self.assertEqual(len(delete_tags.call_args[0][0]), 3)
+        self.assertFalse(Tag.objects.exists())
+        self.assertFalse(PostTerm.objects.exists())
+
+    def test_saves_in_transaction_are_queued_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for blogpost in BlogPost.objects.all():
+                blogpost.save()
+                blogpost.save()
+        self.assertEqual(TagJob.objects.count(), 3)
+
+    def test_suppressed_changes_are_skipped(self):
+        with suppress_tag_updates(), self.captureOnCommitCallbacks(execute=True) as callbacks:
+            BlogPost.objects.first().save()
+            BlogPost.objects.first().delete()
+
+        self.assertNotIn(tag_batch.flush, callbacks)
+        self.assertEqual(Tag.objects.get(word='guitar').quantity, 3)
+
+    def test_fixture_loading_is_skipped(self):
+        data = serializers.serialize('json', BlogPost.objects.all())
+        BlogPost.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for obj in serializers.deserialize('json', data):
+                obj.save()
+
+        self.assertEqual(BlogPost.objects.count(), 3)
+        self.assertFalse(TagJob.objects.exists())
@@ -0,0 +1,138 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from blog.models import BlogPost, BlogAuthor, CategoryStats, Comment, ContributorStats, SiteStats, User
+from blog.stats import (get_category_stats, get_contributor_stats, get_site_stats, rebuild_site_stats,
+                        update_site_stats)
+from blog.utils import get_most_pop_cats, get_top_contributors, get_total_num
+
+
+class SiteStatsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user2 = User.objects.create_user(username='testuser2', password='2HJ1vRV0Z&3iD')
+
+        cls.blogger1 = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.blogger2 = BlogAuthor.objects.create(username=test_user2, bio='Hi! My name is test_user2!')
+        cls.music = BlogPost.objects.create(title='Guitars', description='<p>A guitar.</p>', author=cls.blogger1,
+                                            category='Music')
+        BlogPost.objects.create(title='Drums', description='<p>A drum.</p>', author=cls.blogger1, category='Music')
+        BlogPost.objects.create(title='Movies', description='<p>A movie.</p>', author=cls.blogger2,
+                                category='Movies')
+        Comment.objects.create(description='Great!', blog=cls.music, commenter=test_user2)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_created_objects_are_counted(self):
+        self.assertEqual(get_total_num(), (3, 2, 1))
+        self.assertEqual(get_category_stats(), [('Music', 2), ('Movies', 1)])
+        self.assertEqual(get_contributor_stats(), [(self.blogger1, 2), (self.blogger2, 1)])
+
+    def test_deleted_objects_are_counted(self):
+        self.music.delete()
+        self.assertEqual(get_total_num(), (2, 2, 0))
+        self.assertEqual(get_category_stats(), [('Movies', 1), ('Music', 1)])
+
+        # blog posts of deleted bloggers are kept
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blogger2.delete()
+        self.assertEqual(get_total_num(), (2, 1, 0))
+        self.assertEqual(get_top_contributors(), {self.blogger1: 1})
+
+    def test_blog_posts_without_author_are_counted(self):
+        BlogPost.objects.create(title='History', description='<p>A war.</p>', category='History')
+        self.assertEqual(get_total_num(), (4, 2, 1))
+        self.assertEqual(get_most_pop_cats(), ['Music', 'History', 'Movies'])
+
+    def test_category_change_moves_the_count(self):
+        blogpost = BlogPost.objects.get(title='Drums')
+        blogpost.category = 'Movies'
+        blogpost.save()
+        blogpost.save()
+
+        self.assertEqual(get_most_pop_cats(), ['Movies', 'Music'])
+        self.assertEqual(CategoryStats.objects.get(pk='Movies').blog_posts, 2)
+
+        # saves of partially loaded blog posts only count a category they have loaded
+        BlogPost.objects.only('title').get(title='Drums').save()
+        self.assertEqual(get_category_stats(), [('Movies', 2), ('Music', 1)])
+
+    def test_author_change_moves_the_count(self):
+        blogpost = BlogPost.objects.get(title='Drums')
+        blogpost.author = self.blogger2
+        blogpost.save()
+        blogpost.save()
+        self.assertEqual(get_contributor_stats(), [(self.blogger2, 2), (self.blogger1, 1)])
+
+        blogpost.author = None
+        blogpost.save()
+        self.assertEqual(get_contributor_stats(), [(self.blogger1, 1), (self.blogger2, 1)])
+
+        # saves of partially loaded blog posts only count an author they have loaded
+        blogpost = BlogPost.objects.only('title').get(title='Movies')
+        blogpost.title = 'Films'
+        blogpost.save()
+        self.assertEqual(get_contributor_stats(), [(self.blogger1, 1), (self.blogger2, 1)])
+
+    def test_new_blogger_is_listed_without_blog_posts(self):
+        test_user3 = User.objects.create_user(username='testuser3', password='mMs7oA1!wEWx')
+        blogger3 = BlogAuthor.objects.create(username=test_user3, bio='Hi! My name is test_user3!')
+
+        self.assertEqual(get_top_contributors(), {self.blogger1: 2, self.blogger2: 1, blogger3: 0})
+
+    def test_index_page_numbers_come_from_the_stats_tables(self):
+        with self.assertNumQueries(3):
+            get_total_num()
+            get_top_contributors()
+            get_most_pop_cats()
+
+    def test_missing_stats_are_recounted(self):
+        SiteStats.objects.all().delete()
+        Comment.objects.create(description='Thanks!', blog=self.music)
+
+        self.assertEqual(get_total_num(), (3, 2, 2))
+
+    def test_only_the_missing_row_is_counted(self):
+        SiteStats.objects.all().delete()
+        ContributorStats.objects.filter(pk=self.blogger1).update(blog_posts=10)
+
+        with self.assertNumQueries(8):
+            # a failed update, three counts, a get and a create in a savepoint
+            update_site_stats(comments=1)
+        self.assertEqual(get_site_stats().comments, 1)
+        self.assertEqual(ContributorStats.objects.get(pk=self.blogger1).blog_posts, 10)
+
+    def test_concurrently_created_row_gets_the_delta(self):
+        SiteStats.objects.all().delete()
+        create = SiteStats.objects.get_or_create
+
+        def create_concurrently(**kwargs):
+            SiteStats.objects.create(pk=1, blog_posts=3, bloggers=2, comments=1)
+            return create(**kwargs)
+
+        with mock.patch.object(SiteStats.objects, 'get_or_create', create_concurrently):
+            update_site_stats(comments=1)
+        self.assertEqual(get_site_stats().comments, 2)
+
+    def test_rebuild_fixes_drifted_stats(self):
+        BlogPost.objects.filter(category='Movies').update(category='History')
+        ContributorStats.objects.filter(pk=self.blogger1).update(blog_posts=10)
+
+        out = StringIO()
+        call_command('rebuild_site_stats', stdout=out)
+        self.assertEqual(out.getvalue(), 'Counted 3 blog post(s), 2 blogger(s) and 1 comment(s)\n')
+        self.assertEqual(get_category_stats(), [('Music', 2), ('History', 1)])
+        self.assertEqual(get_contributor_stats(), [(self.blogger1, 2), (self.blogger2, 1)])
+
+    def test_rebuild_is_idempotent(self):
+        rebuild_site_stats()
+        rebuild_site_stats()
+
+        self.assertEqual(get_site_stats().blog_posts, 3)
+        self.assertEqual(SiteStats.objects.count(), 1)
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from blog.counters import view_counter
+from blog.models import BlogPost, BlogAuthor, Comment, PostStat, TopPost, User
+from blog.stats import (compact_post_stats, get_day_start, get_ranked_posts, get_top_posts, rank_top_posts,
+                        record_post_stat, record_post_stats)
+
+
+class PostStatTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.blogposts = [BlogPost.objects.create(title=f'Blog {blog_id}', description=f'This is the blog post #{blog_id}!',
+                                                 author=blogger) for blog_id in range(3)]
+        cls.now = timezone.now()
+
+    def record_views(self, views, days_ago):
+        record_post_stats({blogpost.pk: count for blogpost, count in zip(self.blogposts, views)},
+                          moment=self.now - timedelta(days=days_ago))
+
+    def test_flushed_views_are_recorded(self):
+        view_counter.increment(self.blogposts[0].pk)
+        view_counter.increment(self.blogposts[0].pk)
+        view_counter.flush()
+
+        stat = PostStat.objects.get()
+        self.assertEqual((stat.blogpost, stat.period, stat.views), (self.blogposts[0], PostStat.HOUR, 2))
+
+    def test_new_comment_is_recorded(self):
+        Comment.objects.create(description='This is the comment #1!', blog=self.blogposts[1])
+        self.assertEqual(PostStat.objects.get().comments, 1)
+
+    def test_top_posts_over_window(self):
+        self.record_views([1, 5, 0], days_ago=10)
+        self.record_views([4, 0, 1], days_ago=1)
+        self.record_views([1, 0, 3], days_ago=0)
+
+        self.assertEqual(get_top_posts(self.now - timedelta(days=2), limit=2),
+                         [(self.blogposts[0], 5), (self.blogposts[2], 4)])
+        self.assertEqual(get_top_posts(self.now - timedelta(days=30), self.now - timedelta(days=5)),
+                         [(self.blogposts[1], 5), (self.blogposts[0], 1)])
+
+    def test_unknown_metric_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_top_posts(self.now, metric='shares')
+
+    def test_compaction_keeps_totals(self):
+        self.record_views([1, 5, 0], days_ago=10)
+        self.record_views([2, 0, 0], days_ago=10)
+        record_post_stat(self.blogposts[0].pk, moment=self.now - timedelta(days=10), likes=1)
+        self.record_views([4, 0, 1], days_ago=0)
+        window_start = self.now - timedelta(days=30)
+        top_posts = get_top_posts(window_start)
+
+        self.assertEqual(compact_post_stats(self.now - timedelta(days=2)), (4, 2))
+
+        self.assertEqual(get_top_posts(window_start), top_posts)
+        self.assertEqual(get_top_posts(window_start, metric='likes')[0], (self.blogposts[0], 1))
+        daily = PostStat.objects.get(period=PostStat.DAY, blogpost=self.blogposts[0])
+        self.assertEqual(daily.start, get_day_start(self.now - timedelta(days=10)))
+        self.assertEqual(PostStat.objects.filter(period=PostStat.HOUR).count(), 2)
+
+    def test_ranked_posts_match_live_totals(self):
+        self.record_views([1, 5, 0], days_ago=10)
+        self.record_views([4, 0, 1], days_ago=1)
+        record_post_stat(self.blogposts[2].pk, moment=self.now - timedelta(days=1), likes=1)
+        rank_top_posts()
+
+        for days, metric in ((7, 'views'), (30, 'views'), (7, 'likes')):
+            with self.assertNumQueries(1):
+                ranked = get_ranked_posts(days, metric, limit=2)
+            self.assertEqual(ranked, get_top_posts(timezone.now() - timedelta(days=days), metric=metric, limit=2))
+
+    def test_compaction_ranks_top_posts(self):
+        self.record_views([1, 5, 0], days_ago=3)
+        compact_post_stats(self.now - timedelta(days=2))
+
+        self.assertEqual(get_ranked_posts(7), [(self.blogposts[1], 5), (self.blogposts[0], 1)])
+        self.assertTrue(TopPost.objects.filter(days=30, metric='comments').exists())
+
+    def test_unranked_windows_are_counted_live(self):
+        self.record_views([1, 5, 0], days_ago=2)
+        rank_top_posts()
+
+        self.assertEqual(get_ranked_posts(3), [(self.blogposts[1], 5), (self.blogposts[0], 1)])
+        with self.assertRaises(ValueError):
+            get_ranked_posts(7, metric='shares')
+
+    def test_compact_command(self):
+        self.record_views([1, 5, 0], days_ago=10)
+        out = StringIO()
+        call_command('compact_post_stats', days=2, stdout=out)
+        self.assertIn('Compacted 2 hourly row(s) into 2 daily row(s)', out.getvalue())
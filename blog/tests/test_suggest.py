@@ -0,0 +1,160 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from blog.counters import view_counter
+from blog.models import BlogPost, BlogAuthor, SearchDocument, Tag, User
+from blog.suggest import PrefixIndex, SuggestionIndex, suggestion_index
+
+
+class PrefixIndexTest(TestCase):
+
+    def setUp(self):
+        self.index = PrefixIndex()
+        self.index.add(PrefixIndex.POST, 1, 'My Old Guitar', 10, 'my-old-guitar')
+        self.index.add(PrefixIndex.POST, 2, 'Guitars and drums', 50, 'guitars-and-drums')
+        self.index.add(PrefixIndex.TAG, 'guitar', 'guitar', 3)
+
+    def test_titles_are_completed_from_any_word(self):
+        self.assertEqual(self.index.complete('gui'), [
+            ('tag', 'guitar', None),
+            ('post', 'Guitars and drums', 'guitars-and-drums'),
+            ('post', 'My Old Guitar', 'my-old-guitar'),
+        ])
+        self.assertEqual(self.index.complete('  OLD   gu'), [('post', 'My Old Guitar', 'my-old-guitar')])
+        self.assertEqual(self.index.complete('drum'), [('post', 'Guitars and drums', 'guitars-and-drums')])
+        self.assertEqual(self.index.complete('piano'), [])
+        self.assertEqual(self.index.complete(' '), [])
+
+    def test_limit_applies_to_each_kind(self):
+        self.assertEqual(self.index.complete('gui', limit=1), [
+            ('tag', 'guitar', None),
+            ('post', 'Guitars and drums', 'guitars-and-drums'),
+        ])
+
+    def test_completions_are_replaced_and_removed(self):
+        self.index.add(PrefixIndex.POST, 1, 'A piano', 10, 'my-old-guitar')
+        self.index.remove(PrefixIndex.POST, 2)
+        self.index.remove(PrefixIndex.TAG, 'violin')
+
+        self.assertEqual(self.index.complete('gui'), [('tag', 'guitar', None)])
+        self.assertEqual(self.index.complete('pia'), [('post', 'A piano', 'my-old-guitar')])
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(len(self.index.keys), 3)
+
+
+class SuggestViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        cls.blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.guitars = BlogPost.objects.create(title='Guitars', author=cls.blogger, description='<p>A guitar.</p>')
+        Tag.objects.create(word='guitar', quantity=1)
+
+    def setUp(self):
+        # the index lives as long as the process, every test starts from the database
+        suggestion_index.reload()
+        self.addCleanup(setattr, suggestion_index, 'index', None)
+
+    def get_suggestions(self, query):
+        response = self.client.get(reverse('blog:search-suggest'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['suggestions']
+
+    def test_suggestions_are_served_without_queries(self):
+        with self.assertNumQueries(0):
+            suggestions = self.get_suggestions('gu')
+
+        self.assertEqual(suggestions, [
+            {'kind': 'tag', 'text': 'guitar', 'url': reverse('blog:tags', args=['guitar'])},
+            {'kind': 'post', 'text': 'Guitars', 'url': reverse('blog:blog-detail', args=[self.guitars.slug])},
+        ])
+        self.assertEqual(self.get_suggestions(''), [])
+
+    def test_index_follows_saved_and_deleted_blog_posts(self):
+        drums = BlogPost.objects.create(title='Guitars and drums', author=self.blogger, description='<p>A drum.</p>')
+        self.assertEqual([suggestion['text'] for suggestion in self.get_suggestions('dru')], ['Guitars and drums'])
+
+        self.guitars.title = 'Pianos'
+        self.guitars.save()
+        drums.delete()
+        self.assertEqual([suggestion['text'] for suggestion in self.get_suggestions('gui')], ['guitar'])
+        self.assertEqual([suggestion['text'] for suggestion in self.get_suggestions('pia')], ['Pianos'])
+
+    def test_index_follows_tag_updates(self):
+        Tag.objects.create(word='gun', quantity=5)
+        Tag.objects.filter(word='guitar').delete()
+        suggestion_index.update_tags(['gun', 'guitar'])
+
+        self.assertEqual([suggestion['text'] for suggestion in self.get_suggestions('gu')], ['gun', 'Guitars'])
+
+
+class SuggestionIndexRefreshTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        cls.blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.guitars = BlogPost.objects.create(title='Guitars', author=cls.blogger, description='<p>A guitar.</p>')
+        cls.drums = BlogPost.objects.create(title='Guitars and drums', author=cls.blogger,
+                                            description='<p>A drum.</p>')
+        Tag.objects.create(word='guitar', quantity=1)
+
+    def setUp(self):
+        # signals of this process only reach the shared index, changes look like they came from another process
+        self.index = SuggestionIndex(interval=None)
+        self.index.get()
+
+    def complete(self, prefix):
+        return [text for kind, text, slug in self.index.complete(prefix)]
+
+    def test_changes_of_other_processes_are_picked_up(self):
+        self.guitars.title = 'Pianos'
+        self.guitars.save()
+        self.drums.delete()
+        Tag.objects.create(word='gun', quantity=5)
+        Tag.objects.filter(word='guitar').delete()
+
+        self.assertEqual(self.complete('gu'), ['guitar', 'Guitars', 'Guitars and drums'])
+        self.index.refresh()
+        self.assertEqual(self.complete('gu'), ['gun'])
+        self.assertEqual(self.complete('pia'), ['Pianos'])
+
+    def test_views_reorder_completions(self):
+        view_counter.increment(self.guitars.pk)
+        view_counter.flush()
+        self.assertEqual(self.complete('gui'), ['guitar', 'Guitars', 'Guitars and drums'])
+
+        for i in range(2):
+            view_counter.increment(self.drums.pk)
+        view_counter.flush()
+        self.index.refresh()
+        self.assertEqual(self.complete('gui'), ['guitar', 'Guitars and drums', 'Guitars'])
+
+    def test_refresh_reads_only_changed_rows(self):
+        hour_ago = timezone.now() - timedelta(hours=1)
+        SearchDocument.objects.update(updated=hour_ago)
+        Tag.objects.update(updated=hour_ago)
+        self.index.refresh()
+
+        self.guitars.title = 'Pianos'
+        self.guitars.save()
+
+        with mock.patch.object(PrefixIndex, 'add', wraps=self.index.index.add) as add:
+            self.index.refresh()
+        self.assertEqual([call.args[:2] for call in add.call_args_list], [(PrefixIndex.POST, self.guitars.pk)])
+
+    def test_refresher_is_started_on_first_use(self):
+        index = SuggestionIndex(interval=60)
+        self.assertIsNone(index.refresher)
+
+        index.complete('gui')
+        self.addCleanup(index.refresher.stop)
+        self.assertTrue(index.refresher.is_alive())
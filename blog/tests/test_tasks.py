@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.test import TestCase
+from blog.models import BlogPost, BlogAuthor, Tag, TagJob, User
+from blog.signals import tag_batch
+from blog.tasks import enqueue_tag_job, process_tag_jobs, TAG_JOB_MAX_ATTEMPTS
+
+
+class TagJobQueueTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.blogpost = BlogPost.objects.create(title='Guitars', description='<p>The guitar.</p>', author=blogger)
+
+    def test_save_enqueues_job_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.blogpost.save()
+        self.assertEqual(callbacks.count(tag_batch.flush), 1)
+        self.assertEqual(TagJob.objects.filter(blogpost=self.blogpost, status=TagJob.PENDING).count(), 1)
+        self.assertFalse(Tag.objects.filter(word='guitar').exists())
+
+    def test_pending_jobs_are_deduplicated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blogpost.save()
+            self.blogpost.save()
+        enqueue_tag_job(self.blogpost.pk)
+        self.assertEqual(TagJob.objects.filter(blogpost=self.blogpost).count(), 1)
+
+    def test_save_without_tag_update_enqueues_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blogpost.save(update_tags=False)
+        self.assertFalse(TagJob.objects.exists())
+
+    def test_worker_updates_tags_and_removes_job(self):
+        enqueue_tag_job(self.blogpost.pk)
+        self.assertEqual(process_tag_jobs(), 1)
+        self.assertFalse(TagJob.objects.exists())
+        self.assertEqual(Tag.objects.get(word='guitar').quantity, 1)
+
+    def test_failed_job_is_retried_then_given_up(self):
+        enqueue_tag_job(self.blogpost.pk)
+
+        with mock.patch('blog.tasks.update_tags', side_effect=ValueError('boom')):
+            process_tag_jobs()
+            job = TagJob.objects.get()
+            self.assertEqual(job.status, TagJob.PENDING)
+            self.assertEqual(job.attempts, 1)
+            self.assertIn('boom', job.last_error)
+
+            for attempt in range(TAG_JOB_MAX_ATTEMPTS - 1):
+                TagJob.objects.update(run_after=job.created)
+                process_tag_jobs()
+
+        job = TagJob.objects.get()
+        self.assertEqual(job.status, TagJob.FAILED)
+        self.assertEqual(job.attempts, TAG_JOB_MAX_ATTEMPTS)
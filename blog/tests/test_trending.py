@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from blog.models import BlogPost, BlogAuthor, TrendingPost, User
+from blog.stats import get_trending_posts, record_post_stat, refresh_trending_posts, score_activity
+
+
+class TrendingPostsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.blogposts = [BlogPost.objects.create(title=f'Blog {blog_id}', description=f'This is the blog post #{blog_id}!',
+                                                 author=blogger) for blog_id in range(3)]
+        cls.now = timezone.now()
+
+    def test_recent_activity_outweighs_older_activity(self):
+        record_post_stat(self.blogposts[0].pk, moment=self.now - timedelta(days=3), views=50)
+        record_post_stat(self.blogposts[1].pk, moment=self.now, views=10)
+        record_post_stat(self.blogposts[2].pk, moment=self.now, comments=1, likes=1)
+        refresh_trending_posts()
+
+        self.assertEqual(get_trending_posts(), [self.blogposts[2], self.blogposts[1], self.blogposts[0]])
+
+    def test_half_life_halves_weight(self):
+        day_ago = score_activity([(self.now - timedelta(hours=24), 2)])
+        self.assertAlmostEqual(day_ago, score_activity([(self.now, 1)]))
+
+    def test_refresh_only_rescores_posts_with_new_activity(self):
+        record_post_stat(self.blogposts[0].pk, moment=self.now - timedelta(hours=4), views=5)
+        record_post_stat(self.blogposts[1].pk, moment=self.now - timedelta(hours=4), views=1)
+        self.assertEqual(refresh_trending_posts(), 2)
+        TrendingPost.objects.update(updated=self.now - timedelta(hours=2))
+
+        record_post_stat(self.blogposts[1].pk, views=10)
+        self.assertEqual(refresh_trending_posts(), 1)
+        self.assertEqual(get_trending_posts(), [self.blogposts[1], self.blogposts[0]])
+        self.assertEqual(refresh_trending_posts(full=True), 2)
+
+    def test_posts_without_recent_activity_drop_out(self):
+        record_post_stat(self.blogposts[0].pk, moment=self.now - timedelta(days=30), views=5)
+        record_post_stat(self.blogposts[1].pk, moment=self.now, likes=-1)
+        refresh_trending_posts()
+
+        self.assertFalse(TrendingPost.objects.exists())
+
+    def test_trending_view(self):
+        record_post_stat(self.blogposts[0].pk, views=1)
+        refresh_trending_posts()
+
+        with self.assertNumQueries(1):
+            self.assertEqual([blogpost.author.username for blogpost in get_trending_posts()], [self.blogposts[0].author.username])
+
+        self.assertNotIn('description', get_trending_posts()[0].__dict__)
+        # rendering doesn't load deferred fields
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('blog:trending'))
+        self.assertEqual(len([query for query in queries if 'blog_blogpost' in query['sql']]), 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['blogposts'], [self.blogposts[0]])
+        self.assertContains(response, 'Blog 0')
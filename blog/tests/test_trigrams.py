@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from blog.models import BlogPost, BlogAuthor, SearchTerm, Tag, TermTrigram, User
+from blog.search import correct_query, rebuild_search_index, search_blogposts_with_fallback
+from blog.trigrams import add_search_terms, get_candidates, get_similar_term, get_similarity, get_trigrams
+
+
+class TrigramTest(TestCase):
+
+    def test_trigrams_are_padded_like_pg_trgm(self):
+        self.assertEqual(get_trigrams('cat'), {'  c', ' ca', 'cat', 'at '})
+        self.assertEqual(get_similarity('guitar', 'guitar'), 1)
+        self.assertAlmostEqual(get_similarity('guitar', 'guitr'), 4 / 9)
+
+    def test_only_new_words_are_added(self):
+        add_search_terms(['guitar', 'drum', 'to', '2021'])
+        with self.assertNumQueries(1):
+            add_search_terms(['guitar', 'drum'])
+
+        self.assertEqual(set(SearchTerm.objects.values_list('word', flat=True)), {'guitar', 'drum'})
+        self.assertEqual(TermTrigram.objects.filter(term='guitar').count(), 7)
+
+        add_search_terms(['Museums'])
+        self.assertEqual(get_similar_term('musems'), 'museums')
+
+    def test_most_similar_term_is_found(self):
+        add_search_terms(['guitar', 'guitars', 'drum', 'gutter'])
+
+        self.assertEqual(get_similar_term('guitr'), 'guitar')
+        self.assertEqual(get_similar_term('gitars'), 'guitars')
+        self.assertIsNone(get_similar_term('piano'))
+
+    def test_candidates_are_limited(self):
+        add_search_terms(['guitar', 'guitars', 'guitarist'])
+        self.assertEqual(get_similar_term('guitarst'), 'guitars')
+
+        with mock.patch('blog.trigrams.TRIGRAM_CANDIDATE_LIMIT', 1):
+            # the candidate sharing the most trigrams wins even if a shorter one would be more similar
+            self.assertEqual(get_similar_term('guitarst'), 'guitarist')
+
+    def test_common_trigrams_are_not_scanned(self):
+        add_search_terms(['guitar', 'gutter', 'gallery', 'garden', 'green'])
+
+        with mock.patch('blog.trigrams.TRIGRAM_POSTING_LIMIT', 2):
+            # '  g' and ' gu' are left out, one query reads at most 3 terms of each trigram
+            self.assertEqual(get_candidates('guitr'), ['guitar', 'gutter'])
+            self.assertEqual(get_similar_term('guitr'), 'guitar')
+            with self.assertNumQueries(len(get_trigrams('guitr'))):
+                get_candidates('guitr')
+
+            # unless there are only common ones
+            self.assertEqual(len(get_candidates('g')), 3)
+
+
+class SearchFallbackTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        cls.blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.guitars = BlogPost.objects.create(title='Electric guitars', author=cls.blogger,
+                                              description='<p>The guitar and the drum.</p>')
+        cls.drums = BlogPost.objects.create(title='Drums', author=cls.blogger,
+                                            description='<p>A drum and a guitar.</p>')
+
+    def test_titles_are_search_terms(self):
+        self.assertEqual(SearchTerm.objects.filter(word__in=['electric', 'guitars', 'drums']).count(), 3)
+
+    def test_misspelled_words_are_corrected(self):
+        self.assertEqual(correct_query('electirc guitars'), 'electric guitars')
+        self.assertIsNone(correct_query('electric guitars'))
+        self.assertIsNone(correct_query('xyzzy'))
+
+    def test_corrected_query_is_searched_when_there_are_few_results(self):
+        blogposts, corrected = search_blogposts_with_fallback('electirc')
+        self.assertEqual((list(blogposts[:]), corrected), ([self.guitars], 'electric'))
+
+        blogposts, corrected = search_blogposts_with_fallback('drums')
+        self.assertIsNone(corrected)
+
+    def test_search_view_shows_the_corrected_query(self):
+        cache.clear()
+        response = self.client.get(reverse('blog:search'), {'search': 'electirc'})
+
+        self.assertEqual(response.context['corrected_word'], 'electric')
+        self.assertEqual(list(response.context['related_blogposts']), [self.guitars])
+        self.assertContains(response, 'Showing results for <em>electric</em> instead of <em>electirc</em>')
+
+    def test_typos_of_capitalized_tags_are_corrected(self):
+        Tag.objects.create(word='London', quantity=1)
+        rebuild_search_index()
+
+        self.assertTrue(SearchTerm.objects.filter(word='london').exists())
+        self.assertEqual(correct_query('londn'), 'london')
+
+    def test_rebuild_replaces_search_terms(self):
+        SearchTerm.objects.create(word='stale')
+        rebuild_search_index()
+
+        self.assertFalse(SearchTerm.objects.filter(word='stale').exists())
+        self.assertEqual(correct_query('drumz'), 'drums')
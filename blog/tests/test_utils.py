@@ -0,0 +1,126 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from blog.models import BlogPost, BlogAuthor, NounCache, PostTerm, Tag, User
+from blog import utils
+from blog.tasks import process_tag_jobs
+
+
+class UpdateTagsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        cls.blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        with cls.captureOnCommitCallbacks(execute=True):
+            BlogPost.objects.create(title='Guitars', description='<p>The guitar and the drum.</p>', author=cls.blogger)
+            BlogPost.objects.create(title='Drums', description='<p>A drum.</p>', author=cls.blogger)
+        process_tag_jobs()
+
+    def test_post_terms_are_stored(self):
+        blogpost = BlogPost.objects.get(title='Guitars')
+        terms = dict(PostTerm.objects.filter(blogpost=blogpost).values_list('word', 'quantity'))
+        self.assertEqual(terms['guitar'], 1)
+        self.assertEqual(terms['drum'], 1)
+
+    def test_tag_quantity_is_summed_over_posts(self):
+        tag = Tag.objects.get(word='drum')
+        self.assertEqual(tag.quantity, 2)
+        self.assertEqual(tag.blogposts.count(), 2)
+
+    def test_save_only_analyzes_changed_post(self):
+        blogpost = BlogPost.objects.get(title='Guitars')
+        blogpost.description = '<p>The guitar and the guitar.</p>'
+
+        with mock.patch('blog.utils.count_nouns', wraps=utils.count_nouns) as count_nouns:
+            with self.captureOnCommitCallbacks(execute=True):
+                blogpost.save()
+            process_tag_jobs()
+
+        count_nouns.assert_called_once_with(blogpost.description)
+        self.assertEqual(Tag.objects.get(word='guitar').quantity, 2)
+        self.assertEqual(Tag.objects.get(word='drum').quantity, 1)
+        self.assertFalse(Tag.objects.get(word='drum').blogposts.filter(pk=blogpost.pk).exists())
+
+    def test_delete_subtracts_stored_terms(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            BlogPost.objects.get(title='Guitars').delete()
+        self.assertFalse(Tag.objects.filter(word='guitar').exists())
+        self.assertEqual(Tag.objects.get(word='drum').quantity, 1)
+
+    def test_delete_tags_runs_constant_number_of_queries_without_analysis(self):
+        blogpost = BlogPost.objects.get(title='Guitars')
+        blogpost.description = '<p>The guitar, the drum, the piano, the violin and the flute.</p>'
+        utils.update_tags(blogpost)
+        BlogPost.objects.filter(pk=blogpost.pk).delete()
+
+        # five of them acquire and release the tags lock
+        with mock.patch('blog.utils.count_nouns') as count_nouns, self.assertNumQueries(13):
+            utils.delete_tags([blogpost.pk])
+
+        count_nouns.assert_not_called()
+        self.assertEqual(list(Tag.objects.values_list('word', 'quantity')), [('drum', 1)])
+        self.assertFalse(PostTerm.objects.filter(blogpost_id=blogpost.pk).exists())
+
+    def test_delete_tags_skips_existing_blog_posts(self):
+        blogpost = BlogPost.objects.get(title='Guitars')
+        utils.delete_tags([blogpost.pk])
+        self.assertEqual(Tag.objects.get(word='guitar').quantity, 1)
+
+    def test_full_rebuild_matches_incremental_counts(self):
+        Tag.objects.update(quantity=0)
+        utils.update_tags()
+        self.assertEqual(Tag.objects.get(word='drum').quantity, 2)
+        self.assertEqual(Tag.objects.get(word='guitar').quantity, 1)
+
+
+class SaveTagsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.blogpost = BlogPost.objects.create(title='Guitars', description='<p>The guitar.</p>', author=blogger)
+        utils.update_tags(cls.blogpost)
+
+    def update_description(self, description):
+        self.blogpost.description = description
+        with self.assertNumQueries(25):
+            utils.update_tags(self.blogpost)
+
+    def test_number_of_queries_does_not_depend_on_number_of_words(self):
+        self.update_description('<p>The drum.</p>')
+        self.update_description('<p>The guitar, the piano, the violin, the flute and the trumpet.</p>')
+        self.update_description('<p>The cello.</p>')
+
+        self.assertEqual(list(Tag.objects.values_list('word', flat=True)), ['cello'])
+        self.assertEqual(list(Tag.objects.get(word='cello').blogposts.all()), [self.blogpost])
+
+
+class NounCacheTest(TestCase):
+
+    def test_cache_miss_analyzes_description_once(self):
+        with mock.patch('blog.utils.count_nouns', wraps=utils.count_nouns) as count_nouns:
+            first = utils.get_nouns('<p>The guitar.</p>')
+            second = utils.get_nouns('<p>The guitar.</p>')
+
+        count_nouns.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(NounCache.objects.count(), 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        with mock.patch('blog.utils.NOUN_CACHE_MAX_ENTRIES', 2):
+            utils.get_nouns('<p>The guitar.</p>')
+            utils.get_nouns('<p>The drum.</p>')
+            NounCache.objects.update(last_used=timezone.now() - timedelta(days=1))
+            utils.get_nouns('<p>The guitar.</p>')
+            utils.get_nouns('<p>The piano.</p>')
+
+        self.assertEqual(NounCache.objects.count(), 2)
+        self.assertFalse(NounCache.objects.filter(digest=utils.get_description_digest('<p>The drum.</p>')).exists())
@@ -1,5 +1,8 @@
+from unittest import mock
+
 from django.test import TestCase
 from django.urls import reverse
+from blog.counters import view_counter
 from blog.models import BlogPost, BlogAuthor, Comment, User
 
 
@@ -165,3 +168,36 @@ class CommentCreateViewTest(TestCase):
                                     {'description': 'This is the comment #1!'})
         self.assertEqual(response.status_code, 302)
         self.assertTrue(response.url.startswith(reverse('blog:blog-detail', kwargs={'slug': self.blog.slug})))
+
+
+class BlogPostDetailViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        test_user1.save()
+
+        blogger = BlogAuthor.objects.create(username=test_user1, bio='Hi! My name is test_user1!')
+        cls.blog = BlogPost.objects.create(title='Blog 1', description='This is the blog post #1!', author=blogger)
+
+    def get_blog_detail(self):
+        return self.client.get(reverse('blog:blog-detail', kwargs={'slug': self.blog.slug}))
+
+    def test_view_is_recorded_once_per_user(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        self.get_blog_detail()
+        self.get_blog_detail()
+        self.assertEqual(list(self.blog.viewed_users.values_list('username', flat=True)), ['testuser1'])
+
+    # views are written once per flush interval, not by the measured requests
+    @mock.patch.object(view_counter, 'interval', None)
+    def test_number_of_queries_does_not_depend_on_number_of_viewers(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        self.get_blog_detail()
+        with self.assertNumQueries(8):
+            self.get_blog_detail()
+
+        for user_id in range(2, 52):
+            self.blog.viewed_users.add(User.objects.create_user(username=f'testuser{user_id}', password='1X<ISRUkw+tuK'))
+        with self.assertNumQueries(8):
+            self.get_blog_detail()
@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+from blog.models import BlogPost, BlogAuthor, PostStat, User, Vote
+from blog.utils import attach_user_votes, get_user_votes, toggle_vote
+
+
+class ToggleVoteTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        cls.test_user1.save()
+        cls.test_user2 = User.objects.create_user(username='testuser2', password='2HJ1vRV0Z&3iD')
+        cls.test_user2.save()
+
+        blogger = BlogAuthor.objects.create(username=cls.test_user1, bio='Hi! My name is test_user1!')
+        cls.blogpost = BlogPost.objects.create(title='Blog 1', description='This is the blog post #1!', author=blogger)
+
+    def test_like_dislike_and_withdraw(self):
+        self.assertEqual(toggle_vote(self.blogpost, self.test_user1, Vote.LIKE), (Vote.LIKE, 1, 0))
+        self.assertEqual(toggle_vote(self.blogpost, self.test_user2, Vote.LIKE), (Vote.LIKE, 2, 0))
+        self.assertEqual(toggle_vote(self.blogpost, self.test_user1, Vote.DISLIKE), (Vote.DISLIKE, 1, 1))
+        self.assertEqual(toggle_vote(self.blogpost, self.test_user1, Vote.DISLIKE), (None, 1, 0))
+
+        self.assertEqual(get_user_votes([self.blogpost], self.test_user1), {})
+        self.assertEqual(get_user_votes([self.blogpost], self.test_user2), {self.blogpost.pk: Vote.LIKE})
+        self.assertEqual(sum(PostStat.objects.values_list('likes', flat=True)), 1)
+
+    def test_user_votes_of_many_blog_posts_take_one_query(self):
+        blogposts = [self.blogpost] + [BlogPost.objects.create(title=f'Blog {blog_id}', description='This is a blog post!',
+                                                               author=self.blogpost.author) for blog_id in range(2, 6)]
+        toggle_vote(blogposts[1], self.test_user1, Vote.LIKE)
+        toggle_vote(blogposts[2], self.test_user1, Vote.DISLIKE)
+        toggle_vote(blogposts[2], self.test_user2, Vote.LIKE)
+
+        with self.assertNumQueries(1):
+            attach_user_votes(blogposts, self.test_user1)
+        self.assertEqual([blogpost.user_vote for blogpost in blogposts], [None, Vote.LIKE, Vote.DISLIKE, None, None])
+
+    def test_anonymous_user_has_no_votes(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(attach_user_votes([self.blogpost], AnonymousUser())[0].user_vote, None)
+
+    def test_detail_view_shows_user_vote(self):
+        toggle_vote(self.blogpost, self.test_user1, Vote.DISLIKE)
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        response = self.client.get(reverse('blog:blog-detail', kwargs={'slug': self.blogpost.slug}))
+        self.assertFalse(response.context['is_liked'])
+        self.assertTrue(response.context['is_disliked'])
+
+    def rate(self, vote, client=None):
+        return (client or self.client).post(reverse('blog:rate-blogpost', kwargs={'slug': self.blogpost.slug}),
+                                            {'vote': vote})
+
+    def test_rating_view(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+
+        response = self.rate('dislike')
+        self.assertEqual(response.json(), {'likes': 0, 'dislikes': 1, 'state': 'dislike'})
+        response = self.rate('dislike')
+        self.assertEqual(response.json(), {'likes': 0, 'dislikes': 0, 'state': None})
+
+    def test_rating_response_does_not_grow_with_viewers(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        size = len(self.rate('like').content)
+
+        for user_id in range(3, 53):
+            self.blogpost.viewed_users.add(User.objects.create_user(username=f'testuser{user_id}', password='1X<ISRUkw+tuK'))
+        BlogPost.objects.filter(pk=self.blogpost.pk).update(description='<p>A much longer description.</p>' * 100)
+
+        self.rate('like')
+        # including the write lock toggle_vote takes on SQLite
+        with self.assertNumQueries(13):
+            self.assertEqual(len(self.rate('like').content), size)
+
+    def test_rating_view_requires_login(self):
+        response = self.rate('like')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Vote.objects.exists())
+
+    def test_rating_view_rejects_get_and_unknown_votes(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        response = self.client.get(reverse('blog:rate-blogpost', kwargs={'slug': self.blogpost.slug}), {'vote': 'like'})
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(self.rate('love').status_code, 400)
+        self.assertFalse(Vote.objects.exists())
+
+    def test_rating_view_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        self.assertEqual(self.rate('like', client).status_code, 403)
+        self.assertFalse(Vote.objects.exists())
+
+
+class ConcurrentVotesTest(TransactionTestCase):
+
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'testuser{user_id}', password='1X<ISRUkw+tuK')
+                      for user_id in range(8)]
+        blogger = BlogAuthor.objects.create(username=self.users[0], bio='Hi! My name is test_user0!')
+        self.blogpost = BlogPost.objects.create(title='Blog 1', description='This is the blog post #1!', author=blogger)
+
+    def vote(self, user, value):
+        try:
+            return toggle_vote(self.blogpost, user, value)
+        finally:
+            connection.close()
+
+    def test_counts_match_votes_after_concurrent_clicks(self):
+        # every user clicks like and dislike several times at once, from several threads
+        clicks = [(user, value) for user in self.users for value in (Vote.LIKE, Vote.DISLIKE, Vote.LIKE) * 5]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda click: self.vote(*click), clicks))
+
+        blogpost = BlogPost.objects.get(pk=self.blogpost.pk)
+        self.assertEqual(blogpost.likes, Vote.objects.filter(value=Vote.LIKE).count())
+        self.assertEqual(blogpost.dislikes, Vote.objects.filter(value=Vote.DISLIKE).count())
+        self.assertLessEqual(Vote.objects.count(), len(self.users))
@@ -0,0 +1,85 @@
+from collections import Counter
+import heapq
+
+from django.conf import settings
+from django.db import connection
+
+from .models import SearchTerm, TermTrigram
+
+
+TRIGRAM_CANDIDATE_LIMIT = getattr(settings, 'TRIGRAM_CANDIDATE_LIMIT', 50) # terms compared with a word at most
+# terms read per trigram at most, trigrams of more terms like the padded first letter are too common to pick candidates
+TRIGRAM_POSTING_LIMIT = getattr(settings, 'TRIGRAM_POSTING_LIMIT', 1000)
+TRIGRAM_SIMILARITY = getattr(settings, 'TRIGRAM_SIMILARITY', 0.3) # the default threshold of pg_trgm
+
+
+def get_trigrams(word):
+    """
+    Get the set of trigrams of a word, padded with two spaces before and one after like pg_trgm does
+    """
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def get_similarity(a, b):
+    """
+    Get the share of trigrams two words have in common
+    """
+    a, b = get_trigrams(a), get_trigrams(b)
+    return len(a & b) / len(a | b)
+
+def is_search_term(word):
+    # short words and numbers are too ambiguous to correct
+    return 3 <= len(word) <= SearchTerm._meta.get_field('word').max_length and not word.isdigit()
+
+def add_search_terms(words):
+    """
+    Add words of titles or tags which aren't search terms yet, with their trigrams.
+    Words are lowercased like search queries, pg_trgm lowercases them as well
+    """
+    words = {word.lower() for word in words if is_search_term(word)}
+    if not words:
+        return
+
+    new_words = words - set(SearchTerm.objects.filter(word__in=words).values_list('word', flat=True))
+    if not new_words:
+        return
+
+    SearchTerm.objects.bulk_create([SearchTerm(word=word) for word in new_words], ignore_conflicts=True)
+    if connection.vendor != 'postgresql':
+        TermTrigram.objects.bulk_create([TermTrigram(term_id=word, trigram=trigram)
+                                         for word in new_words for trigram in get_trigrams(word)],
+                                        ignore_conflicts=True, batch_size=1000)
+
+def get_candidates(word):
+    """
+    Get up to TRIGRAM_CANDIDATE_LIMIT terms sharing the most trigrams with a word. Only the terms of trigrams
+    with at most TRIGRAM_POSTING_LIMIT terms are counted, unless no term shares any other trigram
+    with the word, so no trigram is read past the limit
+    """
+    postings = [list(TermTrigram.objects.filter(trigram=trigram).values_list('term', flat=True)
+                     [:TRIGRAM_POSTING_LIMIT + 1]) for trigram in get_trigrams(word)]
+    shared = Counter(term for terms in postings if len(terms) <= TRIGRAM_POSTING_LIMIT for term in terms)
+    if not shared:
+        # the word shares only common trigrams with any term
+        shared = Counter(term for terms in postings for term in terms)
+    return [term for term, count in
+            heapq.nsmallest(TRIGRAM_CANDIDATE_LIMIT, shared.items(), key=lambda item: (-item[1], item[0]))]
+
+def get_similar_term(word):
+    """
+    Get the search term most similar to a word, None if none is similar enough.
+    Only TRIGRAM_CANDIDATE_LIMIT terms sharing the most trigrams with it are compared
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, false)", [str(TRIGRAM_SIMILARITY)])
+            cursor.execute("""
+                SELECT word FROM (SELECT word FROM blog_searchterm WHERE word %% %s LIMIT %s) AS candidate
+                ORDER BY similarity(word, %s) DESC, word LIMIT 1""", [word, TRIGRAM_CANDIDATE_LIMIT, word])
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    similarities = [(get_similarity(word, term), term) for term in get_candidates(word)]
+    similarities = [(-similarity, term) for similarity, term in similarities if similarity >= TRIGRAM_SIMILARITY]
+
+    return min(similarities)[1] if similarities else None
@@ -7,6 +7,7 @@ app_name = 'blog'
 urlpatterns = [
     path('', views.index, name='index'),
     path('blogs/', views.BlogPostListView.as_view(), name='blogs'),
+    path('trending/', views.trending, name='trending'),
     path('bloggers/', views.BlogAuthorListView.as_view(), name='bloggers'),
     path('blog/<slug:slug>', views.BlogPostDetailView.as_view(), name='blog-detail'),
     path('blogger/<int:pk>', views.BlogAuthorDetailView.as_view(), name='blogger-detail'),
@@ -20,7 +21,8 @@ urlpatterns = [
     path('blog/<slug:slug>/create', views.CommentCreate.as_view(), name='comment-create'),
     path('blog/<slug:slug>/comment/<int:pk>/update', views.CommentUpdate.as_view(), name='comment-update'),
     path('blog/<slug:slug>/comment/<int:pk>/delete', views.CommentDelete.as_view(), name='comment-delete'),
-    path('blog/<slug:slug>/ajax/update-rating', views.update_like_dislike_count, name='update-rating'),
+    path('blog/<slug:slug>/rating', views.rate_blogpost, name='rate-blogpost'),
     path('tags/<str:word>', views.get_related_blogposts, name='tags'),
     path('search/', views.search, name='search'),
+    path('search/suggest', views.suggest, name='search-suggest'),
 ]
@@ -1,71 +1,202 @@
-from collections import namedtuple
+from collections import namedtuple, Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import wraps
+from itertools import islice
+import multiprocessing
 import re
-import nltk
 import os
 import logging
 import html
+import hashlib
 
-from django.db.models import Count
-from django.core.cache import cache
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.core.cache import cache, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.utils import timezone
 
-from .models import BlogAuthor, BlogPost, Comment, Tag
+from .hll import HyperLogLog, merge_sketches
+from .locks import DatabaseLock
+from .nlp import get_noun_extractor, init_worker
+from .models import BlogPost, NounCache, PostTerm, Tag, Vote
+from .stats import get_category_stats, get_contributor_stats, get_site_stats, record_post_stat
+from .suggest import suggestion_index
+from .trigrams import add_search_terms
 
 
 logger = logging.getLogger(__name__)
 
 CURRENT_WORKING_DIR = os.getcwd()
 
+NOUN_CACHE_MAX_ENTRIES = getattr(settings, 'NOUN_CACHE_MAX_ENTRIES', 10000)
+TAG_EXTRACTOR = getattr(settings, 'TAG_EXTRACTOR', 'blog.nlp.NLTKNounExtractor')
+TAG_REBUILD_TIMEOUT = getattr(settings, 'TAG_REBUILD_TIMEOUT', 3600) # seconds a rebuild may hold the tags lock
+INDEX_CACHE = getattr(settings, 'INDEX_CACHE', 'default') # has to be shared by all processes to be invalidated
+INDEX_CACHE_TIMEOUT = getattr(settings, 'INDEX_CACHE_TIMEOUT', 300) # seconds a missed invalidation stays visible
 
+TotalNumber = namedtuple('TotalNumber', ['blog_posts', 'bloggers', 'comments'])
+INDEX_VALUES = {} # name -> uncached helper, filled by cache_index_value
+
+
+def get_index_key(name):
+    return f'blog:index:{name}'
+
+def cache_index_value(name):
+    """
+    Cache the result of an index page helper for INDEX_CACHE_TIMEOUT seconds under an explicit key,
+    see get_index_values and invalidate_index_cache
+    """
+    def decorator(func):
+        INDEX_VALUES[name] = func
+
+        @wraps(func)
+        def wrapper():
+            return get_index_values(name)[name]
+        return wrapper
+    return decorator
+
+def get_index_values(*names):
+    """
+    Get a dict of cached index page values by name with a single cache read,
+    missing values are computed and cached with a single write
+    """
+    index_cache = caches[INDEX_CACHE]
+    keys = {name: get_index_key(name) for name in names}
+    cached = index_cache.get_many(keys.values())
+
+    values = {name: cached[key] for name, key in keys.items() if key in cached}
+    missing = {name: INDEX_VALUES[name]() for name in names if name not in values}
+    if missing:
+        index_cache.set_many({keys[name]: value for name, value in missing.items()}, INDEX_CACHE_TIMEOUT)
+    return {**values, **missing}
+
+def invalidate_index_cache(*names):
+    """
+    Delete cached index page values, e.g. invalidate_index_cache('total_num'). Invalidating 'tags'
+    deletes the tag cloud fragment of the index page as well
+    """
+    keys = [get_index_key(name) for name in names]
+    if 'tags' in names:
+        keys.append(make_template_fragment_key('tag_cloud'))
+    caches[INDEX_CACHE].delete_many(keys)
+
+@cache_index_value('total_num')
 def get_total_num():
     """
     Get total number of blog posts, bloggers and comments
     return a named tuple of numbers
     """
-    
-    TotalNumber = namedtuple("TotalNumber", ['blog_posts', 'bloggers', 'comments'])
-
-    # Number of blog posts
-    num_of_blog_posts = BlogPost.objects.count()
-    # Number of blog authors
-    num_of_bloggers = BlogAuthor.objects.count()
-    # Number of comments
-    num_of_comments = Comment.objects.count()
-
-    total_num = TotalNumber(num_of_blog_posts, num_of_bloggers, num_of_comments)
+    # totals are kept current by blog.signals instead of being counted
+    site_stats = get_site_stats()
+    total_num = TotalNumber(site_stats.blog_posts, site_stats.bloggers, site_stats.comments)
 
     return total_num
 
+@cache_index_value('top_contributors')
 def get_top_contributors():
     """
     Get a list of top contributors
     """
-    top_contributors_list = BlogAuthor.objects.annotate(
-                            num_blog_posts=Count('blogpost')).order_by('-num_blog_posts')[:5]
-
-    top_contributors = {contributor: contributor.num_blog_posts for contributor in top_contributors_list}
+    top_contributors = dict(get_contributor_stats(5))
 
     return top_contributors
 
+@cache_index_value('most_pop_cats')
 def get_most_pop_cats():
     """
     Get a list of most popular categories
     """
-    most_pop_cats = {}
-    blogposts = BlogPost.objects.all()
-
-    for blogpost in blogposts:
-        most_pop_cats[blogpost.category] = most_pop_cats.get(blogpost.category, 0) + 1
-    
-    return sorted(most_pop_cats, key=most_pop_cats.get, reverse=True)
+    return [category for category, num_of_blog_posts in get_category_stats()]
 
+@cache_index_value('tags')
 def get_tags():
     """
     Get a list of most frequently used words
     """
-    tags = Tag.objects.all().order_by('-quantity', 'word')[:30]
+    tags = list(Tag.objects.all().order_by('-quantity', 'word')[:30])
 
     return tags
 
+def add_anonymous_visitor(blogpost, session_id):
+    """
+    Add a session key to the sketch of anonymous visitors of a blog post,
+    the row is only locked and written if the sketch changes
+    """
+    if not HyperLogLog.from_bytes(blogpost.anonymous_visitors).add(session_id):
+        return False
+
+    with transaction.atomic():
+        stored = (BlogPost.objects.select_for_update().filter(pk=blogpost.pk)
+                  .values_list('anonymous_visitors', flat=True).first())
+        sketch = HyperLogLog.from_bytes(stored)
+        if not sketch.add(session_id):
+            return False
+        BlogPost.objects.filter(pk=blogpost.pk).update(anonymous_visitors=sketch.to_bytes())
+
+    blogpost.anonymous_visitors = sketch.to_bytes()
+    return True
+
+def count_anonymous_visitors(blogposts):
+    """
+    Estimate the number of distinct anonymous visitors of any of the blog posts
+    """
+    return merge_sketches(blogposts.values_list('anonymous_visitors', flat=True)).count()
+
+def toggle_vote(blogpost, user, value):
+    """
+    Like (Vote.LIKE) or dislike (Vote.DISLIKE) a blog post, withdraw the vote if it's the user's current one.
+    Counters are changed with F() in the transaction of the vote,
+    return the user's vote afterwards (None if withdrawn) and the new likes and dislikes
+    """
+    fields = {Vote.LIKE: 'likes', Vote.DISLIKE: 'dislikes'}
+    deltas = dict.fromkeys(fields.values(), 0)
+
+    with transaction.atomic():
+        if connection.vendor == 'sqlite':
+            # SQLite fails a transaction which has read and waits to write, so the write lock is taken first
+            BlogPost.objects.filter(pk=blogpost.pk).update(likes=F('likes'))
+        # concurrent votes of the same user wait for the row lock, an insert race is retried by get_or_create
+        vote, created = Vote.objects.select_for_update().get_or_create(
+                            blogpost_id=blogpost.pk, user=user, defaults={'value': value})
+
+        if created:
+            state = value
+        elif vote.value == value:
+            vote.delete()
+            state = None
+            deltas[fields[value]] -= 1
+        else:
+            deltas[fields[vote.value]] -= 1
+            vote.value = state = value
+            vote.save(update_fields=['value'])
+        if state is not None:
+            deltas[fields[state]] += 1
+
+        BlogPost.objects.filter(pk=blogpost.pk).update(**{field: F(field) + delta for field, delta in deltas.items()})
+        record_post_stat(blogpost.pk, **deltas)
+        counts = BlogPost.objects.filter(pk=blogpost.pk).values('likes', 'dislikes').get()
+
+    return state, counts['likes'], counts['dislikes']
+
+def get_user_votes(blogposts, user):
+    """
+    Get a dict of a user's votes of blog posts by blog post ids, with a single query
+    """
+    if not user.is_authenticated:
+        return {}
+    blogpost_ids = [blogpost.pk for blogpost in blogposts]
+    return dict(Vote.objects.filter(user=user, blogpost_id__in=blogpost_ids).values_list('blogpost_id', 'value'))
+
+def attach_user_votes(blogposts, user):
+    """
+    Set user_vote of every blog post to a user's vote of it or None, return the blog posts
+    """
+    votes = get_user_votes(blogposts, user)
+    for blogpost in blogposts:
+        blogpost.user_vote = votes.get(blogpost.pk)
+    return blogposts
+
 def replace_html_entities(match):
     """
     Replace html entities with unicode chars, eg. &rsquo;
@@ -73,60 +204,246 @@ def replace_html_entities(match):
     match = match.group(0)
     return html.unescape(match)
 
-def update_tags():
+def strip_html(text, separator=''):
     """
-    Update a list of most frequently used words
+    Strip html tags and replace html entities with unicode chars
     """
-    frequent_words = {}
-    blogpost_dict = {}
-    blogposts = BlogPost.objects.all()
+    text = re.sub(r'<[^<]+?>', separator, text, flags=re.MULTILINE) # strip html tags, eg. <p></p>
+    return re.sub(r"(&\S+;)", replace_html_entities, text) # replace html entities with unicode chars, eg. &rsquo;
 
-    # download_dir = os.path.join(f'{CURRENT_WORKING_DIR}', 'nltk_data')
+def count_nouns(text):
+    """
+    Get a counter of nouns used in a blog post description
+    """
+    nouns = Counter()
+    max_length = Tag._meta.get_field('word').max_length
 
-    # nltk.download('punkt', download_dir=download_dir)
-    # nltk.download('averaged_perceptron_tagger', download_dir=download_dir)
+    for word in get_noun_extractor(TAG_EXTRACTOR).extract(strip_html(text)):
+        # words longer than a tag can hold are skipped
+        if re.search(r'\w{2,}', word) and len(word) <= max_length:
+            nouns[word] += 1
 
-    for blogpost in blogposts:
-        bp_desc = re.sub(r'<[^<]+?>', '', blogpost.description, flags=re.MULTILINE) # strip html tags, eg. <p></p>
-        cleaned_bp_desc = re.sub(r"(&\S+;)", replace_html_entities, bp_desc) # replace html entities with unicode chars, eg. &rsquo;
-        tokens = nltk.word_tokenize(cleaned_bp_desc)
-        tagged = nltk.pos_tag(tokens)
-        for word, tg in tagged:
-            if tg.startswith('N') and re.search(r'\w{2,}', word):
-                frequent_words[word] = frequent_words.get(word, 0) + 1
-                blogpost_dict[word] = blogpost_dict.get(word, set())
-                blogpost_dict[word].add(blogpost)
-
-    frequent_words_list = sorted(frequent_words, key=frequent_words.get, reverse=True)[:30]
-
-    for word in frequent_words_list:
-        tag, created = Tag.objects.get_or_create(word=word)
-
-        for bp in blogpost_dict[word]:
-            if not bp in tag.blogposts.all():
-                tag.blogposts.add(bp)
-        tag.quantity = frequent_words[word]
-        tag.save()
-
-def delete_tags(blogpost):
-    """
-    Delete tags if necessary
-    """
-    # download_dir = os.path.join(f'{CURRENT_WORKING_DIR}', 'nltk_data')
-
-    # nltk.download('punkt', download_dir=download_dir)
-    # nltk.download('averaged_perceptron_tagger', download_dir=download_dir)
-
-    regex = r'\w{2,}'
-
-    bp_desc = blogpost.description
-    tokens = nltk.word_tokenize(bp_desc)
-    tagged = nltk.pos_tag(tokens)
-    for word, tg in tagged:
-        if tg.startswith('N') and re.search(regex, word):
-            if Tag.objects.filter(word__exact=word).exists():
-                tag = Tag.objects.get(word__exact=word)
-                tag.quantity -= 1
-                tag.save()
-                if tag.quantity == 0:
-                    tag.delete()
+    return nouns
+
+def get_description_digest(text):
+    """
+    Get a hash a description analysis is cached under, which depends on the noun extractor
+    """
+    return hashlib.sha256(f'{TAG_EXTRACTOR}\n{text}'.encode()).hexdigest()
+
+def lookup_nouns(chunk):
+    """
+    Split a chunk of (pk, description) pairs into a list of cached (pk, nouns) results
+    and a list of pairs which have to be analyzed
+    """
+    digests = {pk: get_description_digest(description) for pk, description in chunk}
+    entries = dict(NounCache.objects.filter(digest__in=set(digests.values())).values_list('digest', 'nouns'))
+    if entries:
+        NounCache.objects.filter(digest__in=list(entries)).update(last_used=timezone.now())
+
+    cached = [(pk, Counter(entries[digests[pk]])) for pk, description in chunk if digests[pk] in entries]
+    uncached = [(pk, description) for pk, description in chunk if digests[pk] not in entries]
+    return cached, uncached
+
+def store_nouns(chunk, results):
+    """
+    Cache analysis results of a chunk, evicting least recently used entries
+    """
+    descriptions = dict(chunk)
+    NounCache.objects.bulk_create([NounCache(digest=get_description_digest(descriptions[pk]), nouns=nouns)
+                                   for pk, nouns in results], ignore_conflicts=True)
+
+    stale_entries = NounCache.objects.order_by('-last_used', '-pk').values('pk')[NOUN_CACHE_MAX_ENTRIES:]
+    NounCache.objects.filter(pk__in=stale_entries).delete()
+
+def get_nouns(text):
+    """
+    Get a counter of nouns used in a description, analyzing it only if it isn't cached
+    """
+    chunk = [(None, text)]
+    cached, uncached = lookup_nouns(chunk)
+    if cached:
+        return cached[0][1]
+
+    nouns = count_nouns(text)
+    store_nouns(chunk, [(None, nouns)])
+    return nouns
+
+def index_blogpost(blogpost):
+    """
+    Re-analyze a blog post and store its noun frequencies,
+    return a tuple of new frequencies and differences against the stored ones
+    """
+    nouns = get_nouns(blogpost.description)
+    stored_terms = {term.word: term for term in PostTerm.objects.filter(blogpost=blogpost)}
+
+    diff = Counter(nouns)
+    diff.subtract({word: term.quantity for word, term in stored_terms.items()})
+
+    changed_terms = []
+    for word, term in stored_terms.items():
+        if word in nouns and term.quantity != nouns[word]:
+            term.quantity = nouns[word]
+            changed_terms.append(term)
+
+    PostTerm.objects.filter(pk__in=[term.pk for word, term in stored_terms.items() if word not in nouns]).delete()
+    PostTerm.objects.bulk_update(changed_terms, ['quantity'])
+    PostTerm.objects.bulk_create([PostTerm(blogpost=blogpost, word=word, quantity=quantity)
+                                  for word, quantity in nouns.items() if word not in stored_terms])
+
+    return nouns, {word: quantity for word, quantity in diff.items() if quantity}
+
+def get_tags_lock(**kwargs):
+    """
+    Get a lock which serializes tag writes of all processes,
+    concurrent delta updates could otherwise delete each other's fresh tags
+    """
+    return DatabaseLock('tags', **kwargs)
+
+def update_tags(blogpost=None):
+    """
+    Update a list of most frequently used words.
+    Only the given blog post is re-analyzed, without one the whole corpus is re-indexed
+    """
+    if blogpost is None:
+        rebuild_tags(workers=1)
+        return
+
+    with get_tags_lock(), transaction.atomic():
+        nouns, diff = index_blogpost(blogpost)
+        save_tags(blogpost, nouns, diff)
+
+def save_tags(blogpost, nouns, diff):
+    """
+    Apply noun frequency differences of a blog post to tags and their links in bulk,
+    the number of queries doesn't depend on the number of words
+    """
+    if not diff:
+        return
+
+    Tag.objects.bulk_create([Tag(word=word) for word in diff], ignore_conflicts=True)
+    tags = list(Tag.objects.filter(word__in=list(diff)))
+    now = timezone.now()
+    for tag in tags:
+        tag.quantity = F('quantity') + diff[tag.word]
+        tag.updated = now
+    Tag.objects.bulk_update(tags, ['quantity', 'updated'])
+
+    TagBlogPost = Tag.blogposts.through
+    linked_tag_ids = set(TagBlogPost.objects.filter(blogpost=blogpost, tag__in=tags).values_list('tag_id', flat=True))
+    TagBlogPost.objects.bulk_create([TagBlogPost(tag_id=tag.pk, blogpost_id=blogpost.pk)
+                                     for tag in tags if tag.word in nouns and tag.pk not in linked_tag_ids])
+    TagBlogPost.objects.filter(blogpost=blogpost,
+                               tag__in=[tag.pk for tag in tags if tag.word not in nouns]).delete()
+
+    Tag.objects.filter(quantity__lte=0).delete()
+    add_search_terms(word for word, quantity in diff.items() if quantity > 0)
+    suggestion_index.update_tags(diff)
+    # invalidated before the commit, a concurrent request could cache the old tags again
+    transaction.on_commit(lambda: invalidate_index_cache('tags'))
+
+def count_chunk_nouns(chunk):
+    """
+    Count nouns for a chunk of (pk, description) pairs, runs in pool worker processes
+    """
+    return [(pk, count_nouns(description)) for pk, description in chunk]
+
+def iter_chunks(iterable, chunk_size):
+    """
+    Split an iterable into lists of chunk_size items
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def merge_chunk_results(cached, uncached, results):
+    """
+    Cache freshly analyzed descriptions of a chunk and merge them with cached ones
+    """
+    store_nouns(uncached, results)
+    return cached + results
+
+def iter_analyzed_chunks(chunks, workers):
+    """
+    Analyze chunks of blog posts in a process pool, keeping at most
+    two chunks per worker in flight so memory stays bounded.
+    Cached descriptions are never sent to the pool
+    """
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        for chunk in chunks:
+            cached, uncached = lookup_nouns(chunk)
+            yield merge_chunk_results(cached, uncached, count_chunk_nouns(uncached))
+        return
+
+    # spawned workers don't inherit the parent's database connections
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=init_worker) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            cached, uncached = lookup_nouns(chunk)
+            in_flight.append((cached, uncached, executor.submit(count_chunk_nouns, uncached)))
+            if len(in_flight) >= 2 * workers:
+                cached, uncached, future = in_flight.popleft()
+                yield merge_chunk_results(cached, uncached, future.result())
+        while in_flight:
+            cached, uncached, future = in_flight.popleft()
+            yield merge_chunk_results(cached, uncached, future.result())
+
+def rebuild_tags(workers=None, chunk_size=200):
+    """
+    Re-index the whole corpus, streaming blog posts in chunks to a process pool.
+    Returns the number of indexed blog posts
+    """
+    num_of_blog_posts = 0
+    frequent_words = Counter()
+
+    with get_tags_lock(timeout=TAG_REBUILD_TIMEOUT), transaction.atomic():
+        PostTerm.objects.all().delete()
+        Tag.objects.all().delete()
+
+        blogposts = BlogPost.objects.order_by().values_list('pk', 'description').iterator(chunk_size=chunk_size)
+        for results in iter_analyzed_chunks(iter_chunks(blogposts, chunk_size), workers):
+            terms = []
+            for pk, nouns in results:
+                frequent_words.update(nouns)
+                terms += [PostTerm(blogpost_id=pk, word=word, quantity=quantity) for word, quantity in nouns.items()]
+            PostTerm.objects.bulk_create(terms)
+            num_of_blog_posts += len(results)
+
+        Tag.objects.bulk_create([Tag(word=word, quantity=quantity) for word, quantity in frequent_words.items()])
+        add_search_terms(frequent_words)
+
+        tag_ids = dict(Tag.objects.values_list('word', 'pk'))
+        TagBlogPost = Tag.blogposts.through
+        links = PostTerm.objects.values_list('word', 'blogpost_id').iterator(chunk_size=chunk_size)
+        for chunk in iter_chunks(links, chunk_size):
+            TagBlogPost.objects.bulk_create([TagBlogPost(tag_id=tag_ids[word], blogpost_id=blogpost_id)
+                                             for word, blogpost_id in chunk])
+
+    suggestion_index.update_tags()
+    invalidate_index_cache('tags')
+    return num_of_blog_posts
+
+def delete_tags(blogpost_ids, blocking=True):
+    """
+    Subtract stored noun frequencies of deleted blog posts from tags with a single update,
+    then delete emptied tags and the stored frequencies. Nothing is re-analyzed.
+    Without blocking LockTimeout is raised at once if the tags are being written
+    """
+    with get_tags_lock() if blocking else get_tags_lock(wait=0), transaction.atomic():
+        # blog posts whose deletion has been rolled back keep their terms
+        blogpost_ids = set(blogpost_ids) - set(BlogPost.objects.filter(pk__in=blogpost_ids).values_list('pk', flat=True))
+        terms = PostTerm.objects.filter(blogpost_id__in=blogpost_ids)
+        totals = terms.filter(word=OuterRef('word')).values('word').annotate(total=Sum('quantity')).values('total')
+
+        words = set(terms.values_list('word', flat=True)) if suggestion_index.index is not None else ()
+        Tag.objects.filter(word__in=terms.values('word')).update(quantity=F('quantity') - Subquery(totals),
+                                                                updated=timezone.now())
+        Tag.objects.filter(quantity__lte=0).delete()
+        terms.delete()
+        suggestion_index.update_tags(words)
+        transaction.on_commit(lambda: invalidate_index_cache('tags'))
@@ -5,13 +5,17 @@ from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMix
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.utils.text import slugify
 from django.http import JsonResponse
-from django.core import serializers
-from django.core.cache import cache
+from django.views.decorators.http import require_POST
 from datetime import date
-from django.db.models import Q
+from django.core.paginator import Paginator
 
-from .utils import get_total_num, get_top_contributors, get_most_pop_cats, get_tags
-from .models import BlogPost, BlogAuthor, Comment, Tag
+from .counters import view_counter
+from .search_cache import search_cache
+from .stats import get_trending_posts
+from .suggest import PrefixIndex, suggestion_index
+from .utils import (add_anonymous_visitor, get_index_values, get_tags, attach_user_votes, toggle_vote,
+                    INDEX_CACHE, INDEX_CACHE_TIMEOUT)
+from .models import BlogPost, BlogAuthor, Comment, Tag, Vote
 
 import logging
 
@@ -23,10 +27,12 @@ def index(request):
     """
     A view for an index page describing the site
     """
-    total_num = get_total_num()
-    top_contributors = get_top_contributors()
-    most_pop_cats = get_most_pop_cats()
-    tags = get_tags()
+    # one cache read for all of them
+    values = get_index_values('total_num', 'top_contributors', 'most_pop_cats')
+    total_num = values['total_num']
+    top_contributors = values['top_contributors']
+    most_pop_cats = values['most_pop_cats']
+    trending_posts = get_trending_posts(5)
 
     context = {
                 'num_of_blog_posts': total_num.blog_posts,
@@ -34,79 +40,79 @@ def index(request):
                 'num_of_comments': total_num.comments,
                 'top_contributors': top_contributors,
                 'most_pop_cats': most_pop_cats,
-                'tags': tags,
+                # called by the template only if the tag cloud fragment isn't cached
+                'tags': get_tags,
+                'trending_posts': trending_posts,
+                'index_cache': INDEX_CACHE,
+                'index_cache_timeout': INDEX_CACHE_TIMEOUT,
     }
 
     return render(request, 'blog/index.html', context=context)
 
+def trending(request):
+    """
+    A view for a list of trending blog posts
+    """
+    context = {'blogposts': get_trending_posts()}
+    return render(request, 'blog/trending.html', context=context)
+
 def get_related_blogposts(request, word):
     tag = Tag.objects.get(word=word)
     blogposts = tag.blogposts.all()
     context = {'blogposts': blogposts}
     return render(request, 'blog/tags.html', context=context)
 
-def update_like_dislike_count(request, slug):
+@require_POST
+def rate_blogpost(request, slug):
     """
-    A view to update like/dislike count
+    A view to like, dislike or withdraw a vote of a blog post,
+    responds with the new numbers of likes and dislikes and the user's vote
     """
-    clicked_elem_id = request.GET.get('clicked_elem_id')
-    blogpost = get_object_or_404(BlogPost, slug=slug)
-    blogpost_likes = int(blogpost.likes)
-    blogpost_dislikes = int(blogpost.dislikes)
-
-    if len(blogpost.liked_disliked_users) == 0:
-        blogpost.liked_disliked_users = dict(liked_users=[], disliked_users=[])
-    blogpost_liked_users = blogpost.liked_disliked_users['liked_users']
-    blogpost_disliked_users = blogpost.liked_disliked_users['disliked_users']
+    votes = {'like': Vote.LIKE, 'dislike': Vote.DISLIKE}
+    states = {value: name for name, value in votes.items()}
 
-    if clicked_elem_id == 'blogpost__thumbs-up-btn':
-        if str(request.user.id) not in blogpost_liked_users:
-            blogpost.likes = str(blogpost_likes + 1)
-            blogpost_liked_users.append(str(request.user.id))
-        else:
-            blogpost.likes = str(blogpost_likes - 1)
-            blogpost_liked_users.remove(str(request.user.id))
-
-        if str(request.user.id) in blogpost_disliked_users:
-            blogpost_disliked_users.remove(str(request.user.id))
-            if blogpost_dislikes > 0:
-                blogpost.dislikes = str(blogpost_dislikes - 1)
-
-    elif clicked_elem_id == 'blogpost__thumbs-down-btn':
-        if str(request.user.id) not in blogpost_disliked_users:
-            blogpost.dislikes = str(blogpost_dislikes + 1)
-            blogpost_disliked_users.append(str(request.user.id))
-        else:
-            blogpost.dislikes = str(blogpost_dislikes - 1)
-            blogpost_disliked_users.remove(str(request.user.id))
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Log in to rate blog posts'}, status=403)
+    if request.POST.get('vote') not in votes:
+        return JsonResponse({'error': 'Vote has to be like or dislike'}, status=400)
 
-        if str(request.user.id) in blogpost_liked_users:
-            blogpost_liked_users.remove(str(request.user.id))
-            if blogpost_likes > 0:
-                blogpost.likes = str(blogpost_likes - 1)
-    
-    blogpost.save(update_tags=False)
+    blogpost = get_object_or_404(BlogPost.objects.only('pk'), slug=slug)
+    state, likes, dislikes = toggle_vote(blogpost, request.user, votes[request.POST['vote']])
 
-    if request.is_ajax and request.method == 'GET':
-        ser_blogpost = serializers.serialize('json', [ blogpost, ])
-        return JsonResponse({"blogpost": ser_blogpost}, status=200)
+    return JsonResponse({'likes': likes, 'dislikes': dislikes, 'state': states.get(state)})
 
 def search(request):
     """
     Search related blogposts
     """
     searched_word = request.GET.get("search")
+    page_obj = corrected_word = None
 
     if searched_word:
-        related_blogposts = BlogPost.objects.filter(
-                            Q(title__icontains=f"{searched_word}") | 
-                            Q(description__icontains=f"{searched_word}"))
-    else:
-        related_blogposts = {}
-
-    context = {'related_blogposts': related_blogposts, 'searched_word': searched_word}
+        # misspelled words are corrected when the query finds too few blog posts,
+        # the first pages of popular queries come from the cache
+        blogposts, corrected_word = search_cache.search(searched_word)
+        paginator = Paginator(blogposts, 5)
+        page_obj = paginator.get_page(request.GET.get('page'))
+
+    context = {'related_blogposts': page_obj or [], 'page_obj': page_obj, 'searched_word': searched_word,
+               'corrected_word': corrected_word}
     return render(request, 'blog/search_results.html', context=context)
 
+def suggest(request):
+    """
+    Complete a search query with titles of blog posts and tags, served from memory
+    """
+    suggestions = []
+    for kind, text, slug in suggestion_index.complete(request.GET.get('q', '')):
+        if kind == PrefixIndex.POST:
+            url = reverse('blog:blog-detail', args=[slug])
+        else:
+            url = reverse('blog:tags', args=[text])
+        suggestions.append({'kind': kind, 'text': text, 'url': url})
+
+    return JsonResponse({'suggestions': suggestions})
+
 
 # class-based views
 class BlogPostListView(generic.ListView):
@@ -118,6 +124,16 @@ class BlogPostListView(generic.ListView):
 
     queryset = BlogPost.objects.order_by('-post_date')
 
+    def get_context_data(self, **kwargs):
+        context = super(BlogPostListView, self).get_context_data(**kwargs)
+        # votes of the current user for the whole page are looked up at once
+        blogposts = attach_user_votes(list(context['object_list']), self.request.user)
+        context['object_list'] = context['blogpost_list'] = blogposts
+        if context['page_obj'] is not None:
+            context['page_obj'].object_list = blogposts
+        context['LIKE'], context['DISLIKE'] = Vote.LIKE, Vote.DISLIKE
+        return context
+
 
 class BlogAuthorListView(generic.ListView):
     """
@@ -139,25 +155,26 @@ class BlogPostDetailView(generic.DetailView):
 
     def get_context_data(self, **kwargs):
         context = super(BlogPostDetailView, self).get_context_data(**kwargs)
-        blogpost = get_object_or_404(BlogPost, slug = self.kwargs['slug'])
+        blogpost = self.object
 
         if self.request.user.is_authenticated:
-            if self.request.user not in blogpost.viewed_users.all():
-                blogpost.viewed_users.add(self.request.user)
+            # a single insert which is ignored if the user has viewed the blog post before
+            ViewedUser = BlogPost.viewed_users.through
+            ViewedUser.objects.bulk_create([ViewedUser(blogpost=blogpost, user=self.request.user)],
+                                           ignore_conflicts=True)
 
         else:
             session_id= self.request.session.session_key
-            if session_id and session_id not in blogpost.anonymous_users:
-                blogpost.anonymous_users.append(session_id)
+            if session_id:
+                add_anonymous_visitor(blogpost, session_id)
 
-        blogpost.views += 1 
-        blogpost.save(update_tags=False)
-        context['views'] = blogpost.views
+        # views are buffered and written to the database in batches
+        view_counter.increment(blogpost.pk)
+        context['views'] = blogpost.views + view_counter.get_pending(blogpost.pk)
 
-        if len(blogpost.liked_disliked_users) == 0:
-            blogpost.liked_disliked_users = dict(liked_users=[], disliked_users=[])
-        context['is_liked'] = str(self.request.user.id) in blogpost.liked_disliked_users['liked_users']
-        context['is_disliked'] = str(self.request.user.id) in blogpost.liked_disliked_users['disliked_users']
+        attach_user_votes([blogpost], self.request.user)
+        context['is_liked'] = blogpost.user_vote == Vote.LIKE
+        context['is_disliked'] = blogpost.user_vote == Vote.DISLIKE
         return context
 
 
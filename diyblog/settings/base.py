@@ -110,3 +110,10 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 NLTK_DATA = BASE_DIR / 'nltk_data'
+
+# Noun extractor used for tags, see blog.nlp and the benchmark_tag_extractors command:
+# 'blog.nlp.NLTKNounExtractor', 'blog.nlp.CachedLexiconNounExtractor' or 'blog.nlp.StopWordExtractor'
+TAG_EXTRACTOR = 'blog.nlp.NLTKNounExtractor'
+
+# Load the tag extractor when the blog app is ready instead of on the first analyzed blog post
+NLTK_WARMUP = False
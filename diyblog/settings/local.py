@@ -38,6 +38,10 @@ DATABASES = {
         "PASSWORD": env("SQL_PASSWORD", default="password"),
         "HOST": env("SQL_HOST", default="localhost"),
         "PORT": env("SQL_PORT", default="5432"),
+        # a file instead of memory, so threads of concurrency tests share the test database
+        "TEST": {
+            "NAME": BASE_DIR / "test_db.sqlite3",
+        },
     }
 }
 
@@ -61,6 +61,31 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR.joinpath('media')
 # DEFAULT_FILE_STORAGE = 'blog.storages.CustomS3Boto3Storage'
 
+# The shared caches are visible to every gunicorn worker and the process_tag_jobs worker.
+# Every distinct query adds a search entry, so they are culled in a table of their own
+# instead of evicting the few index page values, which are read together with one query
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'blog_shared_cache',
+    },
+    'search': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'blog_search_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+SEARCH_CACHE = 'search'
+INDEX_CACHE = 'shared'
+
+SUGGEST_REFRESH_INTERVAL = 60
+
 SESSION_COOKIE_SECURE = True
 SESSION_COOKIE_AGE = 600
 CSRF_COOKIE_SECURE = True
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'diyblog.settings')
 
 application = get_wsgi_application()
+
+# views buffered by a web process are written when it exits
+from blog.counters import flush_on_exit  # noqa: E402
+
+flush_on_exit()